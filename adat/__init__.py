@@ -1,2 +1,47 @@
-from .models import *
-from .modules import *
+import importlib
+
+# Submodules (and the names they used to re-export at package level) are imported on first access,
+# so `import adat.utils` does not pay for torch/allennlp. `allennlp --include-package adat` still
+# imports every submodule and registers all the components.
+_LAZY_SUBMODULES = ("attackers", "dataset_readers", "models", "modules", "tokens_masker", "utils")
+_LAZY_ATTRIBUTES = {
+    "BasicClassifierOneHotSupport": "models",
+    "DistributionClassifier": "models",
+    "DeepLevenshtein": "models",
+    "MaskedLanguageModel": "models",
+    "DistributionDeepLevenshtein": "models",
+    "AdversarialTrainingClassifier": "models",
+    "DistributionCnnEncoder": "modules",
+    "DistributionProjectionCnnEncoder": "modules",
+}
+
+# modules whose models, encoders and readers may be named in the config of an archive
+_REGISTERING_MODULES = (
+    "models",
+    "modules",
+    "dataset_readers.binary",
+    "dataset_readers.deep_levenshtein",
+    "dataset_readers.lm_output",
+    "dataset_readers.lm_reader",
+)
+
+__all__ = list(_LAZY_ATTRIBUTES) + ["register_all"]
+
+
+def register_all() -> None:
+    """Registers the custom components, call it before loading an archive or building from a config."""
+    for name in _REGISTERING_MODULES:
+        importlib.import_module(f".{name}", __name__)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_SUBMODULES) + list(_LAZY_ATTRIBUTES))
@@ -0,0 +1,133 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Sequence, Union
+import json
+
+import numpy as np
+
+from adat.attackers.attacker import AttackerOutput
+from adat.ragged import RaggedArrayWriter, RaggedArray
+from adat.utils import iterate_jsonlines
+
+# Attack results in columns, next to `attacked_data.json` of an attack run:
+#   attacked_data/{column}.npy    numeric columns (NaN where an optional field is not set)
+#   attacked_data/{column}.*      strings, utf-8 bytes in a `RaggedArray`
+# `history` and `timings` are nested, they stay in the jsonlines file only.
+JSONLINES_NAME = "attacked_data.json"
+COLUMNAR_NAME = "attacked_data"
+
+STRING_COLUMNS = ("sequence", "adversarial_sequence")
+NUMERIC_COLUMNS = {
+    "probability": "float64",
+    "adversarial_probability": "float64",
+    "wer": "int64",
+    "prob_diff": "float64",
+    "attacked_label": "int64",
+    "adversarial_label": "int64",
+    "approx_prob": "float64",
+    "approx_wer": "float64",
+    "loss_value": "float64",
+    # 1.0 or 0.0 with a time budget
+    "deadline_exceeded": "float64",
+}
+# not written when no example has them
+OPTIONAL_COLUMNS = ("approx_prob", "approx_wer", "loss_value", "deadline_exceeded")
+
+
+class StringColumn:
+    """Decodes the strings of a memory-mapped `RaggedArray` on access."""
+
+    def __init__(self, prefix: Union[str, Path]) -> None:
+        self._array = RaggedArray(prefix)
+
+    def __len__(self) -> int:
+        return len(self._array)
+
+    def __getitem__(self, idx: int) -> str:
+        return self._array[idx].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for idx in range(len(self)):
+            yield self[idx]
+
+
+class AttackResultsWriter:
+    def __init__(self, output_dir: Union[str, Path]) -> None:
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._strings = {name: RaggedArrayWriter(self.output_dir / name, "uint8") for name in STRING_COLUMNS}
+        self._numbers = {name: [] for name in NUMERIC_COLUMNS}
+
+    def write(self, output: Union[AttackerOutput, Dict[str, Any]]) -> None:
+        record = output.to_dict() if isinstance(output, AttackerOutput) else output
+        for name, writer in self._strings.items():
+            writer.append(np.frombuffer(record[name].encode("utf-8"), dtype=np.uint8))
+        for name, values in self._numbers.items():
+            value = record.get(name)
+            values.append(np.nan if value is None else value)
+
+    def close(self) -> None:
+        for writer in self._strings.values():
+            writer.close()
+        num_rows = 0
+        for name, values in self._numbers.items():
+            num_rows = len(values)
+            array = np.array(values, dtype=np.float64)
+            path = self.output_dir / f"{name}.npy"
+            if name in OPTIONAL_COLUMNS and np.isnan(array).all():
+                # left over from a previous run into the same directory
+                if path.exists():
+                    path.unlink()
+                continue
+            np.save(path, array.astype(NUMERIC_COLUMNS[name]))
+        with open(self.output_dir / "meta.json", "w") as f:
+            json.dump({"num_rows": num_rows}, f)
+
+    def __enter__(self) -> "AttackResultsWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def convert_jsonlines(path: Union[str, Path], output_dir: Union[str, Path]) -> int:
+    num_rows = 0
+    with AttackResultsWriter(output_dir) as writer:
+        for record in iterate_jsonlines(path):
+            writer.write(record)
+            num_rows += 1
+    return num_rows
+
+
+def load_attack_results(
+        adversarial_dir: Union[str, Path],
+        columns: Optional[Sequence[str]] = None
+) -> Dict[str, Sequence]:
+    """
+    `columns` (all by default) of the attack results in `adversarial_dir`. Numeric columns are memory-mapped
+    arrays, string columns are decoded on access. Runs without the columnar results are read from jsonlines.
+    """
+    adversarial_dir = Path(adversarial_dir)
+    columns = list(columns or (STRING_COLUMNS + tuple(NUMERIC_COLUMNS)))
+    columnar_dir = adversarial_dir / COLUMNAR_NAME
+    if not (columnar_dir / "meta.json").exists():
+        results = {name: [] for name in columns}
+        for record in iterate_jsonlines(adversarial_dir / JSONLINES_NAME):
+            for name in columns:
+                results[name].append(record.get(name))
+        return {
+            name: values if name in STRING_COLUMNS else np.array(values, dtype=NUMERIC_COLUMNS[name])
+            for name, values in results.items()
+        }
+
+    results = dict()
+    for name in columns:
+        if name in STRING_COLUMNS:
+            results[name] = StringColumn(columnar_dir / name)
+        elif (columnar_dir / f"{name}.npy").exists():
+            results[name] = np.load(columnar_dir / f"{name}.npy", mmap_mode="r")
+        elif name in OPTIONAL_COLUMNS:
+            with open(columnar_dir / "meta.json") as f:
+                results[name] = np.full(json.load(f)["num_rows"], np.nan)
+        else:
+            raise KeyError(f"Unknown column {name}")
+    return results
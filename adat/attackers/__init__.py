@@ -1,7 +1,27 @@
+import importlib
+
 from .attacker import Attacker, AttackerOutput
-from .cascada import Cascada
-from .distribution_cascada import DistributionCascada
-from .hotflip import HotFlipFixed
-from .fgsm import FGSMAttacker
-from .deepfool import DeepFoolAttacker
+from .cache import AttackCache, CachedAttacker
+
+# attackers pull in allennlp's model, interpret and predictor stacks, so they are imported on first access
+_LAZY_ATTACKERS = {
+    "Cascada": "cascada",
+    "DistributionCascada": "distribution_cascada",
+    "HotFlipFixed": "hotflip",
+    "HotFlipAttacker": "hotflip",
+    "FGSMAttacker": "fgsm",
+    "DeepFoolAttacker": "deepfool",
+}
+
+__all__ = ["Attacker", "AttackerOutput", "AttackCache", "CachedAttacker"] + list(_LAZY_ATTACKERS)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTACKERS:
+        module = importlib.import_module(f".{_LAZY_ATTACKERS[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTACKERS))
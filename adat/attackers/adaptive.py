@@ -0,0 +1,66 @@
+import math
+
+
+class AdaptiveController:
+    """
+    Steers a Cascada attack with the approximate objective of its Gumbel samples,
+    which every step computes anyway, instead of exact classifier calls.
+
+    - decoded candidates are evaluated by the classifier only on promising steps: the approximate
+      probability of the attacked label is below `evaluate_below` or the lowest so far,
+      at least every `max_skipped + 1` steps
+    - the attack stops when the loss has not improved by `min_delta` (relative) for `patience` steps
+    - the number of decoded candidates grows by one on promising steps and shrinks by one otherwise,
+      within `[min_samples, max_samples]` (0 decodes the argmax only)
+    """
+
+    def __init__(
+            self,
+            evaluate_below: float = 0.5,
+            max_skipped: int = 3,
+            patience: int = 3,
+            min_delta: float = 1e-3,
+            min_samples: int = 0,
+            max_samples: int = 10
+    ) -> None:
+        assert 0 <= min_samples <= max_samples
+        self.evaluate_below = evaluate_below
+        self.max_skipped = max_skipped
+        self.patience = patience
+        self.min_delta = min_delta
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.reset()
+
+    def reset(self, num_samples: int = 0) -> None:
+        self.num_samples = min(max(num_samples, self.min_samples), self.max_samples)
+        self._best_loss = math.inf
+        self._best_approx_prob = math.inf
+        self._num_bad_steps = 0
+        self._num_skipped = 0
+        self._promising = True
+
+    def observe(self, loss: float, approx_prob: float) -> None:
+        if loss < self._best_loss - self.min_delta * abs(self._best_loss if math.isfinite(self._best_loss) else 0.0):
+            self._best_loss = loss
+            self._num_bad_steps = 0
+        else:
+            self._num_bad_steps += 1
+
+        closer = approx_prob < self._best_approx_prob
+        self._best_approx_prob = min(self._best_approx_prob, approx_prob)
+        self._promising = closer or approx_prob < self.evaluate_below
+        if self._promising:
+            self.num_samples = min(self.num_samples + 1, self.max_samples)
+        else:
+            self.num_samples = max(self.num_samples - 1, self.min_samples)
+
+    def should_evaluate(self) -> bool:
+        if self._promising or self._num_skipped >= self.max_skipped:
+            self._num_skipped = 0
+            return True
+        self._num_skipped += 1
+        return False
+
+    def should_stop(self) -> bool:
+        return self._num_bad_steps >= self.patience
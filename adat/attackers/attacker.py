@@ -1,30 +1,190 @@
 from typing import List, Optional, Dict, Any
 from abc import ABC, abstractmethod
+import time
 
-from dataclasses import dataclass
+from .profiling import StageTimer, Timings, NULL_CONTEXT
+
+# {field: values of the kept steps}, e.g. {"step": [0, 2], "adversarial_sequence": [...], ...}
+History = Dict[str, List[Any]]
 
 
-@dataclass
 class AttackerOutput:
-    sequence: str
-    probability: float
-    adversarial_sequence: str
-    adversarial_probability: float
-    wer: int
-    prob_diff: float
-    attacked_label: int
-    adversarial_label: int
-    history: Optional[List[Dict[str, Any]]] = None
-    approx_prob: Optional[float] = None
-    approx_wer: Optional[float] = None
-    loss_value: Optional[float] = None
+    # one record per attacked example (and per step), `__slots__` keeps it small
+    __slots__ = (
+        "sequence",
+        "probability",
+        "adversarial_sequence",
+        "adversarial_probability",
+        "wer",
+        "prob_diff",
+        "attacked_label",
+        "adversarial_label",
+        "history",
+        "approx_prob",
+        "approx_wer",
+        "loss_value",
+        "timings",
+        "deadline_exceeded",
+    )
+    # fields that change from step to step, the rest is the attacked example
+    HISTORY_FIELDS = (
+        "adversarial_sequence",
+        "adversarial_probability",
+        "wer",
+        "prob_diff",
+        "adversarial_label",
+        "approx_prob",
+        "approx_wer",
+        "loss_value",
+    )
+
+    def __init__(
+            self,
+            sequence: str,
+            probability: float,
+            adversarial_sequence: str,
+            adversarial_probability: float,
+            wer: int,
+            prob_diff: float,
+            attacked_label: int,
+            adversarial_label: int,
+            history: Optional[History] = None,
+            approx_prob: Optional[float] = None,
+            approx_wer: Optional[float] = None,
+            loss_value: Optional[float] = None,
+            # per-stage wall time of the attack, only with `Attacker.enable_profiling`
+            timings: Optional[Timings] = None,
+            # whether the attack was cut short, only with `Attacker.set_time_budget`
+            deadline_exceeded: Optional[bool] = None
+    ) -> None:
+        self.sequence = sequence
+        self.probability = probability
+        self.adversarial_sequence = adversarial_sequence
+        self.adversarial_probability = adversarial_probability
+        self.wer = wer
+        self.prob_diff = prob_diff
+        self.attacked_label = attacked_label
+        self.adversarial_label = adversarial_label
+        self.history = history
+        self.approx_prob = approx_prob
+        self.approx_wer = approx_wer
+        self.loss_value = loss_value
+        self.timings = timings
+        self.deadline_exceeded = deadline_exceeded
+
+    def to_dict(self, exclude: tuple = ()) -> Dict[str, Any]:
+        # optional fields are written only when set
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if name not in exclude and getattr(self, name) is not None
+        }
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "AttackerOutput":
+        return cls(**record)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, AttackerOutput):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"AttackerOutput({fields})"
+
+
+def history_to_columns(outputs: List[AttackerOutput], every: int = 1) -> Optional[History]:
+    """Every `every`-th step (and the last one) as per-field lists, `every=0` keeps no history."""
+    if every <= 0 or not outputs:
+        return None
+    steps = list(range(0, len(outputs), every))
+    if steps[-1] != len(outputs) - 1:
+        steps.append(len(outputs) - 1)
+
+    history = {"step": steps}
+    for name in AttackerOutput.HISTORY_FIELDS:
+        values = [getattr(outputs[i], name) for i in steps]
+        if any(value is not None for value in values):
+            history[name] = values
+    return history
 
 
 class Attacker(ABC):
+    # profiling is opt-in, `timed` costs one attribute lookup when it is disabled
+    _timer: Optional[StageTimer] = None
+    # keep every `history_every`-th step of an attack in `AttackerOutput.history`, 0 keeps none
+    history_every: int = 1
+    # seconds per attacked example and the `time.monotonic()` deadline of the whole run, see `set_time_budget`
+    time_budget: Optional[float] = None
+    run_deadline: Optional[float] = None
+    # `set_seed` before every example, so that results depend neither on the order nor on the batches of the data
+    example_seed: Optional[int] = None
+
     @abstractmethod
     def attack(self, sequence_to_attack: str, **kwargs) -> AttackerOutput:
         pass
 
+    def attack_batch(self, sequences: List[str], labels: List[int], **kwargs) -> List[AttackerOutput]:
+        # attackers optimize one sequence at a time, an attacker that can batch overrides this
+        outputs = []
+        for sequence, label in zip(sequences, labels):
+            self.seed_example()
+            outputs.append(self.attack(sequence, label_to_attack=label, **kwargs))
+        return outputs
+
+    def set_example_seed(self, seed: Optional[int]) -> None:
+        self.example_seed = seed
+
+    def seed_example(self) -> None:
+        if self.example_seed is not None:
+            from adat.utils import set_seed
+
+            set_seed(self.example_seed)
+
+    def set_time_budget(self, seconds_per_example: Optional[float] = None, run_seconds: Optional[float] = None) -> None:
+        # attacks stop after the first step past their deadline with the best output found so far
+        self.time_budget = seconds_per_example
+        self.run_deadline = time.monotonic() + run_seconds if run_seconds is not None else None
+
+    def example_deadline(self) -> Optional[float]:
+        deadlines = []
+        if self.time_budget is not None:
+            deadlines.append(time.monotonic() + self.time_budget)
+        if self.run_deadline is not None:
+            deadlines.append(self.run_deadline)
+        return min(deadlines) if deadlines else None
+
+    @staticmethod
+    def past_deadline(deadline: Optional[float]) -> bool:
+        return deadline is not None and time.monotonic() >= deadline
+
+    def set_history_every(self, every: int) -> None:
+        self.history_every = every
+
+    def make_history(self, outputs: List[AttackerOutput]) -> Optional[History]:
+        return history_to_columns(outputs, self.history_every)
+
+    def enable_profiling(self, synchronize_cuda: bool = False) -> None:
+        synchronize = None
+        if synchronize_cuda:
+            import torch
+
+            synchronize = torch.cuda.synchronize
+        self._timer = StageTimer(synchronize=synchronize)
+
+    def timed(self, name: str):
+        if self._timer is None:
+            return NULL_CONTEXT
+        return self._timer(name)
+
+    def pop_timings(self) -> Optional[Timings]:
+        if self._timer is None:
+            return None
+        timings = self._timer.timings()
+        self._timer.reset()
+        return timings
+
     @staticmethod
     def find_best_attack(outputs: List[AttackerOutput]) -> AttackerOutput:
         if len(outputs) == 1:
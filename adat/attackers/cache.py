@@ -0,0 +1,121 @@
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Sequence
+import hashlib
+import json
+import os
+
+from .attacker import Attacker, AttackerOutput
+
+
+def normalize_config(config: Dict[str, Any]) -> str:
+    # key order, whitespace and tuples vs lists in the config do not change the attack
+    return json.dumps(config, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class AttackCache:
+    """
+    Content-addressed on-disk storage of `AttackerOutput`s.
+
+    A record is addressed by sha256 of (attacker name, normalized config, hashes of the model archives,
+    seed, sequence, label, attack kwargs), so changing any model or hyperparameter never returns a stale result.
+    """
+
+    def __init__(
+            self,
+            cache_dir: str,
+            attacker_name: str,
+            config: Dict[str, Any],
+            archive_paths: Sequence[str],
+            seed: Optional[int] = None
+    ) -> None:
+        from adat.utils import archive_hash
+
+        self.cache_dir = Path(cache_dir)
+        self.seed = seed
+        self._namespace = normalize_config(
+            {
+                "attacker": attacker_name,
+                "config": config,
+                "archives": [archive_hash(str(path)) for path in archive_paths],
+                "seed": seed,
+            }
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, sequence: str, label: int, **kwargs) -> str:
+        content = normalize_config(
+            {"namespace": self._namespace, "sequence": sequence, "label": int(label), "kwargs": kwargs}
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, sequence: str, label: int, **kwargs) -> Optional[AttackerOutput]:
+        path = self._path(self.key(sequence, label, **kwargs))
+        try:
+            with open(path) as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return AttackerOutput.from_dict(record)
+
+    def put(self, sequence: str, label: int, output: AttackerOutput, **kwargs) -> None:
+        path = self._path(self.key(sequence, label, **kwargs))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first, so concurrent runs never read a partial record
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            # timings describe one run, not the attack
+            json.dump(output.to_dict(exclude=("timings", )), f)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+
+class CachedAttacker(Attacker):
+    """Serves attacks from an `AttackCache` and runs the wrapped attacker only on misses."""
+
+    def __init__(self, attacker: Attacker, cache: AttackCache) -> None:
+        self.attacker = attacker
+        self.cache = cache
+        if cache.seed is not None:
+            # the results of misses must not depend on the order of the attacked data
+            self.attacker.set_example_seed(cache.seed)
+
+    def set_time_budget(self, seconds_per_example: Optional[float] = None, run_seconds: Optional[float] = None) -> None:
+        self.attacker.set_time_budget(seconds_per_example, run_seconds)
+
+    def set_history_every(self, every: int) -> None:
+        # cached outputs keep the history they were computed with
+        self.attacker.set_history_every(every)
+
+    def set_example_seed(self, seed: Optional[int]) -> None:
+        self.attacker.set_example_seed(seed)
+
+    def enable_profiling(self, synchronize_cuda: bool = False) -> None:
+        # cache hits carry no timings
+        self.attacker.enable_profiling(synchronize_cuda)
+
+    def attack(self, sequence_to_attack: str, label_to_attack: int = 1, **kwargs) -> AttackerOutput:
+        return self.attack_batch([sequence_to_attack], [label_to_attack], **kwargs)[0]
+
+    def attack_batch(self, sequences: List[str], labels: List[int], **kwargs) -> List[AttackerOutput]:
+        outputs = [self.cache.get(sequence, label, **kwargs) for sequence, label in zip(sequences, labels)]
+        misses = [idx for idx, output in enumerate(outputs) if output is None]
+        if not misses:
+            return outputs
+
+        computed = self.attacker.attack_batch([sequences[i] for i in misses], [labels[i] for i in misses], **kwargs)
+        for idx, output in zip(misses, computed):
+            # a cut short attack depends on the machine and the load, it is not the result of the config
+            if not output.deadline_exceeded:
+                self.cache.put(sequences[idx], labels[idx], output, **kwargs)
+            outputs[idx] = output
+        return outputs
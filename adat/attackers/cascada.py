@@ -1,6 +1,5 @@
 from pathlib import Path
-from typing import Tuple, Optional, List
-from copy import deepcopy
+from typing import Tuple, Optional, List, Dict, Any
 
 import torch
 from torch.distributions import Categorical
@@ -9,7 +8,10 @@ from allennlp.models import Model, load_archive
 from allennlp.data import TextFieldTensors, Batch, DatasetReader
 from allennlp.nn.util import move_to_device
 
+from adat import register_all
 from adat.attackers import Attacker, AttackerOutput
+from adat.attackers.adaptive import AdaptiveController
+from adat.quantization import quantize_dynamic
 from adat.utils import calculate_wer
 
 _MAX_NUM_LAYERS = 30
@@ -37,6 +39,8 @@ class Cascada(Attacker):
             num_samples: int = 5,
             temperature: float = 0.8,
             parameters_to_update: Optional[Tuple[str, ...]] = None,
+            adaptive: Optional[Dict[str, Any]] = None,
+            quantize_scoring: bool = False,
             device: int = -1
     ) -> None:
         assert num_gumbel_samples >= 1
@@ -44,6 +48,7 @@ class Cascada(Attacker):
         classifier_dir = Path(classifier_dir)
         deep_levenshtein_dir = Path(deep_levenshtein_dir)
 
+        register_all()
         archive = load_archive(masked_lm_dir / "model.tar.gz")
         lm_params = archive.config
         self.reader = DatasetReader.from_params(lm_params["dataset_reader"])
@@ -69,6 +74,12 @@ class Cascada(Attacker):
             self.classifier.cuda(self.device)
             self.deep_levenshtein.cuda(self.device)
 
+        # the exact scoring of decoded candidates needs no gradients, on CPU it can run in int8
+        self.scoring_classifier = self.classifier
+        if quantize_scoring:
+            assert self.device < 0, "quantized models run on CPU"
+            self.scoring_classifier = quantize_dynamic(self.classifier)
+
         self.alpha = alpha
         self.beta = beta
         self.lr = lr
@@ -77,9 +88,35 @@ class Cascada(Attacker):
         self.num_samples = num_samples
         self.temperature = temperature
         self.parameters_to_update = parameters_to_update or ("all", )
+        # parameters of `AdaptiveController`, every step is evaluated exactly without it
+        self.controller = AdaptiveController(**adaptive) if adaptive is not None else None
         self.optimizer = None
         self.initialize_optimizer()
 
+    def update_hyperparameters(
+            self,
+            alpha: Optional[float] = None,
+            beta: Optional[float] = None,
+            lr: Optional[float] = None,
+            num_gumbel_samples: Optional[int] = None,
+            tau: Optional[float] = None,
+            num_samples: Optional[int] = None,
+            temperature: Optional[float] = None,
+            parameters_to_update: Optional[Tuple[str, ...]] = None
+    ) -> None:
+        # allows to reuse loaded models for different configs (e.g. during hyperparameter search)
+        self.alpha = alpha if alpha is not None else self.alpha
+        self.beta = beta if beta is not None else self.beta
+        self.lr = lr if lr is not None else self.lr
+        self.num_gumbel_samples = num_gumbel_samples if num_gumbel_samples is not None else self.num_gumbel_samples
+        assert self.num_gumbel_samples >= 1
+        self.tau = tau if tau is not None else self.tau
+        self.num_samples = num_samples if num_samples is not None else self.num_samples
+        self.temperature = temperature if temperature is not None else self.temperature
+        self.parameters_to_update = tuple(parameters_to_update or self.parameters_to_update)
+        self.initialize_load_state_dict()
+        self.initialize_optimizer()
+
     def initialize_load_state_dict(self) -> None:
         self.lm_model.load_state_dict(self._lm_state)
         self.lm_model.eval()
@@ -110,9 +147,10 @@ class Cascada(Attacker):
         out = [o for o in out if o not in ["<START>", "<END>"]]
         return " ".join(out)
 
-    def decode_sequence(self, logits: torch.Tensor) -> List[str]:
-        if self.num_samples:
-            indexes = Categorical(logits=logits[0] / self.temperature).sample((self.num_samples, ))
+    def decode_sequence(self, logits: torch.Tensor, num_samples: Optional[int] = None) -> List[str]:
+        num_samples = self.num_samples if num_samples is None else num_samples
+        if num_samples:
+            indexes = Categorical(logits=logits[0] / self.temperature).sample((num_samples, ))
             out = [self.indexes_to_string(ind) for ind in indexes]
         else:
             # only one sample with argmax
@@ -131,7 +169,7 @@ class Cascada(Attacker):
             approx_wer: float,
             approx_prob: float
     ) -> AttackerOutput:
-        new_probs = self.classifier(self.sequence_to_input(adversarial_sequence))["probs"][0]
+        new_probs = self.scoring_classifier(self.sequence_to_input(adversarial_sequence))["probs"][0]
         new_prob = new_probs[label_to_attack].item()
         distance = calculate_wer(adversarial_sequence, sequence_to_attack)
 
@@ -157,54 +195,90 @@ class Cascada(Attacker):
             label_to_attack: int,
             initial_prob: float,
             **kwargs
-    ) -> AttackerOutput:
+    ) -> Optional[AttackerOutput]:
         # (1, sequence_length, vocab_size)
-        logits = self.lm_model(inputs)["logits"]
+        with self.timed("lm_forward"):
+            logits = self.lm_model.forward_inference(inputs, outputs=("logits", ))["logits"]
 
         # (self.num_gumbel_samples, sequence_length, vocab_size)
-        onehot_with_gradients = torch.cat(
-            [
-                torch.nn.functional.gumbel_softmax(logits, tau=self.tau, hard=True)
-                for _ in range(self.num_gumbel_samples)
-            ]
-        )
+        with self.timed("gumbel_sampling"):
+            onehot_with_gradients = torch.cat(
+                [
+                    torch.nn.functional.gumbel_softmax(logits, tau=self.tau, hard=True)
+                    for _ in range(self.num_gumbel_samples)
+                ]
+            )
 
         # (self.num_gumbel_samples, )
-        prob = self.classifier(onehot_with_gradients)["probs"][:, label_to_attack].mean()
+        with self.timed("classifier"):
+            prob = self.classifier(onehot_with_gradients)["probs"][:, label_to_attack].mean()
         # (self.num_gumbel_samples, )
-        distance = self.deep_levenshtein(
-            onehot_with_gradients,
-            {"tokens": {"tokens": inputs["tokens"]["tokens"].repeat(self.num_gumbel_samples, 1)}}
-        )["distance"].mean()
+        with self.timed("deep_levenshtein"):
+            distance = self.deep_levenshtein(
+                onehot_with_gradients,
+                {"tokens": {"tokens": inputs["tokens"]["tokens"].repeat(self.num_gumbel_samples, 1)}}
+            )["distance"].mean()
+
+        return self._update_and_decode(
+            inputs, sequence_to_attack, label_to_attack, initial_prob, prob, distance,
+            force_evaluation=kwargs.get("force_evaluation", False)
+        )
 
+    def _update_and_decode(
+            self,
+            inputs: TextFieldTensors,
+            sequence_to_attack: str,
+            label_to_attack: int,
+            initial_prob: float,
+            prob: torch.Tensor,
+            distance: torch.Tensor,
+            force_evaluation: bool = False
+    ) -> Optional[AttackerOutput]:
         loss = self.calculate_loss(
             prob,
             distance
         )
-        loss.backward()
-        self.optimizer.step()
-        self.optimizer.zero_grad()
+        with self.timed("backward"):
+            loss.backward()
+        with self.timed("optimizer"):
+            self.optimizer.step()
+            self.optimizer.zero_grad()
+
+        num_samples = self.num_samples
+        if self.controller is not None:
+            self.controller.observe(loss.item(), prob.item())
+            # unpromising steps only update the LM, nothing is decoded and classified
+            if not self.controller.should_evaluate() and not force_evaluation:
+                return None
+            num_samples = self.controller.num_samples
 
         # (1, sequence_length, vocab_size)
-        logits = self.lm_model(inputs)["logits"]
-        # max(self.num_samples, 1) adversarial attacks
-        adversarial_sequences = self.decode_sequence(logits)
+        with self.timed("lm_forward"), torch.no_grad():
+            logits = self.lm_model.forward_inference(inputs, outputs=("logits", ))["logits"]
+        # max(num_samples, 1) adversarial attacks
+        with self.timed("decode_sequence"):
+            adversarial_sequences = self.decode_sequence(logits, num_samples)
 
         outputs = []
         for adversarial_sequence in set(adversarial_sequences):
-            output = self.get_output(
-                sequence_to_attack=sequence_to_attack,
-                adversarial_sequence=adversarial_sequence,
-                label_to_attack=label_to_attack,
-                initial_prob=initial_prob,
-                loss_value=loss.item(),
-                approx_wer=distance.item(),
-                approx_prob=prob.item()
-            )
+            with self.timed("get_output"):
+                output = self.get_output(
+                    sequence_to_attack=sequence_to_attack,
+                    adversarial_sequence=adversarial_sequence,
+                    label_to_attack=label_to_attack,
+                    initial_prob=initial_prob,
+                    loss_value=loss.item(),
+                    approx_wer=distance.item(),
+                    approx_prob=prob.item()
+                )
             outputs.append(output)
 
         return self.find_best_attack(outputs)
 
+    def initial_step_kwargs(self, inputs: TextFieldTensors) -> Dict[str, Any]:
+        # computed once per attacked sequence and passed to every `step`
+        return dict()
+
     def attack(
             self,
             sequence_to_attack: str,
@@ -213,24 +287,49 @@ class Cascada(Attacker):
             early_stopping: bool = False
     ) -> AttackerOutput:
         assert max_steps > 0
-        inputs = self.sequence_to_input(sequence_to_attack)
-        with torch.no_grad():
-            prob = self.classifier(inputs)["probs"][0, label_to_attack].item()
-
-        outputs = []
-        for _ in range(max_steps):
-            output = self.step(
-                inputs,
-                sequence_to_attack=sequence_to_attack,
-                label_to_attack=label_to_attack,
-                initial_prob=prob
-            )
-            outputs.append(output)
-            if early_stopping and output.adversarial_label != label_to_attack:
-                break
-
-        output = self.find_best_attack(outputs)
-        output.history = [deepcopy(o.__dict__) for o in outputs]
-        self.initialize_load_state_dict()
-        self.initialize_optimizer()
+        deadline = self.example_deadline()
+        deadline_exceeded = False
+        with self.timed("attack"):
+            inputs = self.sequence_to_input(sequence_to_attack)
+            with self.timed("initial_forward"), torch.no_grad():
+                prob = self.classifier(inputs)["probs"][0, label_to_attack].item()
+                step_kwargs = self.initial_step_kwargs(inputs)
+            if self.controller is not None:
+                self.controller.reset(self.num_samples)
+
+            outputs = []
+            for step_idx in range(max_steps):
+                if outputs and self.past_deadline(deadline):
+                    deadline_exceeded = True
+                    break
+                if outputs and self.controller is not None and self.controller.should_stop():
+                    break
+                # the controller may skip steps, an attack needs at least one evaluated step
+                last_step = (
+                    step_idx == max_steps - 1
+                    or self.past_deadline(deadline)
+                    or (self.controller is not None and self.controller.should_stop())
+                )
+                output = self.step(
+                    inputs,
+                    sequence_to_attack=sequence_to_attack,
+                    label_to_attack=label_to_attack,
+                    initial_prob=prob,
+                    force_evaluation=not outputs and last_step,
+                    **step_kwargs
+                )
+                if output is None:
+                    continue
+                outputs.append(output)
+                if early_stopping and output.adversarial_label != label_to_attack:
+                    break
+
+            output = self.find_best_attack(outputs)
+            output.history = self.make_history(outputs)
+            with self.timed("reset"):
+                self.initialize_load_state_dict()
+                self.initialize_optimizer()
+        output.timings = self.pop_timings()
+        if deadline is not None:
+            output.deadline_exceeded = deadline_exceeded
         return output
@@ -2,40 +2,53 @@
 Generating Natural Language Adversarial Examples on a Large Scale with Generative Models"""
 
 from pathlib import Path
-from typing import Optional
-from copy import deepcopy
+from typing import List, Optional
 from functools import lru_cache
 import random
 
 import torch
-from allennlp.models import load_archive
+from allennlp.models import Model, load_archive
 from allennlp.data import TextFieldTensors, Batch, DatasetReader
 from allennlp.nn.util import move_to_device
 from allennlp.nn import util
 
+from adat import register_all
 from adat.attackers import Attacker, AttackerOutput
 from adat.utils import calculate_wer
 
 
 class FGSMAttacker(Attacker):
 
-    def __init__(self, classifier_dir: str, num_steps: int = 10, epsilon: float = 0.01, device: int = -1):
-
-        archive = load_archive(Path(classifier_dir) / "model.tar.gz")
-        self.reader = DatasetReader.from_params(archive.config["dataset_reader"])
-        self.classifier = archive.model
+    def __init__(
+            self,
+            classifier: Model,
+            reader: DatasetReader,
+            num_steps: int = 10,
+            epsilon: float = 0.01,
+            device: int = -1
+    ) -> None:
+        # the weights of `classifier` are shared, not copied: it may be the model being trained
+        self.reader = reader
+        self.classifier = classifier
         self.classifier.eval()
 
         self.num_steps = num_steps
         self.epsilon = epsilon
-        self.device = device
-
-        if self.device >= 0 and torch.cuda.is_available():
+        # tensors of `sequence_to_input` are cached on this device, it never changes
+        self.device = device if torch.cuda.is_available() else -1
+        if self.device >= 0:
             self.classifier.cuda(self.device)
 
         self.emb_layer = self._construct_embedding_matrix()
         self.vocab_size = self.classifier.vocab.get_vocab_size()
 
+    @classmethod
+    def from_archive(cls, classifier_dir: str, **kwargs) -> "FGSMAttacker":
+        register_all()
+        archive = load_archive(Path(classifier_dir) / "model.tar.gz")
+        reader = DatasetReader.from_params(archive.config["dataset_reader"])
+        return cls(archive.model, reader, **kwargs)
+
     def _construct_embedding_matrix(self):
         embedding_layer = util.find_embedding_layer(self.classifier)
         self.embedding_layer = embedding_layer
@@ -46,16 +59,16 @@ class FGSMAttacker(Attacker):
         out = [o for o in out if o not in ["<START>", "<END>"]]
         return " ".join(out)
 
-    @lru_cache(maxsize=1000)
-    def sequence_to_input(self, sequence: str) -> TextFieldTensors:
-        instances = Batch([
-            self.reader.text_to_instance(sequence)
-        ])
-
+    def sequences_to_input(self, sequences: List[str]) -> TextFieldTensors:
+        instances = Batch([self.reader.text_to_instance(sequence) for sequence in sequences])
         instances.index_instances(self.classifier.vocab)
         inputs = instances.as_tensor_dict()["tokens"]
         return move_to_device(inputs, self.device)
 
+    @lru_cache(maxsize=1000)
+    def sequence_to_input(self, sequence: str) -> TextFieldTensors:
+        return self.sequences_to_input([sequence])
+
     def attack(
             self,
             sequence_to_attack: str,
@@ -63,74 +76,164 @@ class FGSMAttacker(Attacker):
             num_steps: Optional[int] = None,
             epsilon: Optional[float] = None
     ) -> AttackerOutput:
-        seq_length = len(sequence_to_attack.split())
+        deadline = self.example_deadline()
+        deadline_exceeded = False
+        with self.timed("attack"):
+            seq_length = len(sequence_to_attack.split())
+            num_steps = num_steps or self.num_steps
+            epsilon = epsilon or self.epsilon
+            inputs = self.sequence_to_input(sequence_to_attack)
+
+            # trick to make the variable a leaf variable
+            emb_inp = self.classifier.get_embeddings(inputs)
+            embs = emb_inp['embedded_text'].detach()
+            label = torch.tensor([label_to_attack], device=embs.device)
+
+            initial_prob = self.classifier.forward_on_embeddings(
+                embs,
+                emb_inp["mask"],
+                label=label
+            )["probs"][0, label_to_attack].item()
+            embs = [e for e in embs[0]]
+
+            history = []
+            for i in range(num_steps):
+                if history and self.past_deadline(deadline):
+                    deadline_exceeded = True
+                    break
+                random_idx = random.randint(1, max(1, seq_length - 2))
+                embs[random_idx].requires_grad = True
+                embeddings_tensor = torch.stack(embs, dim=0).unsqueeze(0)
+
+                with self.timed("forward_backward"):
+                    clf_output = self.classifier.forward_on_embeddings(
+                        embeddings_tensor,
+                        emb_inp["mask"],
+                        label=label
+                    )
+
+                    loss = clf_output["loss"]
+                    self.classifier.zero_grad()
+                    loss.backward()
+
+                embs[random_idx] = embs[random_idx] + epsilon * embs[random_idx].grad.data.sign()
+
+                with self.timed("nearest_token"):
+                    distances = torch.nn.functional.pairwise_distance(
+                        embs[random_idx],
+                        self.emb_layer
+                    )
+                    # @UNK@, @PAD@, @MASK@, @START@, @END@
+                    to_drop_indexes = [0, 1] + list(range(self.vocab_size - 3, self.vocab_size))
+                    distances[to_drop_indexes] = 10e6
+
+                closest_idx = distances.argmin().item()
+                embs[random_idx] = self.emb_layer[closest_idx]
+                embs = [e.detach() for e in embs]
+
+                adversarial_idexes = inputs["tokens"]["tokens"].clone()
+                adversarial_idexes[0, random_idx] = closest_idx
+
+                # without the padding of `token_min_padding_length`, as in `attack_batch`
+                adverarial_seq = self.indexes_to_string(adversarial_idexes[0][emb_inp["mask"][0].bool()])
+                with self.timed("get_output"):
+                    new_clf_output = self.classifier.forward(self.sequence_to_input(adverarial_seq))
+                    new_probs = new_clf_output["probs"]
+                    adv_prob = new_probs[0, label_to_attack].item()
+
+                output = AttackerOutput(
+                    sequence=sequence_to_attack,
+                    probability=initial_prob,
+                    adversarial_sequence=adverarial_seq,
+                    adversarial_probability=adv_prob,
+                    wer=calculate_wer(sequence_to_attack, adverarial_seq),
+                    prob_diff=(initial_prob - adv_prob),
+                    attacked_label=label_to_attack,
+                    adversarial_label=new_probs.argmax().item()
+                )
+
+                history.append(output)
+
+            output = self.find_best_attack(history)
+            output.history = self.make_history(history)
+        output.timings = self.pop_timings()
+        if deadline is not None:
+            output.deadline_exceeded = deadline_exceeded
+        return output
+
+    def attack_batch(
+            self,
+            sequences: List[str],
+            labels: List[int],
+            num_steps: Optional[int] = None,
+            epsilon: Optional[float] = None
+    ) -> List[AttackerOutput]:
+        """
+        `attack` of all `sequences` at once, every step flips one random position of each sequence
+        with one forward and backward pass of the batch.
+        """
+        # time budgets, timings and seeds are per example, with any of them examples are attacked one by one
+        if self.time_budget is not None or self.run_deadline is not None or self._timer is not None \
+                or self.example_seed is not None:
+            return super().attack_batch(sequences, labels, num_steps=num_steps, epsilon=epsilon)
+
         num_steps = num_steps or self.num_steps
         epsilon = epsilon or self.epsilon
-        inputs = self.sequence_to_input(sequence_to_attack)
+        seq_lengths = [len(sequence.split()) for sequence in sequences]
+        inputs = self.sequences_to_input(sequences)
 
-        # trick to make the variable a leaf variable
         emb_inp = self.classifier.get_embeddings(inputs)
-        embs = emb_inp['embedded_text'].detach()
-        label = torch.tensor([label_to_attack], device=embs.device)
-
-        initial_prob = self.classifier.forward_on_embeddings(
-            embs,
-            emb_inp["mask"],
-            label=label
-        )["probs"][0, label_to_attack].item()
-        embs = [e for e in embs[0]]
-
-        history = []
-        for i in range(num_steps):
-            random_idx = random.randint(1, max(1, seq_length - 2))
-            embs[random_idx].requires_grad = True
-            embeddings_tensor = torch.stack(embs, dim=0).unsqueeze(0)
-
-            clf_output = self.classifier.forward_on_embeddings(
-                embeddings_tensor,
-                emb_inp["mask"],
-                label=label
+        embs = emb_inp["embedded_text"].detach()
+        mask = emb_inp["mask"]
+        label = torch.tensor(labels, device=embs.device)
+        rows = torch.arange(len(sequences), device=embs.device)
+        initial_probs = self.classifier.forward_on_embeddings(embs, mask, label=label)["probs"][rows, label].tolist()
+        # @UNK@, @PAD@, @MASK@, @START@, @END@
+        to_drop_indexes = [0, 1] + list(range(self.vocab_size - 3, self.vocab_size))
+
+        histories = [[] for _ in sequences]
+        for _ in range(num_steps):
+            random_idx = torch.tensor(
+                [random.randint(1, max(1, seq_length - 2)) for seq_length in seq_lengths],
+                device=embs.device
             )
-
-            loss = clf_output["loss"]
+            embs.requires_grad = True
+            loss = self.classifier.forward_on_embeddings(embs, mask, label=label)["loss"]
             self.classifier.zero_grad()
             loss.backward()
 
-            embs[random_idx] = embs[random_idx] + epsilon * embs[random_idx].grad.data.sign()
-
-            distances = torch.nn.functional.pairwise_distance(
-                embs[random_idx],
-                self.emb_layer
-            )
-            # @UNK@, @PAD@, @MASK@, @START@, @END@
-            to_drop_indexes = [0, 1] + list(range(self.vocab_size - 3, self.vocab_size))
-            distances[to_drop_indexes] = 10e6
+            # the loss is averaged over the batch, the signs of the gradients are those of every sequence
+            perturbed = embs[rows, random_idx] + epsilon * embs.grad[rows, random_idx].sign()
+            distances = torch.cdist(perturbed.detach(), self.emb_layer.detach())
+            distances[:, to_drop_indexes] = 10e6
+            closest_idx = distances.argmin(dim=-1)
 
-            closest_idx = distances.argmin().item()
-            embs[random_idx] = self.emb_layer[closest_idx]
-            embs = [e.detach() for e in embs]
+            embs = embs.detach()
+            embs[rows, random_idx] = self.emb_layer[closest_idx].detach()
 
             adversarial_idexes = inputs["tokens"]["tokens"].clone()
-            adversarial_idexes[0, random_idx] = closest_idx
-
-            adverarial_seq = self.indexes_to_string(adversarial_idexes[0])
-            new_clf_output = self.classifier.forward(self.sequence_to_input(adverarial_seq))
-            new_probs = new_clf_output["probs"]
-            adv_prob = new_probs[0, label_to_attack].item()
-
-            output = AttackerOutput(
-                sequence=sequence_to_attack,
-                probability=initial_prob,
-                adversarial_sequence=adverarial_seq,
-                adversarial_probability=adv_prob,
-                wer=calculate_wer(sequence_to_attack, adverarial_seq),
-                prob_diff=(initial_prob - adv_prob),
-                attacked_label=label_to_attack,
-                adversarial_label=new_probs.argmax().item()
-            )
-
-            history.append(output)
-
-        output = self.find_best_attack(history)
-        output.history = [deepcopy(o.__dict__) for o in history]
-        return output
+            adversarial_idexes[rows, random_idx] = closest_idx
+            adversarial_seqs = [self.indexes_to_string(idexes[m]) for idexes, m in zip(adversarial_idexes, mask.bool())]
+            new_probs = self.classifier.forward(self.sequences_to_input(adversarial_seqs))["probs"]
+
+            for j, (sequence, label_to_attack) in enumerate(zip(sequences, labels)):
+                adv_prob = new_probs[j, label_to_attack].item()
+                histories[j].append(
+                    AttackerOutput(
+                        sequence=sequence,
+                        probability=initial_probs[j],
+                        adversarial_sequence=adversarial_seqs[j],
+                        adversarial_probability=adv_prob,
+                        wer=calculate_wer(sequence, adversarial_seqs[j]),
+                        prob_diff=(initial_probs[j] - adv_prob),
+                        attacked_label=label_to_attack,
+                        adversarial_label=new_probs[j].argmax().item()
+                    )
+                )
+
+        outputs = []
+        for history in histories:
+            output = self.find_best_attack(history)
+            output.history = self.make_history(history)
+            outputs.append(output)
+        return outputs
@@ -1,5 +1,5 @@
 from copy import deepcopy
-from typing import List
+from typing import List, Optional
 
 import numpy
 import torch
@@ -13,7 +13,9 @@ from allennlp.nn import util
 from allennlp.predictors.predictor import Predictor
 from allennlp.interpret.attackers import Hotflip
 
+from adat.attackers.attacker import Attacker, AttackerOutput
 from adat.tokens_masker import MASK_TOKEN
+from adat.utils import calculate_wer
 
 DEFAULT_IGNORE_TOKENS = ["@@NULL@@", ".", ",", ";", "!", "?", "[MASK]",
                          "[SEP]", "[CLS]", MASK_TOKEN, "<START>", "<END>"]
@@ -127,3 +129,46 @@ class HotFlipFixed(Hotflip):
             final_tokens.append(tokens_to_add)
 
         return sanitize({"final": final_tokens, "original": original_tokens, "outputs": outputs})
+
+
+class HotFlipAttacker(Attacker):
+    """`HotFlipFixed` behind the `Attacker` interface, flips tokens until the attacked label is not predicted."""
+
+    def __init__(self, predictor: Predictor, max_tokens: Optional[int] = None) -> None:
+        self.predictor = predictor
+        self.max_tokens = max_tokens or predictor._model.vocab.get_vocab_size("tokens")
+        self.hotflip = HotFlipFixed(predictor=predictor, max_tokens=self.max_tokens)
+
+    def attack(self, sequence_to_attack: str, label_to_attack: int = 1, **kwargs) -> AttackerOutput:
+        return self.attack_batch([sequence_to_attack], [label_to_attack])[0]
+
+    def attack_batch(self, sequences: List[str], labels: List[int], **kwargs) -> List[AttackerOutput]:
+        # the original probabilities in one forward pass, the flips one sequence at a time
+        predictions = self.predictor.predict_batch_json([{"sentence": sequence.strip()} for sequence in sequences])
+        outputs = []
+        for sequence, label, prediction in zip(sequences, labels, predictions):
+            self.seed_example()
+            outputs.append(self._flip(sequence, int(label), prediction["probs"][int(label)]))
+        return outputs
+
+    def _flip(self, sequence: str, label: int, probability: float) -> AttackerOutput:
+        # if it works then it's not stupid
+        probs = numpy.ones(self.predictor._model._num_labels)
+        probs[label] = 0
+        out = self.hotflip.attack_from_json({"sentence": sequence.strip()}, target={"probs": probs})
+        adversarial_sequence = " ".join(out["final"][0])
+        adversarial_probabilities = out["outputs"]["probs"]
+        if len(adversarial_probabilities) == 1 and isinstance(adversarial_probabilities[0], list):
+            adversarial_probabilities = adversarial_probabilities[0]
+
+        adversarial_probability = adversarial_probabilities[label]
+        return AttackerOutput(
+            sequence=sequence,
+            probability=probability,
+            adversarial_sequence=adversarial_sequence,
+            adversarial_probability=adversarial_probability,
+            wer=calculate_wer(sequence, adversarial_sequence),
+            prob_diff=probability - adversarial_probability,
+            attacked_label=label,
+            adversarial_label=int(numpy.argmax(adversarial_probabilities))
+        )
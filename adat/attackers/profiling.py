@@ -0,0 +1,135 @@
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, TypeVar, Union
+import inspect
+import time
+
+# {stage name: {"seconds": cumulative wall time, "calls": number of calls}}
+Timings = Dict[str, Dict[str, float]]
+T = TypeVar("T")
+
+
+class _NullContext:
+    # `contextlib.nullcontext` needs python 3.7
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *args) -> None:
+        return None
+
+
+NULL_CONTEXT = _NullContext()
+
+
+class _Stage:
+    __slots__ = ("_timer", "_name", "_start")
+
+    def __init__(self, timer: "StageTimer", name: str) -> None:
+        self._timer = timer
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        if self._timer.synchronize is not None:
+            self._timer.synchronize()
+        self._start = time.perf_counter()
+
+    def __exit__(self, *args) -> None:
+        if self._timer.synchronize is not None:
+            self._timer.synchronize()
+        self._timer.seconds[self._name] += time.perf_counter() - self._start
+        self._timer.calls[self._name] += 1
+
+
+class StageTimer:
+    """
+    Cumulative wall time and call counts of named stages, `with timer("stage"): ...`.
+    Nested stages are timed independently, so their times overlap.
+    `synchronize` (e.g. `torch.cuda.synchronize`) is called around every stage to time asynchronous CUDA kernels.
+    """
+
+    def __init__(self, synchronize: Optional[Callable[[], None]] = None) -> None:
+        self.synchronize = synchronize
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def __call__(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def timings(self) -> Timings:
+        return {name: {"seconds": self.seconds[name], "calls": self.calls[name]} for name in self.seconds}
+
+    def reset(self) -> None:
+        self.seconds.clear()
+        self.calls.clear()
+
+
+def merge_timings(all_timings: Iterable[Optional[Timings]]) -> Timings:
+    merged: Timings = defaultdict(lambda: {"seconds": 0.0, "calls": 0})
+    for timings in all_timings:
+        for name, stage in (timings or {}).items():
+            merged[name]["seconds"] += stage["seconds"]
+            merged[name]["calls"] += stage["calls"]
+    return dict(merged)
+
+
+def format_timings(timings: Timings, total_stage: str = "attack") -> str:
+    total = timings.get(total_stage, {}).get("seconds") or sum(stage["seconds"] for stage in timings.values())
+    lines = [f"{'stage':24s} {'seconds':>10s} {'calls':>8s} {'ms/call':>10s} {'share':>7s}"]
+    for name, stage in sorted(timings.items(), key=lambda x: -x[1]["seconds"]):
+        per_call = 1000 * stage["seconds"] / max(stage["calls"], 1)
+        share = stage["seconds"] / total if total else 0.0
+        lines.append(f"{name:24s} {stage['seconds']:10.3f} {stage['calls']:8d} {per_call:10.2f} {share:7.1%}")
+    return "\n".join(lines)
+
+
+def _export_trace(profiler, out_dir: Path, use_cuda: bool, profile_memory: bool, row_limit: int) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    profiler.export_chrome_trace(str(out_dir / "trace.json"))
+    averages = profiler.key_averages()
+    tables = [averages.table(sort_by="cuda_time_total" if use_cuda else "self_cpu_time_total", row_limit=row_limit)]
+    if profile_memory:
+        tables.append(averages.table(sort_by="self_cpu_memory_usage", row_limit=row_limit))
+    with open(out_dir / "top_operators.txt", "w") as f:
+        f.write("\n\n".join(tables))
+
+
+def trace_window(
+        iterable: Iterable[T],
+        out_dir: Union[str, Path],
+        start: int = 1,
+        num_examples: int = 5,
+        use_cuda: bool = False,
+        row_limit: int = 30
+) -> Iterator[T]:
+    """
+    Yields `iterable` and runs the torch autograd profiler while the examples
+    `[start, start + num_examples)` are processed by the caller. Writes a Chrome trace (`trace.json`,
+    open in chrome://tracing) and the top `row_limit` operators by time and memory (`top_operators.txt`).
+    The default `start` skips the first example, it warms up caches and allocators.
+    """
+    import torch
+
+    kwargs = {"use_cuda": use_cuda, "record_shapes": True}
+    # `profile_memory` needs torch>=1.6
+    profile_memory = "profile_memory" in inspect.signature(torch.autograd.profiler.profile).parameters
+    if profile_memory:
+        kwargs["profile_memory"] = True
+
+    out_dir = Path(out_dir)
+    profiler = None
+    try:
+        for idx, element in enumerate(iterable):
+            if idx == start:
+                profiler = torch.autograd.profiler.profile(**kwargs)
+                profiler.__enter__()
+            yield element
+            if profiler is not None and idx == start + num_examples - 1:
+                profiler.__exit__(None, None, None)
+                _export_trace(profiler, out_dir, use_cuda, profile_memory, row_limit)
+                profiler = None
+    finally:
+        # the iterable ended within the window
+        if profiler is not None:
+            profiler.__exit__(None, None, None)
+            _export_trace(profiler, out_dir, use_cuda, profile_memory, row_limit)
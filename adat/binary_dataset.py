@@ -0,0 +1,65 @@
+from pathlib import Path
+from typing import Callable, Dict, Union, Any
+import json
+
+import numpy as np
+
+from adat.ragged import RaggedArray, RaggedArrayWriter
+
+TEXT_KEYS = ("text", "seq_a", "seq_b")
+TARGET_DTYPES = {"label": "int64", "dist": "float32"}
+
+
+def binarize_jsonlines(
+        path: Union[str, Path],
+        output_dir: Union[str, Path],
+        token_to_index: Callable[[str], int]
+) -> Dict[str, Any]:
+    """
+    Converts jsonlines with `text` or `seq_a`/`seq_b` (and optionally `label`/`dist`) into a directory with
+    a ragged int32 array of whitespace-tokenized ids for every text key and a `.npy` array for every target.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(exist_ok=True, parents=True)
+    writers: Dict[str, RaggedArrayWriter] = dict()
+    targets: Dict[str, list] = dict()
+    size = 0
+    with open(path) as file:
+        for line in file:
+            if not line.strip():
+                continue
+            items = json.loads(line)
+            if not writers:
+                writers = {key: RaggedArrayWriter(output_dir / key, "int32") for key in TEXT_KEYS if key in items}
+                targets = {key: [] for key in TARGET_DTYPES if key in items}
+                assert writers, f"None of {TEXT_KEYS} found in {path}"
+            for key, writer in writers.items():
+                writer.append(np.array([token_to_index(token) for token in items[key].split()], dtype=np.int32))
+            for key, values in targets.items():
+                values.append(items[key])
+            size += 1
+
+    for writer in writers.values():
+        writer.close()
+    for key, values in targets.items():
+        np.save(output_dir / f"{key}.npy", np.array(values, dtype=TARGET_DTYPES[key]))
+
+    meta = {"size": size, "texts": list(writers), "targets": list(targets)}
+    with open(output_dir / "meta.json", "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+class BinaryDataset:
+    """Memory-mapped read access to a directory written by `binarize_jsonlines`."""
+
+    def __init__(self, directory: Union[str, Path]) -> None:
+        directory = Path(directory)
+        with open(directory / "meta.json") as f:
+            meta = json.load(f)
+        self.size = meta["size"]
+        self.texts = {key: RaggedArray(directory / key) for key in meta["texts"]}
+        self.targets = {key: np.load(directory / f"{key}.npy", mmap_mode="r") for key in meta["targets"]}
+
+    def __len__(self) -> int:
+        return self.size
@@ -0,0 +1,115 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from allennlp.data import DatasetReader, Instance, Token
+from allennlp.data.fields import TextField, ArrayField, LabelField
+from allennlp.data.token_indexers import TokenIndexer, SingleIdTokenIndexer
+
+from adat.binary_dataset import BinaryDataset
+
+# Readers of directories written by `scripts/binarize_dataset.py`. Tokens carry vocabulary ids only (`text_id`),
+# so the configs must use the vocabulary the data was binarized with (`"type": "from_files"`).
+
+
+def _ids_to_tokens(
+        ids: Iterable[int],
+        start_tokens: Sequence[str] = (),
+        end_tokens: Sequence[str] = ()
+) -> List[Token]:
+    return (
+        [Token(token) for token in start_tokens]
+        + [Token(text_id=int(idx)) for idx in ids]
+        + [Token(token) for token in end_tokens]
+    )
+
+
+@DatasetReader.register(name="binary_language_modeling")
+class BinaryLanguageModelingReader(DatasetReader):
+    """Binary counterpart of `simple_language_modeling_fixed`."""
+
+    def __init__(
+            self,
+            token_indexers: Dict[str, TokenIndexer] = None,
+            max_sequence_length: Optional[int] = None,
+            lazy: bool = False
+    ) -> None:
+        super().__init__(lazy)
+        self._token_indexers = token_indexers or {"tokens": SingleIdTokenIndexer()}
+        self._max_sequence_length = max_sequence_length
+
+    def _read(self, file_path):
+        dataset = BinaryDataset(file_path)
+        texts = dataset.texts["text"]
+        for idx in range(len(dataset)):
+            yield self.ids_to_instance(texts[idx])
+
+    def ids_to_instance(self, ids: np.ndarray) -> Instance:
+        # every sequence is kept as in `simple_language_modeling_fixed`, `max_sequence_length` only truncates
+        if self._max_sequence_length is not None:
+            ids = ids[:self._max_sequence_length]
+        tokens = _ids_to_tokens(ids, start_tokens=["<START>"], end_tokens=["<END>"])
+        return Instance({"source": TextField(tokens, self._token_indexers)})
+
+
+@DatasetReader.register(name="binary_text_classification")
+class BinaryTextClassificationReader(DatasetReader):
+    """Binary counterpart of `text_classification_json` (also used to train the masked LM)."""
+
+    def __init__(
+            self,
+            token_indexers: Dict[str, TokenIndexer] = None,
+            max_sequence_length: Optional[int] = None,
+            skip_label_indexing: bool = False,
+            lazy: bool = False
+    ) -> None:
+        super().__init__(lazy)
+        self._token_indexers = token_indexers or {"tokens": SingleIdTokenIndexer()}
+        self._max_sequence_length = max_sequence_length
+        self._skip_label_indexing = skip_label_indexing
+
+    def _read(self, file_path):
+        dataset = BinaryDataset(file_path)
+        texts = dataset.texts["text"]
+        labels = dataset.targets.get("label")
+        for idx in range(len(dataset)):
+            yield self.ids_to_instance(texts[idx], label=labels[idx] if labels is not None else None)
+
+    def ids_to_instance(self, ids: np.ndarray, label: Optional[int] = None) -> Instance:
+        if self._max_sequence_length is not None:
+            ids = ids[:self._max_sequence_length]
+        fields = {"tokens": TextField(_ids_to_tokens(ids), self._token_indexers)}
+        if label is not None:
+            if self._skip_label_indexing:
+                fields["label"] = LabelField(int(label), skip_indexing=True)
+            else:
+                fields["label"] = LabelField(str(label))
+        return Instance(fields)
+
+
+@DatasetReader.register(name="binary_deep_levenshtein")
+class BinaryDeepLevenshteinReader(DatasetReader):
+    """Binary counterpart of `deep_levenshtein`."""
+
+    def __init__(self, token_indexers: Dict[str, TokenIndexer] = None, lazy: bool = False) -> None:
+        super().__init__(lazy)
+        self._token_indexers = token_indexers or {"tokens": SingleIdTokenIndexer()}
+
+    def _read(self, file_path):
+        dataset = BinaryDataset(file_path)
+        sequences_a, sequences_b = dataset.texts["seq_a"], dataset.texts["seq_b"]
+        distances = dataset.targets.get("dist")
+        for idx in range(len(dataset)):
+            yield self.ids_to_instance(
+                sequences_a[idx],
+                sequences_b[idx],
+                distance=distances[idx] if distances is not None else None
+            )
+
+    def ids_to_instance(self, ids_a: np.ndarray, ids_b: np.ndarray, distance: Optional[float] = None) -> Instance:
+        fields = {
+            "sequence_a": TextField(_ids_to_tokens(ids_a), self._token_indexers),
+            "sequence_b": TextField(_ids_to_tokens(ids_b), self._token_indexers),
+        }
+        if distance is not None:
+            fields["distance"] = ArrayField(array=np.array([distance]))
+        return Instance(fields)
@@ -15,21 +15,24 @@ class DeepLevenshteinReader(DatasetReader):
             self,
             token_indexers: Dict[str, TokenIndexer],
             tokenizer: Tokenizer,
+            distance_field: str = "dist",
             lazy: bool = False
     ) -> None:
         super().__init__(lazy)
         self._token_indexers = token_indexers
         self._tokenizer = tokenizer
+        # e.g. `teacher_dist` to distill a model (see `scripts/distill_deep_levenshtein.py`)
+        self._distance_field = distance_field
 
     def _read(self, file_path):
         with open(cached_path(file_path), "r") as data_file:
-            for line in data_file.readlines():
-                if not line:
+            for line in data_file:
+                if not line.strip():
                     continue
                 items = json.loads(line)
                 seq_a = items["seq_a"]
                 seq_b = items["seq_b"]
-                dist = items.get("dist")
+                dist = items.get(self._distance_field)
                 instance = self.text_to_instance(sequence_a=seq_a, sequence_b=seq_b, distance=dist)
                 yield instance
 
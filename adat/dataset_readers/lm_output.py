@@ -0,0 +1,82 @@
+from typing import Dict, Optional
+import json
+
+import numpy as np
+from allennlp.common.file_utils import cached_path
+from allennlp.data import DatasetReader, Instance, Field
+from allennlp.data.fields import ArrayField, LabelField
+
+from adat.lm_output_cache import LMOutputCache, pad_lm_output
+
+
+def _lm_output_fields(cache: LMOutputCache, text: str, min_length: int, postfix: str = "") -> Dict[str, Field]:
+    ids, probs = pad_lm_output(*cache[text], min_length=min_length)
+    return {
+        f"lm_ids{postfix}": ArrayField(ids, padding_value=0, dtype=np.int64),
+        f"lm_probs{postfix}": ArrayField(probs, padding_value=0),
+    }
+
+
+@DatasetReader.register(name="lm_output_classification")
+class LMOutputClassificationReader(DatasetReader):
+    """
+    Reads `{"text": ..., "label": ...}` jsonlines and yields the cached top-k LM outputs of the texts
+    (see `scripts/precompute_lm_outputs.py`) instead of tokens, for `DistributionClassifier`.
+    """
+
+    def __init__(
+            self,
+            lm_output_cache: str,
+            min_length: int = 5,
+            skip_label_indexing: bool = False,
+            lazy: bool = False
+    ) -> None:
+        super().__init__(lazy)
+        self._cache = LMOutputCache(lm_output_cache)
+        self._min_length = min_length
+        self._skip_label_indexing = skip_label_indexing
+
+    def _read(self, file_path):
+        with open(cached_path(file_path), "r") as data_file:
+            for line in data_file:
+                if not line.strip():
+                    continue
+                items = json.loads(line)
+                yield self.text_to_instance(text=items["text"], label=items.get("label"))
+
+    def text_to_instance(self, text: str, label: Optional[int] = None) -> Instance:
+        fields = _lm_output_fields(self._cache, text, self._min_length)
+        if label is not None:
+            if self._skip_label_indexing:
+                fields["label"] = LabelField(int(label), skip_indexing=True)
+            else:
+                fields["label"] = LabelField(str(label))
+        return Instance(fields)
+
+
+@DatasetReader.register(name="lm_output_deep_levenshtein")
+class LMOutputDeepLevenshteinReader(DatasetReader):
+    """`DeepLevenshteinReader` counterpart of `LMOutputClassificationReader`, for `DistributionDeepLevenshtein`."""
+
+    def __init__(self, lm_output_cache: str, min_length: int = 5, lazy: bool = False) -> None:
+        super().__init__(lazy)
+        self._cache = LMOutputCache(lm_output_cache)
+        self._min_length = min_length
+
+    def _read(self, file_path):
+        with open(cached_path(file_path), "r") as data_file:
+            for line in data_file:
+                if not line.strip():
+                    continue
+                items = json.loads(line)
+                yield self.text_to_instance(
+                    sequence_a=items["seq_a"], sequence_b=items["seq_b"], distance=items.get("dist")
+                )
+
+    def text_to_instance(self, sequence_a: str, sequence_b: str, distance: Optional[float] = None) -> Instance:
+        fields = dict()
+        fields.update(_lm_output_fields(self._cache, sequence_a, self._min_length, postfix="_a"))
+        fields.update(_lm_output_fields(self._cache, sequence_b, self._min_length, postfix="_b"))
+        if distance is not None:
+            fields["distance"] = ArrayField(array=np.array([distance]))
+        return Instance(fields)
@@ -45,8 +45,8 @@ class SimpleLanguageModelingDatasetReaderFixed(SimpleLanguageModelingDatasetRead
 
     def _read(self, file_path):
         with open(cached_path(file_path), "r") as data_file:
-            for line in data_file.readlines():
-                if not line:
+            for line in data_file:
+                if not line.strip():
                     continue
                 items = json.loads(line)
                 sent = items.get("text")
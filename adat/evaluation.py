@@ -0,0 +1,112 @@
+from pathlib import Path
+from typing import List, Dict, Optional, Sequence
+import json
+
+import numpy as np
+import torch
+from allennlp.data import Batch, DatasetReader, Token
+from allennlp.data.tokenizers import Tokenizer
+from allennlp.models import load_archive
+from allennlp.nn.util import move_to_device
+
+from adat import register_all
+from adat.quantization import quantize_dynamic
+from adat.utils import (
+    length_bucketed_batches,
+    normalized_accuracy_drop,
+    normalized_accuracy_drop_with_perplexity
+)
+
+
+class MemoizedTokenizer(Tokenizer):
+    """Tokenizes every distinct text once. Readers with the same tokenizer config share the memo."""
+
+    def __init__(self, tokenizer: Tokenizer, memo: Optional[Dict[str, List[Token]]] = None) -> None:
+        self._tokenizer = tokenizer
+        self._memo = memo if memo is not None else dict()
+
+    def tokenize(self, text: str) -> List[Token]:
+        if text not in self._memo:
+            self._memo[text] = self._tokenizer.tokenize(text)
+        return self._memo[text]
+
+
+class ClassifierScorer:
+    """Runs a classifier archive over deduplicated texts in length-bucketed `no_grad` batches."""
+
+    def __init__(
+            self,
+            classifier_dir: str,
+            batch_size: int = 128,
+            cuda_device: int = -1,
+            tokenizer_memos: Optional[Dict[str, Dict[str, List[Token]]]] = None,
+            quantize: bool = False
+    ) -> None:
+        self.classifier_dir = Path(classifier_dir)
+        register_all()
+        archive = load_archive(self.classifier_dir / "model.tar.gz", cuda_device=cuda_device)
+        self.model = archive.model
+        self.model.eval()
+        if quantize:
+            assert cuda_device < 0, "quantized models run on CPU"
+            self.model = quantize_dynamic(self.model)
+        self.reader = DatasetReader.from_params(archive.config["dataset_reader"].duplicate())
+        self.batch_size = batch_size
+        self.cuda_device = cuda_device
+
+        if tokenizer_memos is not None:
+            tokenizer_params = archive.config["dataset_reader"].get("tokenizer", {})
+            tokenizer_config = json.dumps(tokenizer_params.as_dict(quiet=True), sort_keys=True)
+            memo = tokenizer_memos.setdefault(tokenizer_config, dict())
+            self.reader._tokenizer = MemoizedTokenizer(self.reader._tokenizer, memo)
+
+    @torch.no_grad()
+    def predict_probs(self, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        texts = list(dict.fromkeys(texts))
+        probs = dict()
+        for batch_indexes in length_bucketed_batches(texts, self.batch_size):
+            batch_texts = [texts[i] for i in batch_indexes]
+            batch = Batch([self.reader.text_to_instance(text) for text in batch_texts])
+            batch.index_instances(self.model.vocab)
+            tensors = move_to_device(batch.as_tensor_dict(), self.cuda_device)
+            batch_probs = self.model(tokens=tensors["tokens"])["probs"].cpu().numpy()
+            probs.update(zip(batch_texts, batch_probs))
+        return probs
+
+
+def calculate_attack_metrics(
+        wers: List[int],
+        y_true: List[int],
+        orig_probs: List[np.ndarray],
+        adv_probs: List[np.ndarray],
+        gamma: float = 1.0,
+        orig_perplexities: Optional[List[float]] = None,
+        adv_perplexities: Optional[List[float]] = None
+) -> Dict[str, Optional[float]]:
+    y_adv = [int(np.argmax(p)) for p in adv_probs]
+    prob_diffs = [p[y] - ap[y] for p, ap, y in zip(orig_probs, adv_probs, y_true)]
+
+    if orig_perplexities is not None and adv_perplexities is not None:
+        perp_diff = [max(0.0, ap - op) for op, ap in zip(orig_perplexities, adv_perplexities)]
+        mean_perplexity_rise = float(np.mean(perp_diff))
+        nad_with_perp = normalized_accuracy_drop_with_perplexity(
+            wers=wers,
+            y_true=y_true,
+            y_adv=y_adv,
+            perp_true=orig_perplexities,
+            perp_adv=adv_perplexities,
+            gamma=gamma
+        )
+    else:
+        mean_perplexity_rise = None
+        nad_with_perp = None
+
+    metrics = dict(
+        mean_prob_diff=float(np.mean(prob_diffs)),
+        mean_wer=float(np.mean(wers)),
+        mean_perplexity_rise=mean_perplexity_rise
+    )
+    metrics[f"NAD_{gamma}"] = normalized_accuracy_drop(wers=wers, y_true=y_true, y_adv=y_adv, gamma=gamma)
+    metrics["misclassification_error"] = float((np.array(y_true) != np.array(y_adv)).mean())
+    metrics[f"NAD_with_perplexity_{gamma}"] = nad_with_perp
+    return metrics
@@ -0,0 +1,65 @@
+from pathlib import Path
+from typing import Tuple, Union, Dict, List
+import json
+
+import numpy as np
+
+from adat.ragged import RaggedArray, RaggedArrayWriter
+
+
+class LMOutputCache:
+    """
+    Per-position top-k (token id, probability) pairs of a masked LM for a fixed set of texts.
+
+    Layout of `cache_dir`:
+        texts.json           -- list of texts, the position of a text is its index
+        ids.*                -- ragged int32 array (sequence_length, top_k) for every text
+        probs.*              -- ragged float16 array (sequence_length, top_k) for every text
+    `sequence_length` counts all the non-padding positions, including start/end tokens.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path]) -> None:
+        cache_dir = Path(cache_dir)
+        with open(cache_dir / "texts.json") as f:
+            self._index: Dict[str, int] = {text: i for i, text in enumerate(json.load(f))}
+        self._ids = RaggedArray(cache_dir / "ids")
+        self._probs = RaggedArray(cache_dir / "probs")
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        idx = self._index[text]
+        return self._ids[idx], self._probs[idx]
+
+    @staticmethod
+    def write(cache_dir: Union[str, Path], texts: List[str], outputs) -> None:
+        """`outputs` yields (ids, probs) of every text, in order."""
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(exist_ok=True, parents=True)
+        ids_writer = probs_writer = None
+        for ids, probs in outputs:
+            if ids_writer is None:
+                ids_writer = RaggedArrayWriter(cache_dir / "ids", "int32", row_shape=ids.shape[1:])
+                probs_writer = RaggedArrayWriter(cache_dir / "probs", "float16", row_shape=probs.shape[1:])
+            ids_writer.append(ids)
+            probs_writer.append(probs)
+
+        assert ids_writer is not None, "Nothing to write"
+        ids_writer.close()
+        probs_writer.close()
+        with open(cache_dir / "texts.json", "w") as f:
+            json.dump(texts, f)
+
+
+def pad_lm_output(ids: np.ndarray, probs: np.ndarray, min_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    # padded positions have zero probability mass, which is how the models tell them apart
+    num_missing = min_length - ids.shape[0]
+    if num_missing <= 0:
+        return np.asarray(ids, dtype=np.int64), np.asarray(probs, dtype=np.float32)
+    ids = np.concatenate([ids, np.zeros((num_missing, ids.shape[1]), dtype=ids.dtype)])
+    probs = np.concatenate([probs, np.zeros((num_missing, probs.shape[1]), dtype=probs.dtype)])
+    return ids.astype(np.int64), probs.astype(np.float32)
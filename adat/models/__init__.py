@@ -3,3 +3,4 @@ from .distribution_classifier import DistributionClassifier
 from .deep_levenshtein import DeepLevenshtein
 from .masked_lm import MaskedLanguageModel
 from .distribution_deep_levenshtein import DistributionDeepLevenshtein
+from .adversarial_training import AdversarialTrainingClassifier
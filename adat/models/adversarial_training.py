@@ -0,0 +1,144 @@
+from typing import Dict, Any, List, Optional
+import math
+
+import torch
+from allennlp.common.checks import ConfigurationError
+from allennlp.data import TextFieldTensors, DatasetReader, Vocabulary, Batch
+from allennlp.models.model import Model
+from allennlp.nn.util import get_text_field_mask, get_token_ids_from_text_field_tensors, move_to_device
+from allennlp.training.metrics import CategoricalAccuracy, Average
+
+from .classifier import BasicClassifierOneHotSupport
+
+
+@Model.register("adversarial_training_classifier")
+class AdversarialTrainingClassifier(Model):
+    """
+    Trains `classifier` on a mix of clean and adversarial examples. The adversarial examples are generated
+    on the fly by an embedding attacker (`fgsm` or `deepfool`) against the current weights, so attacking,
+    fine-tuning and evaluating robustness run in one `allennlp train` process.
+
+    `attacker` holds the attacker type and its parameters (`num_steps`, `epsilon`, ...), the attacker runs
+    on the device of the batches. `dataset_reader` turns adversarial sequences back into tensors,
+    use the reader of the config.
+    """
+
+    def __init__(
+        self,
+        vocab: Vocabulary,
+        classifier: BasicClassifierOneHotSupport,
+        dataset_reader: DatasetReader,
+        attacker: Dict[str, Any],
+        adversarial_ratio: float = 0.5,
+        adversarial_weight: float = 1.0,
+        attack_on_validation: bool = True
+    ) -> None:
+        super().__init__(vocab)
+        self._classifier = classifier
+        self._dataset_reader = dataset_reader
+        self._attacker_params = dict(attacker)
+        # the device comes from the batches
+        self._attacker_params.pop("device", None)
+        if self._attacker_params.get("type") not in ("fgsm", "deepfool"):
+            raise ConfigurationError(f"Unknown attacker type {self._attacker_params.get('type')}")
+        # moved to the device of the batches by the first `_attack`
+        self._attacker = self._build_attacker(device=-1)
+        self._classifier.train()
+        self._num_labels = self._classifier._num_labels
+
+        self._adversarial_ratio = adversarial_ratio
+        self._adversarial_weight = adversarial_weight
+        self._attack_on_validation = attack_on_validation
+
+        self._accuracy = CategoricalAccuracy()
+        self._adversarial_accuracy = CategoricalAccuracy()
+        self._attack_success_rate = Average()
+
+    def _build_attacker(self, device: int):
+        # imported here, `adat.attackers` imports the models to register them
+        from adat.attackers import FGSMAttacker, DeepFoolAttacker
+
+        params = dict(self._attacker_params)
+        attacker_cls = FGSMAttacker if params.pop("type") == "fgsm" else DeepFoolAttacker
+        attacker = attacker_cls(self._classifier, self._dataset_reader, device=device, **params)
+        # only the final adversarial sequences are trained on
+        attacker.set_history_every(0)
+        return attacker
+
+    def _tokens_to_sequences(self, tokens: TextFieldTensors) -> List[str]:
+        token_ids = get_token_ids_from_text_field_tensors(tokens)
+        mask = get_text_field_mask(tokens)
+        return [self._attacker.indexes_to_string(ids[m]) for ids, m in zip(token_ids, mask)]
+
+    def _attack(self, tokens: TextFieldTensors, label: torch.Tensor) -> Optional[Dict[str, Any]]:
+        num_to_attack = math.ceil(self._adversarial_ratio * label.size(0))
+        if num_to_attack == 0:
+            return None
+
+        sequences = self._tokens_to_sequences(tokens)[:num_to_attack]
+        labels = label[:num_to_attack]
+        device = labels.device.index if labels.is_cuda else -1
+
+        was_training = self._classifier.training
+        if device != self._attacker.device:
+            # the trainer (or `evaluate`) moved the model, the attacker caches its inputs on one device
+            self._attacker = self._build_attacker(device)
+        self._classifier.eval()
+        # attackers need gradients w.r.t. embeddings, also during validation
+        with torch.enable_grad():
+            outputs = self._attacker.attack_batch(sequences, labels.tolist())
+        # gradients of the attack must not leak into the optimizer step
+        self._classifier.zero_grad()
+        self._classifier.train(was_training)
+
+        for output in outputs:
+            self._attack_success_rate(float(output.adversarial_label != output.attacked_label))
+
+        batch = Batch([self._dataset_reader.text_to_instance(output.adversarial_sequence) for output in outputs])
+        batch.index_instances(self.vocab)
+        adversarial_tokens = move_to_device(batch.as_tensor_dict()["tokens"], device)
+        return {"tokens": adversarial_tokens, "label": labels}
+
+    def get_embeddings(self, tokens: TextFieldTensors) -> Dict[str, torch.Tensor]:
+        # the trained archive can be attacked like `BasicClassifierOneHotSupport`
+        return self._classifier.get_embeddings(tokens)
+
+    def forward_on_embeddings(
+            self,
+            embedded_text: torch.Tensor,
+            mask: torch.Tensor = None,
+            label: torch.IntTensor = None
+    ) -> Dict[str, torch.Tensor]:
+        return self._classifier.forward_on_embeddings(embedded_text, mask, label)
+
+    def forward(  # type: ignore
+        self, tokens: TextFieldTensors, label: torch.IntTensor = None
+    ) -> Dict[str, torch.Tensor]:
+        adversarial_inputs = None
+        if label is not None and (self.training or self._attack_on_validation):
+            adversarial_inputs = self._attack(tokens, label)
+
+        output_dict = self._classifier(tokens)
+        if label is not None:
+            output_dict["loss"] = self._classifier._loss(output_dict["logits"], label.long().view(-1))
+            self._accuracy(output_dict["logits"], label)
+
+        if adversarial_inputs is not None:
+            adversarial_label = adversarial_inputs["label"]
+            adversarial_logits = self._classifier(adversarial_inputs["tokens"])["logits"]
+            self._adversarial_accuracy(adversarial_logits, adversarial_label)
+            if self.training:
+                adversarial_loss = self._classifier._loss(adversarial_logits, adversarial_label.long().view(-1))
+                output_dict["loss"] = output_dict["loss"] + self._adversarial_weight * adversarial_loss
+
+        return output_dict
+
+    def make_output_human_readable(self, output_dict: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+        return self._classifier.make_output_human_readable(output_dict)
+
+    def get_metrics(self, reset: bool = False) -> Dict[str, float]:
+        return {
+            "accuracy": self._accuracy.get_metric(reset),
+            "adversarial_accuracy": self._adversarial_accuracy.get_metric(reset),
+            "attack_success_rate": self._attack_success_rate.get_metric(reset),
+        }
@@ -3,7 +3,7 @@ from typing import Dict, Union
 import torch
 from allennlp.models import BasicClassifier, Model
 from allennlp.nn.util import get_text_field_mask, get_token_ids_from_text_field_tensors
-from allennlp.data import TextFieldTensors
+from allennlp.data import TextFieldTensors, Vocabulary
 
 from .deep_levenshtein import OneHot
 
@@ -69,3 +69,19 @@ class BasicClassifierOneHotSupport(BasicClassifier):
         output_dict = self.forward_on_embeddings(emb_out["embedded_text"], emb_out["mask"], label)
         output_dict["token_ids"] = emb_out["token_ids"]
         return output_dict
+
+    @classmethod
+    def from_archive_warm_start(cls, vocab: Vocabulary, archive_file: str) -> "BasicClassifierOneHotSupport":
+        # fine-tuning starts from a trained classifier (e.g. `substitute_clf`): tokens of the new data
+        # that are missing in its vocabulary get new rows in the embedding matrix, the rest keep their indexes
+        model = Model.from_archive(archive_file)
+        assert isinstance(model, cls), f"{archive_file} is not a {cls.__name__} archive"
+        model.vocab.extend_from_vocab(vocab)
+        model.extend_embedder_vocab()
+        return model
+
+
+# An archive trained with it keeps only `archive_file` in its config: loading it (`allennlp evaluate`,
+# `ClassifierScorer`, ...) loads `archive_file` again before the fine-tuned weights, so the path must stay
+# valid from the working directory of every later load. Use an absolute path and keep the archive in place.
+Model.register("warm_start_classifier", constructor="from_archive_warm_start")(BasicClassifierOneHotSupport)
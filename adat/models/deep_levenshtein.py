@@ -1,4 +1,4 @@
-from typing import Dict, Optional, Union
+from typing import Dict, Optional, Union, Tuple
 
 import torch
 from allennlp.models import Model
@@ -43,6 +43,57 @@ class DeepLevenshtein(Model):
         embedded_sequence_vector = self.seq2vec_encoder(embedded_sequence, mask=mask)
         return embedded_sequence_vector
 
+    def distance_matrix(
+            self,
+            embedded_sequences_a: torch.Tensor,
+            embedded_sequences_b: torch.Tensor,
+            tile_size: int = 512
+    ) -> torch.Tensor:
+        """
+        Approximate distances between all the pairs of `encode_sequence` outputs,
+        (num_a, dim) x (num_b, dim) -> (num_a, num_b), every sequence is encoded once.
+        `linear([a, b, |a - b|])` is split into `a @ W_a + b @ W_b + |a - b| @ W_d + bias`,
+        only the `|a - b|` term is computed pairwise, in (tile_size, tile_size, dim) tiles.
+        """
+        w_a, w_b, w_d = self.linear.weight[0].split(self.seq2vec_encoder.get_output_dim())
+        distances = (
+            (embedded_sequences_a @ w_a).unsqueeze(1)
+            + (embedded_sequences_b @ w_b).unsqueeze(0)
+            + self.linear.bias
+        )
+        for i in range(0, embedded_sequences_a.size(0), tile_size):
+            tile_a = embedded_sequences_a[i:i + tile_size].unsqueeze(1)
+            for j in range(0, embedded_sequences_b.size(0), tile_size):
+                tile_b = embedded_sequences_b[j:j + tile_size].unsqueeze(0)
+                distances[i:i + tile_size, j:j + tile_size] += torch.abs(tile_a - tile_b) @ w_d
+        return distances
+
+    def topk_nearest(
+            self,
+            embedded_sequences_a: torch.Tensor,
+            embedded_sequences_b: torch.Tensor,
+            k: int,
+            tile_size: int = 512,
+            exclude_diagonal: bool = False
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Distances and indexes of `k` nearest `b` sequences for every `a` sequence, (num_a, k) each.
+        Only (tile_size, num_b) distances are kept in memory at a time.
+        `exclude_diagonal` skips the pairs with `i == j`, i.e. the sequence itself when `a` and `b` are the same set.
+        """
+        values, indexes = [], []
+        for i in range(0, embedded_sequences_a.size(0), tile_size):
+            distances = self.distance_matrix(embedded_sequences_a[i:i + tile_size], embedded_sequences_b, tile_size)
+            if exclude_diagonal:
+                rows = torch.arange(distances.size(0), device=distances.device)
+                columns = rows + i
+                valid = columns < distances.size(1)
+                distances[rows[valid], columns[valid]] = float("inf")
+            tile_values, tile_indexes = distances.topk(min(k, distances.size(1)), dim=1, largest=False)
+            values.append(tile_values)
+            indexes.append(tile_indexes)
+        return torch.cat(values), torch.cat(indexes)
+
     def forward(
         self,
         sequence_a: Union[OneHot, TextFieldTensors],
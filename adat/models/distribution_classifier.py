@@ -50,7 +50,24 @@ class DistributionClassifier(Model):
             label: torch.IntTensor = None
     ) -> Dict[str, torch.Tensor]:
         embedded_text = self._seq2vec_encoder(torch.softmax(lm_output["logits"], dim=-1), mask=lm_output["mask"])
+        return self._forward_on_embedded_text(embedded_text, label)
 
+    def forward_on_sparse_lm_output(
+            self,
+            lm_ids: torch.Tensor,
+            lm_probs: torch.Tensor,
+            label: torch.IntTensor = None
+    ) -> Dict[str, torch.Tensor]:
+        # cached top-k LM outputs, padded positions have no probability mass
+        mask = lm_probs.sum(dim=-1) > 0
+        embedded_text = self._seq2vec_encoder.forward_sparse(lm_ids, lm_probs, mask=mask)
+        return self._forward_on_embedded_text(embedded_text, label)
+
+    def _forward_on_embedded_text(
+            self,
+            embedded_text: torch.Tensor,
+            label: torch.IntTensor = None
+    ) -> Dict[str, torch.Tensor]:
         if self._dropout:
             embedded_text = self._dropout(embedded_text)
 
@@ -67,11 +84,18 @@ class DistributionClassifier(Model):
         return output_dict
 
     def forward(
-        self, tokens: TextFieldTensors, label: torch.IntTensor = None
+        self,
+        tokens: TextFieldTensors = None,
+        label: torch.IntTensor = None,
+        lm_ids: torch.Tensor = None,
+        lm_probs: torch.Tensor = None
     ) -> Dict[str, torch.Tensor]:
+        # `lm_ids` and `lm_probs` come from `lm_output_classification` reader
+        if lm_ids is not None:
+            return self.forward_on_sparse_lm_output(lm_ids, lm_probs, label)
 
         with torch.no_grad():
-            lm_output = self._masked_lm(tokens)
+            lm_output = self._masked_lm.forward_inference(tokens)
 
         output_dict = self.forward_on_lm_output(lm_output, label)
         output_dict["token_ids"] = util.get_token_ids_from_text_field_tensors(tokens)
@@ -94,7 +118,8 @@ class DistributionClassifier(Model):
             classes.append(label_str)
         output_dict["label"] = classes
         tokens = []
-        for instance_tokens in output_dict["token_ids"]:
+        # input tokens are not available when training on cached LM outputs
+        for instance_tokens in output_dict.get("token_ids", []):
             tokens.append(
                 [
                     self.vocab.get_token_from_index(token_id.item(), namespace=self._namespace)
@@ -39,6 +39,14 @@ class DistributionDeepLevenshtein(Model):
     ) -> Dict[str, torch.Tensor]:
         embedded_sequence_a = self.encode_sequence(lm_output_a["logits"], lm_output_a["mask"])
         embedded_sequence_b = self.encode_sequence(lm_output_b["logits"], lm_output_b["mask"])
+        return self._forward_on_embedded_sequences(embedded_sequence_a, embedded_sequence_b, distance)
+
+    def _forward_on_embedded_sequences(
+            self,
+            embedded_sequence_a: torch.Tensor,
+            embedded_sequence_b: torch.Tensor,
+            distance: Optional[torch.Tensor] = None
+    ) -> Dict[str, torch.Tensor]:
         diff = torch.abs(embedded_sequence_a - embedded_sequence_b)
 
         representation = torch.cat([embedded_sequence_a, embedded_sequence_b, diff], dim=-1)
@@ -49,16 +57,36 @@ class DistributionDeepLevenshtein(Model):
             output_dict["loss"] = self._loss(approx_distance.view(-1), distance.view(-1))
         return output_dict
 
+    def forward_on_sparse_lm_output(
+            self,
+            lm_ids_a: torch.Tensor,
+            lm_probs_a: torch.Tensor,
+            lm_ids_b: torch.Tensor,
+            lm_probs_b: torch.Tensor,
+            distance: Optional[torch.Tensor] = None
+    ) -> Dict[str, torch.Tensor]:
+        # cached top-k LM outputs, padded positions have no probability mass
+        embedded_sequence_a = self.seq2vec_encoder.forward_sparse(lm_ids_a, lm_probs_a, mask=lm_probs_a.sum(-1) > 0)
+        embedded_sequence_b = self.seq2vec_encoder.forward_sparse(lm_ids_b, lm_probs_b, mask=lm_probs_b.sum(-1) > 0)
+        return self._forward_on_embedded_sequences(embedded_sequence_a, embedded_sequence_b, distance)
+
     def forward(
         self,
-        sequence_a: TextFieldTensors,
-        sequence_b: TextFieldTensors,
+        sequence_a: TextFieldTensors = None,
+        sequence_b: TextFieldTensors = None,
         distance: Optional[torch.Tensor] = None,
+        lm_ids_a: torch.Tensor = None,
+        lm_probs_a: torch.Tensor = None,
+        lm_ids_b: torch.Tensor = None,
+        lm_probs_b: torch.Tensor = None,
     ) -> Dict[str, torch.Tensor]:
+        # `lm_*` tensors come from `lm_output_deep_levenshtein` reader
+        if lm_ids_a is not None:
+            return self.forward_on_sparse_lm_output(lm_ids_a, lm_probs_a, lm_ids_b, lm_probs_b, distance)
 
         with torch.no_grad():
-            lm_output_a = self._masked_lm(sequence_a)
-            lm_output_b = self._masked_lm(sequence_b)
+            lm_output_a = self._masked_lm.forward_inference(sequence_a)
+            lm_output_b = self._masked_lm.forward_inference(sequence_b)
 
         output_dict = self.forward_on_lm_output(lm_output_a, lm_output_b, distance)
         return output_dict
@@ -1,4 +1,4 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 
 import torch
 
@@ -37,6 +37,26 @@ class MaskedLanguageModel(Model):
         self._loss = torch.nn.CrossEntropyLoss(ignore_index=ignore_index)
         self._perplexity = Perplexity()
 
+    def _encode(self, tokens: TextFieldTensors, mask: torch.Tensor) -> torch.Tensor:
+        embeddings = self._text_field_embedder(tokens)
+        return self._seq2seq_encoder(embeddings, mask)
+
+    def forward_inference(
+        self,
+        tokens: TextFieldTensors,
+        outputs: Tuple[str, ...] = ("logits", "mask")
+    ) -> Dict[str, torch.Tensor]:
+        """
+        Returns only the requested `outputs` (`contextual_embeddings`, `logits` and/or `mask`).
+        Tokens are never masked, loss and perplexity are not computed, and the full-vocab head
+        runs only if `logits` are requested. Gradients are kept, attacks backpropagate through the logits.
+        """
+        mask = get_text_field_mask(tokens)
+        output_dict = dict(mask=mask, contextual_embeddings=self._encode(tokens, mask))
+        if "logits" in outputs:
+            output_dict["logits"] = self._head(output_dict["contextual_embeddings"])
+        return {name: output_dict[name] for name in outputs}
+
     def forward(
         self,
         tokens: TextFieldTensors,
@@ -49,8 +69,7 @@ class MaskedLanguageModel(Model):
         else:
             targets = tokens
 
-        embeddings = self._text_field_embedder(tokens)
-        contextual_embeddings = self._seq2seq_encoder(embeddings, mask)
+        contextual_embeddings = self._encode(tokens, mask)
 
         # take PAD tokens into account when decoding
         logits = self._head(contextual_embeddings)
@@ -69,5 +88,30 @@ class MaskedLanguageModel(Model):
         self._perplexity(output_dict["loss"])
         return output_dict
 
+    @torch.no_grad()
+    def sequence_perplexity(self, tokens: TextFieldTensors, seed: int = 0) -> torch.Tensor:
+        """
+        (batch_size, ) perplexities of every sequence, the loss of `forward` without metric updates:
+        the inputs are masked by the tokens masker, the loss is averaged over all non-padding tokens.
+        The masker draws from a generator seeded by `seed` for every sequence,
+        so the score of a sequence depends neither on its batch nor on the global random state.
+        """
+        assert set(tokens) == {"tokens"} and set(tokens["tokens"]) == {"tokens"}, \
+            "sequence_perplexity supports a single `tokens` indexer with `tokens` ids only"
+        mask = get_text_field_mask(tokens)
+        targets = tokens["tokens"]["tokens"]
+        token_ids = targets
+        if self._tokens_masker is not None:
+            token_ids = targets.clone()
+            for i, length in enumerate(mask.sum(dim=-1).tolist()):
+                sequence = {"tokens": {"tokens": targets[i:i + 1, :length].cpu().clone()}}
+                masked, _ = self._tokens_masker.mask_tokens(sequence, generator=torch.Generator().manual_seed(seed))
+                token_ids[i, :length] = masked["tokens"]["tokens"][0].to(token_ids.device)
+
+        logits = self.forward_inference({"tokens": {"tokens": token_ids}}, outputs=("logits", ))["logits"]
+        losses = torch.nn.functional.cross_entropy(logits.transpose(1, 2), targets, reduction="none")
+        losses = (losses * mask).sum(dim=-1) / mask.sum(dim=-1).clamp(min=1)
+        return torch.exp(losses)
+
     def get_metrics(self, reset: bool = False):
         return {"perplexity": self._perplexity.get_metric(reset=reset)}
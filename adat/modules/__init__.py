@@ -1 +1 @@
-from .distribution_cnn import DistributionCnnEncoder
+from .distribution_cnn import DistributionCnnEncoder, DistributionProjectionCnnEncoder
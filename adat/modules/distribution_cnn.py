@@ -1,10 +1,24 @@
+from typing import Tuple, Optional
+
+import torch
 from allennlp.common import Params
 from allennlp.data import Vocabulary
 from allennlp.modules.seq2vec_encoders import CnnEncoder, Seq2VecEncoder
 
 
+def densify_distribution(ids: torch.Tensor, probs: torch.Tensor, vocab_size: int) -> torch.Tensor:
+    # (batch_size, sequence_length, top_k) pairs -> (batch_size, sequence_length, vocab_size) distribution
+    distribution = probs.new_zeros(*ids.shape[:-1], vocab_size)
+    return distribution.scatter_(-1, ids.long(), probs)
+
+
 @Seq2VecEncoder.register("distribution_cnn")
 class DistributionCnnEncoder(CnnEncoder):
+
+    def forward_sparse(self, ids: torch.Tensor, probs: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
+        # top-k LM outputs (see `adat.lm_output_cache`), `embedding_dim` is the vocab size here
+        return self(densify_distribution(ids, probs, self.get_input_dim()), mask=mask)
+
     @classmethod
     def from_params(cls, params: Params, vocab: Vocabulary, **extras) -> "DistributionCnnEncoder":
         embedding_dim = params.pop_int("embedding_dim", vocab.get_vocab_size("tokens"))
@@ -14,3 +28,62 @@ class DistributionCnnEncoder(CnnEncoder):
         params.assert_empty(cls.__name__)
 
         return cls(embedding_dim=embedding_dim, num_filters=num_filters, ngram_filter_sizes=ngram_filter_sizes)
+
+
+@Seq2VecEncoder.register("distribution_projection_cnn")
+class DistributionProjectionCnnEncoder(Seq2VecEncoder):
+    """
+    Projects (batch_size, sequence_length, vocab_size) distributions to `projection_dim` with a learned
+    embedding matrix (the expected token embedding) and runs a `CnnEncoder` over them, so the number of
+    convolution parameters does not depend on the vocab size.
+    """
+
+    def __init__(
+            self,
+            vocab_size: int,
+            projection_dim: int,
+            num_filters: int,
+            ngram_filter_sizes: Tuple[int, ...] = (2, 3, 4, 5),
+            output_dim: Optional[int] = None
+    ) -> None:
+        super().__init__()
+        self._vocab_size = vocab_size
+        self._projection = torch.nn.Embedding(vocab_size, projection_dim)
+        self._cnn_encoder = CnnEncoder(
+            embedding_dim=projection_dim,
+            num_filters=num_filters,
+            ngram_filter_sizes=ngram_filter_sizes,
+            output_dim=output_dim
+        )
+
+    def get_input_dim(self) -> int:
+        return self._vocab_size
+
+    def get_output_dim(self) -> int:
+        return self._cnn_encoder.get_output_dim()
+
+    def forward(self, tokens: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
+        return self._cnn_encoder(tokens.matmul(self._projection.weight), mask=mask)
+
+    def forward_sparse(self, ids: torch.Tensor, probs: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
+        # (batch_size, sequence_length, top_k, projection_dim) -> (batch_size, sequence_length, projection_dim)
+        projected = (self._projection(ids.long()) * probs.unsqueeze(-1)).sum(dim=-2)
+        return self._cnn_encoder(projected, mask=mask)
+
+    @classmethod
+    def from_params(cls, params: Params, vocab: Vocabulary, **extras) -> "DistributionProjectionCnnEncoder":
+        vocab_size = params.pop_int("vocab_size", vocab.get_vocab_size("tokens"))
+        projection_dim = params.pop_int("projection_dim")
+        num_filters = params.pop_int("num_filters")
+        ngram_filter_sizes = params.pop("ngram_filter_sizes", (2, 3, 4, 5))
+        output_dim = params.pop_int("output_dim", None)
+
+        params.assert_empty(cls.__name__)
+
+        return cls(
+            vocab_size=vocab_size,
+            projection_dim=projection_dim,
+            num_filters=num_filters,
+            ngram_filter_sizes=ngram_filter_sizes,
+            output_dim=output_dim
+        )
@@ -0,0 +1,129 @@
+from pathlib import Path
+from typing import List, Sequence, Optional, Dict
+import json
+import os
+
+import torch
+from allennlp.data import Batch, DatasetReader, TextFieldTensors
+from allennlp.models import Model, load_archive
+from allennlp.nn.util import get_text_field_mask, move_to_device
+
+from adat import register_all
+from adat.utils import archive_hash, length_bucketed_batches
+
+# masks of the masked LM are drawn from it, see `MaskedLanguageModel.sequence_perplexity`
+MASK_SEED = 0
+
+
+@torch.no_grad()
+def _language_model_perplexity(model: Model, source: TextFieldTensors) -> torch.Tensor:
+    # per-sequence version of `allennlp_models.lm.LanguageModel.forward` loss,
+    # the contextualizer runs on the whole batch and only the softmax loss is split by sequence
+    mask = get_text_field_mask(source)
+    token_ids = source["tokens"]["tokens"]
+    embeddings = model._text_field_embedder(source)
+    contextual_embeddings = model._contextualizer(embeddings, mask)
+
+    forward_targets = torch.zeros_like(token_ids)
+    forward_targets[:, 0:-1] = token_ids[:, 1:]
+    if model._bidirectional:
+        backward_targets = torch.zeros_like(token_ids)
+        backward_targets[:, 1:] = token_ids[:, 0:-1]
+        forward_embeddings, backward_embeddings = contextual_embeddings.chunk(2, -1)
+        directions = [(0, forward_embeddings, forward_targets), (1, backward_embeddings, backward_targets)]
+    else:
+        directions = [(0, contextual_embeddings, forward_targets)]
+
+    losses = []
+    for i in range(token_ids.size(0)):
+        loss = sum(
+            model._loss_helper(direction, direction_embeddings[i:i + 1], targets[i:i + 1], None)
+            for direction, direction_embeddings, targets in directions
+        )
+        num_targets = (forward_targets[i] > 0).sum().clamp(min=1).float()
+        losses.append(loss / (len(directions) * num_targets))
+
+    return torch.exp(torch.stack(losses))
+
+
+def sequence_perplexity(model: Model, tokens: TextFieldTensors) -> torch.Tensor:
+    if hasattr(model, "sequence_perplexity"):
+        return model.sequence_perplexity(tokens, seed=MASK_SEED)
+    return _language_model_perplexity(model, tokens)
+
+
+class PerplexityScorer:
+    """
+    Batched perplexity of raw sequences under a (masked) language model archive.
+
+    Sequences are deduplicated, grouped into batches of similar length and scored under `no_grad`.
+    Scores are memoized and, if `cache_path` is given, persisted, so the original sequences of a dataset
+    are scored only once for all the attackers.
+    """
+
+    def __init__(
+            self,
+            model: Model,
+            reader: DatasetReader,
+            batch_size: int = 64,
+            cuda_device: int = -1,
+            cache_path: Optional[str] = None,
+            cache_key: Optional[str] = None
+    ) -> None:
+        self.model = model
+        self.model.eval()
+        self.reader = reader
+        self.batch_size = batch_size
+        self.cuda_device = cuda_device
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self.cache_key = cache_key
+        self._cache: Dict[str, float] = dict()
+
+        if self.cache_path is not None and self.cache_path.exists():
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+            if cache.get("key") == self.cache_key:
+                self._cache = cache["perplexities"]
+
+    @classmethod
+    def from_path(
+            cls,
+            lm_dir: str,
+            batch_size: int = 64,
+            cuda_device: int = -1,
+            cache_path: Optional[str] = None
+    ) -> "PerplexityScorer":
+        archive_path = Path(lm_dir) / "model.tar.gz"
+        register_all()
+        archive = load_archive(archive_path, cuda_device=cuda_device)
+        reader = DatasetReader.from_params(archive.config["dataset_reader"])
+        return cls(
+            archive.model,
+            reader,
+            batch_size=batch_size,
+            cuda_device=cuda_device,
+            cache_path=cache_path,
+            cache_key=f"{archive_hash(str(archive_path))}:{MASK_SEED}"
+        )
+
+    def _score_batch(self, sequences: List[str]) -> List[float]:
+        batch = Batch([self.reader.text_to_instance(sequence) for sequence in sequences])
+        batch.index_instances(self.model.vocab)
+        tensors = move_to_device(batch.as_tensor_dict(), self.cuda_device)
+        # the only text field: `source` for the LM reader, `tokens` for the text classification one
+        tokens = next(value for value in tensors.values() if isinstance(value, dict))
+        return sequence_perplexity(self.model, tokens).tolist()
+
+    def score(self, sequences: Sequence[str]) -> List[float]:
+        to_score = [sequence for sequence in dict.fromkeys(sequences) if sequence not in self._cache]
+        for batch_indexes in length_bucketed_batches(to_score, self.batch_size):
+            batch = [to_score[i] for i in batch_indexes]
+            self._cache.update(zip(batch, self._score_batch(batch)))
+
+        if to_score and self.cache_path is not None:
+            # evaluations of several attackers share the file, they never read a partial one
+            tmp_path = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({"key": self.cache_key, "perplexities": self._cache}, f)
+            os.replace(tmp_path, self.cache_path)
+        return [self._cache[sequence] for sequence in sequences]
@@ -0,0 +1,27 @@
+from copy import deepcopy
+from typing import Set, Type
+import io
+
+import torch
+
+# module types with int8 dynamically quantized counterparts, GRU needs torch>=1.6
+QUANTIZABLE_MODULES: Set[Type[torch.nn.Module]] = {torch.nn.Linear, torch.nn.LSTM}
+if hasattr(torch.nn.quantized.dynamic, "GRU"):
+    QUANTIZABLE_MODULES.add(torch.nn.GRU)
+
+
+def quantize_dynamic(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    A copy of `model` with int8 weights in its linear and recurrent layers, activations are quantized
+    on the fly. Embeddings and convolutions stay fp32. CPU only and without gradients: use the copy
+    for scoring, keep the original wherever gradients flow (e.g. the Gumbel path of Cascada).
+    """
+    model = deepcopy(model).cpu().eval()
+    return torch.quantization.quantize_dynamic(model, QUANTIZABLE_MODULES, dtype=torch.qint8, inplace=True)
+
+
+def model_size_mb(model: torch.nn.Module) -> float:
+    # quantized layers keep their weights packed, so the state dict is measured serialized
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return len(buffer.getvalue()) / 2 ** 20
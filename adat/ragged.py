@@ -0,0 +1,62 @@
+from pathlib import Path
+from typing import Tuple, Union
+import json
+
+import numpy as np
+
+
+class RaggedArrayWriter:
+    """
+    Appends variable-length arrays of shape (length, *row_shape) to `{prefix}.values.bin`.
+    `{prefix}.offsets.npy` and `{prefix}.meta.json` are written on `close`.
+    """
+
+    def __init__(self, prefix: Union[str, Path], dtype: str, row_shape: Tuple[int, ...] = ()) -> None:
+        self.prefix = Path(prefix)
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self._values_file = open(f"{self.prefix}.values.bin", "wb")
+        self._offsets = [0]
+
+    def append(self, array: np.ndarray) -> None:
+        array = np.ascontiguousarray(array, dtype=self.dtype)
+        assert array.shape[1:] == self.row_shape, f"{array.shape[1:]} != {self.row_shape}"
+        self._values_file.write(array.tobytes())
+        self._offsets.append(self._offsets[-1] + array.shape[0])
+
+    def close(self) -> None:
+        self._values_file.close()
+        np.save(f"{self.prefix}.offsets.npy", np.array(self._offsets, dtype=np.int64))
+        with open(f"{self.prefix}.meta.json", "w") as f:
+            json.dump({"dtype": self.dtype.str, "row_shape": list(self.row_shape)}, f)
+
+    def __enter__(self) -> "RaggedArrayWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class RaggedArray:
+    """Memory-mapped read access to arrays written by `RaggedArrayWriter`."""
+
+    def __init__(self, prefix: Union[str, Path]) -> None:
+        with open(f"{prefix}.meta.json") as f:
+            meta = json.load(f)
+        self.offsets = np.load(f"{prefix}.offsets.npy")
+        row_shape = tuple(meta["row_shape"])
+        if self.offsets[-1] > 0:
+            values = np.memmap(f"{prefix}.values.bin", dtype=np.dtype(meta["dtype"]), mode="r")
+        else:
+            # numpy can't memory-map empty files
+            values = np.empty(0, dtype=np.dtype(meta["dtype"]))
+        self.values = values.reshape(-1, *row_shape)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        return self.values[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
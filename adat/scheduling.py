@@ -0,0 +1,49 @@
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Sequence, TypeVar
+import heapq
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def length_scheduled_batches(lengths: Sequence[int], batch_size: int, num_workers: int = 1) -> List[List[List[int]]]:
+    """
+    Indexes grouped into batches of similar length, and the batches of every worker in processing order.
+    Batches cost `batch size * longest length` (padding included), the most expensive ones go first,
+    each to the least loaded worker (longest processing time first), so no worker ends with a long tail.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: (-lengths[i], i))
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    # the first index of a batch is its longest
+    costs = [len(batch) * max(lengths[batch[0]], 1) for batch in batches]
+
+    schedule = [[] for _ in range(num_workers)]
+    loads = [(0, worker) for worker in range(num_workers)]
+    for idx in sorted(range(len(batches)), key=lambda i: (-costs[i], i)):
+        load, worker = heapq.heappop(loads)
+        schedule[worker].append(batches[idx])
+        heapq.heappush(loads, (load + costs[idx], worker))
+    return schedule
+
+
+def map_length_scheduled(
+        fn: Callable[[List[T]], List[R]],
+        items: Iterable[T],
+        length: Callable[[T], int],
+        window_size: int,
+        batch_size: int = 1
+) -> Iterator[R]:
+    """
+    `fn` applied to batches of similar length, longest first, within windows of `window_size` items.
+    Results are yielded in the order of `items`, only a window is held in memory.
+    """
+    items = iter(items)
+    while True:
+        window = list(islice(items, window_size))
+        if not window:
+            return
+        results = [None] * len(window)
+        for batch in length_scheduled_batches([length(item) for item in window], batch_size)[0]:
+            for idx, result in zip(batch, fn([window[i] for i in batch])):
+                results[idx] = result
+        yield from results
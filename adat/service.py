@@ -0,0 +1,231 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import socket
+import time
+
+from adat.attackers import Attacker
+
+# Protocol: one JSON object per line in both directions.
+#   {"id": 1, "text": "...", "label": 0}  ->  {"id": 1, "output": {AttackerOutput.to_dict()}}
+#                                         or  {"id": 1, "error": "..."}
+#   {"type": "metrics"}                   ->  {"metrics": {...}}
+# Responses are written as soon as their batch is done, so they may come out of order.
+
+
+class _Request:
+    __slots__ = ("sequence", "label", "future", "enqueued_at")
+
+    def __init__(self, sequence: str, label: int, future: asyncio.Future) -> None:
+        self.sequence = sequence
+        self.label = label
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+class AttackServer:
+    """
+    Keeps `attacker` (and its models) resident and serves attacks over a TCP or Unix socket.
+    Requests of all connections are queued and coalesced into batches of up to `max_batch_size`,
+    a batch waits at most `max_latency_ms` for more requests after its first one. Batching pays off
+    only for attackers that override `attack_batch` (FGSM), keep `max_batch_size=1` for the rest:
+    their batches are attacked one example at a time and answered when the last one is done.
+    Batches run one at a time in a worker thread, the attackers and their models are not thread-safe.
+    """
+
+    def __init__(
+            self,
+            attacker: Attacker,
+            max_batch_size: int = 1,
+            max_latency_ms: float = 10.0,
+            attack_kwargs: Optional[Dict[str, Any]] = None,
+            num_latencies: int = 1000
+    ) -> None:
+        self.attacker = attacker
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.attack_kwargs = attack_kwargs or dict()
+
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Future] = None
+        self._server = None
+
+        self._num_requests = 0
+        self._num_errors = 0
+        self._num_batches = 0
+        self._in_flight = 0
+        self._latencies = deque(maxlen=num_latencies)
+        self._queue_waits = deque(maxlen=num_latencies)
+        self._batch_sizes = deque(maxlen=num_latencies)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, path: Optional[str] = None):
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.ensure_future(self._batch_loop())
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+        self._executor.shutdown(wait=True)
+
+    def submit(self, sequence: str, label: int) -> asyncio.Future:
+        future = asyncio.get_event_loop().create_future()
+        self._queue.put_nowait(_Request(sequence, label, future))
+        self._num_requests += 1
+        return future
+
+    def metrics(self) -> Dict[str, Any]:
+        latencies = [1000 * latency for latency in self._latencies]
+        queue_waits = [1000 * wait for wait in self._queue_waits]
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "requests": self._num_requests,
+            "errors": self._num_errors,
+            "batches": self._num_batches,
+            "mean_batch_size": sum(self._batch_sizes) / len(self._batch_sizes) if self._batch_sizes else None,
+            "latency_ms_p50": _percentile(latencies, 0.5),
+            "latency_ms_p95": _percentile(latencies, 0.95),
+            "queue_wait_ms_p50": _percentile(queue_waits, 0.5),
+            "queue_wait_ms_p95": _percentile(queue_waits, 0.95),
+        }
+
+    async def _next_batch(self) -> List[_Request]:
+        loop = asyncio.get_event_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _attack(self, batch: List[_Request]) -> List[Any]:
+        # outputs, or the exceptions of the failed attacks
+        loop = asyncio.get_event_loop()
+        try:
+            return await loop.run_in_executor(
+                self._executor,
+                lambda: self.attacker.attack_batch(
+                    [request.sequence for request in batch],
+                    [request.label for request in batch],
+                    **self.attack_kwargs
+                )
+            )
+        except Exception as e:
+            if len(batch) == 1:
+                return [e]
+        # one failing example must not fail the rest of its batch
+        results = []
+        for request in batch:
+            results.extend(await self._attack([request]))
+        return results
+
+    async def _batch_loop(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            started_at = time.perf_counter()
+            self._in_flight = len(batch)
+            try:
+                results = await self._attack(batch)
+            finally:
+                self._in_flight = 0
+
+            finished_at = time.perf_counter()
+            self._num_batches += 1
+            self._batch_sizes.append(len(batch))
+            for request, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    self._num_errors += 1
+                    request.future.set_exception(result)
+                else:
+                    request.future.set_result(result)
+                self._queue_waits.append(started_at - request.enqueued_at)
+                self._latencies.append(finished_at - request.enqueued_at)
+
+    async def _respond(self, request_id: Any, future: asyncio.Future, writer, lock: asyncio.Lock) -> None:
+        try:
+            response = {"id": request_id, "output": (await future).to_dict()}
+        except Exception as e:
+            response = {"id": request_id, "error": repr(e)}
+        await self._write(response, writer, lock)
+
+    @staticmethod
+    async def _write(response: Dict[str, Any], writer, lock: asyncio.Lock) -> None:
+        # `drain` must not be awaited concurrently
+        async with lock:
+            writer.write((json.dumps(response) + "\n").encode("utf-8"))
+            await writer.drain()
+
+    async def _handle_connection(self, reader, writer) -> None:
+        lock = asyncio.Lock()
+        responses = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            message = None
+            try:
+                message = json.loads(line)
+                if message.get("type") == "metrics":
+                    await self._write({"metrics": self.metrics()}, writer, lock)
+                    continue
+                sequence, label = message["text"], int(message["label"])
+                if not isinstance(sequence, str) or not sequence.strip():
+                    raise ValueError("text must be a non-empty string")
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                self._num_errors += 1
+                request_id = message.get("id") if isinstance(message, dict) else None
+                await self._write({"id": request_id, "error": repr(e)}, writer, lock)
+                continue
+            future = self.submit(sequence, label)
+            responses.append(asyncio.ensure_future(self._respond(message.get("id"), future, writer, lock)))
+
+        await asyncio.gather(*responses)
+        writer.close()
+
+
+def request_attacks(
+        requests: List[Dict[str, Any]],
+        path: Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Sends `{"text": ..., "label": ...}` requests over one connection, responses in the order of the requests."""
+    if path is not None:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(path)
+    else:
+        connection = socket.create_connection((host, port))
+
+    with connection, connection.makefile("rw", encoding="utf-8") as stream:
+        for idx, request in enumerate(requests):
+            stream.write(json.dumps({"id": idx, **request}) + "\n")
+        stream.flush()
+        connection.shutdown(socket.SHUT_WR)
+        responses = [json.loads(line) for line in stream if line.strip()]
+    return sorted(responses, key=lambda response: response["id"])
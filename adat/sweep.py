@@ -0,0 +1,45 @@
+from typing import Dict, Any, Callable, List
+import math
+
+
+def halving_schedule(min_examples: int, max_examples: int, eta: int = 3) -> List[int]:
+    assert 0 < min_examples <= max_examples and eta > 1
+    schedule = []
+    num_examples = min_examples
+    while num_examples < max_examples:
+        schedule.append(num_examples)
+        num_examples *= eta
+    schedule.append(max_examples)
+    return schedule
+
+
+def successive_halving(
+        candidates: Dict[str, Any],
+        evaluate: Callable[[str, Any, int], Dict[str, float]],
+        min_examples: int,
+        max_examples: int,
+        eta: int = 3,
+        metric: str = "NAD_1.0"
+) -> List[Dict[str, Any]]:
+    """
+    Evaluates all `candidates` on `min_examples` examples, keeps the best `1 / eta` of them by `metric`
+    and repeats on `eta` times more examples until `max_examples` is reached.
+
+    `evaluate(name, candidate, num_examples)` must return a dict of metrics containing `metric`.
+    Returns one row per (candidate, rung) evaluation.
+    """
+    survivors = list(candidates)
+    rows = []
+    schedule = halving_schedule(min_examples, max_examples, eta)
+    for rung, num_examples in enumerate(schedule):
+        scores = dict()
+        for name in survivors:
+            metrics = evaluate(name, candidates[name], num_examples)
+            scores[name] = metrics[metric]
+            rows.append({"config_num": name, "rung": rung, "num_examples": num_examples, **metrics})
+
+        if rung < len(schedule) - 1:
+            num_to_keep = max(1, math.ceil(len(survivors) / eta))
+            survivors = sorted(survivors, key=lambda x: scores[x], reverse=True)[:num_to_keep]
+
+    return rows
@@ -0,0 +1,25 @@
+from adat.attackers.adaptive import AdaptiveController
+
+
+def test_adaptive_controller_skips_unpromising_steps():
+    controller = AdaptiveController(evaluate_below=0.3, max_skipped=2, patience=10, max_samples=3)
+    controller.reset(num_samples=1)
+
+    evaluated = []
+    for approx_prob in [0.9, 0.95, 0.95, 0.95, 0.95, 0.8, 0.2]:
+        controller.observe(loss=1.0, approx_prob=approx_prob)
+        evaluated.append(controller.should_evaluate())
+    # new minimums and probabilities below `evaluate_below` are evaluated, others at least every third step
+    assert evaluated == [True, False, False, True, False, True, True]
+    assert controller.num_samples == 2
+
+
+def test_adaptive_controller_stops_on_plateau():
+    controller = AdaptiveController(patience=2, min_delta=0.1)
+    for loss in [10.0, 5.0, 4.8, 4.7]:
+        assert not controller.should_stop()
+        controller.observe(loss=loss, approx_prob=0.9)
+    assert controller.should_stop()
+
+    controller.reset()
+    assert not controller.should_stop()
@@ -0,0 +1,63 @@
+from adat.attackers import Attacker, AttackerOutput, AttackCache, CachedAttacker
+
+
+class CountingAttacker(Attacker):
+    def __init__(self) -> None:
+        self.num_calls = 0
+
+    def attack(self, sequence_to_attack: str, label_to_attack: int = 1, **kwargs) -> AttackerOutput:
+        self.num_calls += 1
+        return AttackerOutput(
+            sequence=sequence_to_attack,
+            probability=0.9,
+            adversarial_sequence=sequence_to_attack[::-1],
+            adversarial_probability=0.2,
+            wer=1,
+            prob_diff=0.7,
+            attacked_label=label_to_attack,
+            adversarial_label=1 - label_to_attack
+        )
+
+
+def _make_cache(tmp_path, config, archive_content=b"weights"):
+    archive_path = tmp_path / f"model_{len(archive_content)}.tar.gz"
+    archive_path.write_bytes(archive_content)
+    return AttackCache(str(tmp_path / "cache"), "CountingAttacker", config, [str(archive_path)], seed=0)
+
+
+def test_cached_attacker_serves_hits(tmp_path):
+    attacker = CountingAttacker()
+    cached = CachedAttacker(attacker, _make_cache(tmp_path, {"alpha": 1.0, "beta": 2.0}))
+
+    first = cached.attack("a b c", label_to_attack=0, max_steps=5)
+    second = cached.attack("a b c", label_to_attack=0, max_steps=5)
+    assert first == second
+    assert attacker.num_calls == 1
+    assert cached.cache.stats()["hits"] == 1
+    assert cached.cache.stats()["misses"] == 1
+
+    cached.attack("a b c", label_to_attack=1, max_steps=5)
+    cached.attack("a b c", label_to_attack=0, max_steps=10)
+    assert attacker.num_calls == 3
+
+
+def test_cached_attacker_attacks_only_misses_of_a_batch(tmp_path):
+    attacker = CountingAttacker()
+    cached = CachedAttacker(attacker, _make_cache(tmp_path, {"alpha": 1.0}))
+
+    first = cached.attack("a b c", label_to_attack=0)
+    outputs = cached.attack_batch(["d e", "a b c", "f"], [1, 0, 0])
+    assert attacker.num_calls == 3
+    assert outputs[1] == first
+    assert [output.sequence for output in outputs] == ["d e", "a b c", "f"]
+
+
+def test_cache_key_ignores_config_key_order(tmp_path):
+    cache_a = _make_cache(tmp_path, {"alpha": 1.0, "beta": 2.0})
+    cache_b = _make_cache(tmp_path, {"beta": 2.0, "alpha": 1.0})
+    assert cache_a.key("a b c", 0) == cache_b.key("a b c", 0)
+
+    cache_c = _make_cache(tmp_path, {"alpha": 1.5, "beta": 2.0})
+    cache_d = _make_cache(tmp_path, {"alpha": 1.0, "beta": 2.0}, archive_content=b"other weights")
+    assert cache_a.key("a b c", 0) != cache_c.key("a b c", 0)
+    assert cache_a.key("a b c", 0) != cache_d.key("a b c", 0)
@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+
+from adat.attack_results import AttackResultsWriter, convert_jsonlines, load_attack_results
+from adat.attackers import AttackerOutput
+
+
+def _output(idx: int) -> AttackerOutput:
+    return AttackerOutput(
+        sequence=f"sequence {idx} ü",
+        probability=0.9,
+        adversarial_sequence=f"adversarial {idx}",
+        adversarial_probability=0.1 * idx,
+        wer=idx,
+        prob_diff=0.9 - 0.1 * idx,
+        attacked_label=1,
+        adversarial_label=idx % 2,
+        history={"step": [0]}
+    )
+
+
+def test_columnar_results_match_jsonlines(tmp_path):
+    outputs = [_output(idx) for idx in range(5)]
+    jsonlines_dir, columnar_dir = tmp_path / "jsonlines", tmp_path / "columnar"
+    jsonlines_dir.mkdir()
+    with open(jsonlines_dir / "attacked_data.json", "w") as f:
+        f.write("\n".join(json.dumps(output.to_dict()) for output in outputs))
+    with AttackResultsWriter(columnar_dir / "attacked_data") as writer:
+        for output in outputs:
+            writer.write(output)
+
+    columns = ["sequence", "wer", "adversarial_label", "loss_value"]
+    from_jsonlines = load_attack_results(jsonlines_dir, columns)
+    from_columns = load_attack_results(columnar_dir, columns)
+    assert list(from_columns["sequence"]) == list(from_jsonlines["sequence"]) == [o.sequence for o in outputs]
+    for name in ("wer", "adversarial_label"):
+        np.testing.assert_array_equal(from_columns[name], from_jsonlines[name])
+    assert np.isnan(from_columns["loss_value"]).all() and np.isnan(from_jsonlines["loss_value"]).all()
+
+    assert convert_jsonlines(jsonlines_dir / "attacked_data.json", jsonlines_dir / "attacked_data") == 5
+    assert load_attack_results(jsonlines_dir, ["adversarial_sequence"])["adversarial_sequence"][3] == "adversarial 3"
@@ -0,0 +1,74 @@
+import time
+
+from adat.attackers import Attacker, AttackerOutput
+from adat.attackers.attacker import history_to_columns
+
+
+def _output(step: int, **kwargs) -> AttackerOutput:
+    return AttackerOutput(
+        sequence="a b c",
+        probability=0.9,
+        adversarial_sequence=f"a b {step}",
+        adversarial_probability=0.9 - step / 10,
+        wer=1,
+        prob_diff=step / 10,
+        attacked_label=1,
+        adversarial_label=1,
+        **kwargs
+    )
+
+
+def test_attacker_output_to_dict():
+    output = _output(0, loss_value=0.5)
+    assert not hasattr(output, "__dict__")
+
+    record = output.to_dict()
+    assert "history" not in record and record["loss_value"] == 0.5
+    assert "loss_value" not in output.to_dict(exclude=("loss_value", ))
+    assert AttackerOutput.from_dict(record) == output
+
+
+def test_history_to_columns():
+    outputs = [_output(step) for step in range(5)]
+    history = history_to_columns(outputs, every=2)
+    assert history["step"] == [0, 2, 4]
+    assert history["adversarial_sequence"] == ["a b 0", "a b 2", "a b 4"]
+    # fields that are never set are not stored
+    assert "loss_value" not in history and "sequence" not in history
+
+    # the last step is always kept
+    assert history_to_columns(outputs, every=3)["step"] == [0, 3, 4]
+    assert history_to_columns(outputs, every=0) is None
+
+
+class SlowAttacker(Attacker):
+    def attack(self, sequence_to_attack: str, label_to_attack: int = 1, num_steps: int = 100) -> AttackerOutput:
+        deadline = self.example_deadline()
+        deadline_exceeded = False
+        outputs = []
+        for step in range(num_steps):
+            if outputs and self.past_deadline(deadline):
+                deadline_exceeded = True
+                break
+            time.sleep(0.01)
+            outputs.append(_output(step))
+        output = self.find_best_attack(outputs)
+        output.history = self.make_history(outputs)
+        if deadline is not None:
+            output.deadline_exceeded = deadline_exceeded
+        return output
+
+
+def test_time_budget():
+    attacker = SlowAttacker()
+    assert attacker.attack("a b c", num_steps=3).deadline_exceeded is None
+
+    attacker.set_time_budget(seconds_per_example=0.05)
+    output = attacker.attack("a b c")
+    assert output.deadline_exceeded and len(output.history["step"]) < 100
+    assert attacker.attack("a b c", num_steps=2).deadline_exceeded is False
+
+    # an expired run still gets one step per example
+    attacker.set_time_budget(run_seconds=0.0)
+    output = attacker.attack("a b c")
+    assert output.deadline_exceeded and output.history["step"] == [0]
@@ -0,0 +1,24 @@
+import json
+
+import numpy as np
+
+from adat.binary_dataset import binarize_jsonlines, BinaryDataset
+
+
+def test_binarize_jsonlines(tmp_path):
+    data = [
+        {"seq_a": "a b c", "seq_b": "a d", "dist": 2.0},
+        {"seq_a": "b", "seq_b": "b c e", "dist": 1.0},
+    ]
+    data_path = tmp_path / "data.json"
+    data_path.write_text("\n".join(json.dumps(el) for el in data) + "\n")
+    vocab = {"a": 2, "b": 3, "c": 4}
+
+    meta = binarize_jsonlines(data_path, tmp_path / "binary", lambda token: vocab.get(token, 1))
+    assert meta == {"size": 2, "texts": ["seq_a", "seq_b"], "targets": ["dist"]}
+
+    dataset = BinaryDataset(tmp_path / "binary")
+    assert len(dataset) == 2
+    np.testing.assert_array_equal(dataset.texts["seq_a"][0], [2, 3, 4])
+    np.testing.assert_array_equal(dataset.texts["seq_b"][1], [3, 4, 1])
+    np.testing.assert_allclose(dataset.targets["dist"], [2.0, 1.0])
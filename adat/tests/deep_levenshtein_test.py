@@ -0,0 +1,35 @@
+import torch
+from allennlp.data import Vocabulary
+from allennlp.modules.text_field_embedders import BasicTextFieldEmbedder
+from allennlp.modules.token_embedders import Embedding
+from allennlp.modules.seq2vec_encoders import BagOfEmbeddingsEncoder
+
+from adat.models import DeepLevenshtein
+
+
+def _pairwise_distances(model: DeepLevenshtein, a: torch.Tensor, b: torch.Tensor) -> torch.Tensor:
+    a = a.unsqueeze(1).expand(-1, b.size(0), -1)
+    b = b.unsqueeze(0).expand(a.size(0), -1, -1)
+    return model.linear(torch.cat([a, b, torch.abs(a - b)], dim=-1)).squeeze(-1)
+
+
+def test_distance_matrix_matches_linear_head():
+    torch.manual_seed(0)
+    vocab = Vocabulary(tokens_to_add={"tokens": ["a", "b", "c"]})
+    model = DeepLevenshtein(
+        vocab,
+        text_field_embedder=BasicTextFieldEmbedder({"tokens": Embedding(embedding_dim=8, num_embeddings=5)}),
+        seq2vec_encoder=BagOfEmbeddingsEncoder(embedding_dim=8)
+    )
+    a, b = torch.randn(7, 8), torch.randn(5, 8)
+
+    with torch.no_grad():
+        expected = _pairwise_distances(model, a, b)
+        assert torch.allclose(model.distance_matrix(a, b, tile_size=3), expected, atol=1e-5)
+
+        values, indexes = model.topk_nearest(a, a, k=2, tile_size=3, exclude_diagonal=True)
+        expected = _pairwise_distances(model, a, a)
+        expected.fill_diagonal_(float("inf"))
+        expected_values, expected_indexes = expected.topk(2, dim=1, largest=False)
+        assert torch.allclose(values, expected_values, atol=1e-5)
+        assert torch.equal(indexes, expected_indexes)
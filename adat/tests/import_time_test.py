@@ -0,0 +1,36 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+PROJECT_ROOT = (Path(__file__).parent / ".." / "..").resolve()
+HEAVY_MODULES = ("torch", "allennlp", "allennlp_models", "IPython")
+
+
+def _imported_heavy_modules(statement: str):
+    code = f"import sys\n{statement}\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=str(PROJECT_ROOT),
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True
+    )
+    return [m for m in result.stdout.strip().split(",") if m]
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import adat",
+        "import adat.attackers",
+        "from adat.attackers import Attacker, AttackerOutput",
+        "import adat.utils",
+        "import runpy; runpy.run_path('scripts/prepare_for_discr.py')",
+        "import runpy; runpy.run_path('scripts/prepare_for_fine_tuning.py')",
+    ]
+)
+def test_light_imports_do_not_load_heavy_modules(statement):
+    assert _imported_heavy_modules(statement) == []
@@ -5,6 +5,10 @@ from allennlp.data import Vocabulary
 from allennlp.common import Params
 from allennlp.models import Model
 
+from adat import register_all
+
+# the models and encoders referenced by the configs
+register_all()
 
 PROJECT_ROOT = (Path(__file__).parent / ".." / "..").resolve()
 
@@ -41,6 +45,7 @@ def test_distribution_deep_levenshtein_configs():
                     "DL_TRAIN_DATA_PATH": "",
                     "DL_VALID_DATA_PATH": "",
                     "LM_VOCAB_PATH": "",
+                    "LM_OUTPUT_CACHE_DIR": "",
                     "LM_ARCHIVE_PATH": str(PROJECT_ROOT / "adat/tests/fixtures/masked_lm/model.tar.gz")
                 }
             )
@@ -105,6 +110,7 @@ def test_distribution_classifier_configs():
                     "CLS_VALID_DATA_PATH": "",
                     "CLS_NUM_CLASSES": "2",
                     "LM_VOCAB_PATH": "",
+                    "LM_OUTPUT_CACHE_DIR": "",
                     "LM_ARCHIVE_PATH": str(PROJECT_ROOT / "adat/tests/fixtures/masked_lm/model.tar.gz")
                 }
             )
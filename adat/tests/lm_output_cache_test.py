@@ -0,0 +1,27 @@
+import numpy as np
+
+from adat.lm_output_cache import LMOutputCache, pad_lm_output
+
+
+def test_lm_output_cache_roundtrip(tmp_path):
+    texts = ["a b c", "d", "e f"]
+    outputs = [
+        (np.arange(length * 2).reshape(length, 2), np.full((length, 2), 0.5))
+        for length in (5, 3, 4)
+    ]
+    LMOutputCache.write(tmp_path, texts, iter(outputs))
+
+    cache = LMOutputCache(tmp_path)
+    assert len(cache) == 3
+    assert "d" in cache and "x" not in cache
+    for text, (ids, probs) in zip(texts, outputs):
+        cached_ids, cached_probs = cache[text]
+        np.testing.assert_array_equal(cached_ids, ids)
+        np.testing.assert_allclose(cached_probs, probs)
+
+
+def test_pad_lm_output():
+    ids, probs = pad_lm_output(np.ones((3, 2), dtype=np.int32), np.ones((3, 2), dtype=np.float16), min_length=5)
+    assert ids.shape == probs.shape == (5, 2)
+    assert ids.dtype == np.int64 and probs.dtype == np.float32
+    assert probs[3:].sum() == 0
@@ -0,0 +1,49 @@
+from adat.attackers import Attacker, AttackerOutput
+from adat.attackers.profiling import StageTimer, merge_timings, format_timings
+
+
+class StagedAttacker(Attacker):
+    def attack(self, sequence_to_attack: str, label_to_attack: int = 1, **kwargs) -> AttackerOutput:
+        with self.timed("attack"):
+            for _ in range(3):
+                with self.timed("step"):
+                    pass
+        output = AttackerOutput(
+            sequence=sequence_to_attack,
+            probability=0.9,
+            adversarial_sequence=sequence_to_attack,
+            adversarial_probability=0.9,
+            wer=0,
+            prob_diff=0.0,
+            attacked_label=label_to_attack,
+            adversarial_label=label_to_attack
+        )
+        output.timings = self.pop_timings()
+        return output
+
+
+def test_stage_timer():
+    timer = StageTimer()
+    for _ in range(2):
+        with timer("a"):
+            with timer("b"):
+                pass
+    timings = timer.timings()
+    assert timings["a"]["calls"] == 2 and timings["b"]["calls"] == 2
+    assert timings["a"]["seconds"] >= timings["b"]["seconds"] >= 0
+    timer.reset()
+    assert timer.timings() == {}
+
+
+def test_attacker_profiling_is_opt_in():
+    attacker = StagedAttacker()
+    assert attacker.attack("a b c").timings is None
+
+    attacker.enable_profiling()
+    timings = [attacker.attack("a b c").timings for _ in range(2)]
+    # timings are per attack
+    assert timings[0]["step"]["calls"] == 3
+
+    merged = merge_timings(timings + [None])
+    assert merged["step"]["calls"] == 6 and merged["attack"]["calls"] == 2
+    assert "step" in format_timings(merged)
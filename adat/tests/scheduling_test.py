@@ -0,0 +1,25 @@
+from adat.scheduling import length_scheduled_batches, map_length_scheduled
+
+
+def test_length_scheduled_batches():
+    lengths = [3, 10, 1, 7, 7, 2]
+    (batches, ) = length_scheduled_batches(lengths, batch_size=2)
+    assert batches == [[1, 3], [4, 0], [5, 2]]
+
+    schedule = length_scheduled_batches([10, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1], batch_size=1, num_workers=2)
+    # the long example is alone on its worker, the short ones balance the rest
+    assert schedule[0] == [[0]]
+    assert sorted(i for batch in schedule[1] for i in batch) == list(range(1, 11))
+
+
+def test_map_length_scheduled_restores_order():
+    calls = []
+
+    def fn(batch):
+        calls.append(batch)
+        return [text.upper() for text in batch]
+
+    texts = ["a", "b b b", "c c", "d d d d", "e"]
+    outputs = list(map_length_scheduled(fn, iter(texts), length=lambda x: len(x.split()), window_size=3, batch_size=2))
+    assert outputs == [text.upper() for text in texts]
+    assert calls == [["b b b", "c c"], ["a"], ["d d d d", "e"]]
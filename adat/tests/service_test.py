@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import time
+
+from adat.attackers import Attacker, AttackerOutput
+from adat.service import AttackServer, request_attacks
+
+
+class ReversingAttacker(Attacker):
+    def __init__(self) -> None:
+        self.batch_sizes = []
+
+    def attack_batch(self, sequences, labels, **kwargs):
+        self.batch_sizes.append(len(sequences))
+        # batches have to be slow enough for the next one to fill up
+        time.sleep(0.05)
+        return super().attack_batch(sequences, labels, **kwargs)
+
+    def attack(self, sequence_to_attack: str, label_to_attack: int = 1, **kwargs) -> AttackerOutput:
+        if sequence_to_attack == "fail":
+            raise RuntimeError("failed")
+        return AttackerOutput(
+            sequence=sequence_to_attack,
+            probability=0.9,
+            adversarial_sequence=sequence_to_attack[::-1],
+            adversarial_probability=0.2,
+            wer=1,
+            prob_diff=0.7,
+            attacked_label=label_to_attack,
+            adversarial_label=1 - label_to_attack
+        )
+
+
+def test_attack_server_batches_requests(tmp_path):
+    attacker = ReversingAttacker()
+    server = AttackServer(attacker, max_batch_size=4, max_latency_ms=20)
+    path = str(tmp_path / "attack.sock")
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(server.start(path=path))
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        texts = [f"text {i}" for i in range(10)]
+        responses = request_attacks([{"text": text, "label": 1} for text in texts] + [{"text": ""}], path=path)
+        assert [r["output"]["adversarial_sequence"] for r in responses[:10]] == [text[::-1] for text in texts]
+        assert "error" in responses[10]
+        assert max(attacker.batch_sizes) > 1 and sum(attacker.batch_sizes) == 10
+
+        # a failed attack fails its request only, not the rest of its batch
+        responses = request_attacks([{"text": "fail", "label": 1}, {"text": "ok", "label": 0}], path=path)
+        assert "error" in responses[0]
+        assert responses[1]["output"]["adversarial_sequence"] == "ko"
+
+        metrics = server.metrics()
+        assert metrics["requests"] == 12 and metrics["errors"] == 2 and metrics["queue_depth"] == 0
+        assert metrics["latency_ms_p95"] >= metrics["latency_ms_p50"] > 0
+    finally:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -0,0 +1,23 @@
+from adat.sweep import halving_schedule, successive_halving
+
+
+def test_halving_schedule():
+    assert halving_schedule(10, 100, eta=3) == [10, 30, 90, 100]
+    assert halving_schedule(10, 90, eta=3) == [10, 30, 90]
+    assert halving_schedule(100, 100) == [100]
+
+
+def test_successive_halving_keeps_the_best_configs():
+    candidates = {str(i): i / 10 for i in range(9)}
+    evaluations = []
+
+    def evaluate(name, score, num_examples):
+        evaluations.append((name, num_examples))
+        return {"NAD_1.0": score}
+
+    rows = successive_halving(candidates, evaluate, min_examples=10, max_examples=90, eta=3)
+
+    assert len(evaluations) == 9 + 3 + 1
+    assert {name for name, num in evaluations if num == 30} == {"6", "7", "8"}
+    assert [name for name, num in evaluations if num == 90] == ["8"]
+    assert rows[-1] == {"config_num": "8", "rung": 2, "num_examples": 90, "NAD_1.0": 0.8}
@@ -0,0 +1,23 @@
+import json
+
+from adat.utils import iterate_jsonlines, load_jsonlines, in_test_split
+
+
+def test_iterate_jsonlines(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("\n".join(json.dumps({"i": i}) for i in range(10)) + "\n\n")
+
+    assert [el["i"] for el in iterate_jsonlines(path)] == list(range(10))
+    assert [el["i"] for el in iterate_jsonlines(path, limit=3)] == [0, 1, 2]
+    assert [el["i"] for el in iterate_jsonlines(path, limit=3, skip=8)] == [8, 9]
+    shards = [[el["i"] for el in iterate_jsonlines(path, limit=8, num_shards=3, shard_index=i)] for i in range(3)]
+    assert shards == [[0, 3, 6], [1, 4, 7], [2, 5]]
+    assert load_jsonlines(path, limit=2) == [{"i": 0}, {"i": 1}]
+
+
+def test_in_test_split():
+    keys = [f"sequence {i}" for i in range(2000)]
+    test = [key for key in keys if in_test_split(key, test_size=0.2)]
+    assert 300 < len(test) < 500
+    assert test == [key for key in keys if in_test_split(key, test_size=0.2)]
+    assert test != [key for key in keys if in_test_split(key, test_size=0.2, seed=0)]
@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import Optional, Tuple
 
 import torch
 from allennlp.data import Vocabulary
@@ -27,7 +27,12 @@ class TokensMasker(Registrable):
         assert ovv_idx != self.mask_idx, f"Add `{MASK_TOKEN}` to your vocab"
         self.vocab_size = self.vocab.get_vocab_size(namespace)
 
-    def mask_tokens(self, inputs: TextFieldTensors) -> Tuple[TextFieldTensors, TextFieldTensors]:
+    def mask_tokens(
+            self,
+            inputs: TextFieldTensors,
+            generator: Optional[torch.Generator] = None
+    ) -> Tuple[TextFieldTensors, TextFieldTensors]:
+        # `generator` must be on the device of `inputs`, the global random state is used without it
 
         masked_inputs = dict()
         masked_targets = dict()
@@ -38,19 +43,22 @@ class TokensMasker(Registrable):
                 labels = tokens.clone()
 
                 indices_masked = torch.bernoulli(
-                    torch.full(labels.shape, self.mask_probability, device=tokens.device)
+                    torch.full(labels.shape, self.mask_probability, device=tokens.device),
+                    generator=generator
                 ).bool()
                 tokens[indices_masked] = self.mask_idx
 
                 indices_random = torch.bernoulli(
-                    torch.full(labels.shape, self.replace_probability, device=tokens.device)
+                    torch.full(labels.shape, self.replace_probability, device=tokens.device),
+                    generator=generator
                 ).bool() & ~indices_masked
                 random_tokens = torch.randint(
                     low=1,
                     high=self.vocab_size,
                     size=labels.shape,
                     dtype=torch.long,
-                    device=tokens.device
+                    device=tokens.device,
+                    generator=generator
                 )
                 tokens[indices_random] = random_tokens[indices_random]
 
@@ -1,29 +1,48 @@
 import functools
-from tqdm import tqdm
-from multiprocessing import Pool
-from typing import Sequence, Dict, Any, List
+import hashlib
+import itertools
+from typing import Sequence, Dict, Any, List, Optional, Iterator, TYPE_CHECKING
 import json
 import re
 import random
-from IPython.core.display import display, HTML
 
-import torch
 import numpy as np
-from allennlp.models import Model
 import Levenshtein as lvs
 
+# torch, allennlp, tqdm and IPython are imported where they are used to keep `import adat.utils` cheap
+if TYPE_CHECKING:
+    from allennlp.models import Model
+
+
+def load_weights(model: "Model", path: str, location: str = 'cpu') -> None:
+    import torch
 
-def load_weights(model: Model, path: str, location: str = 'cpu') -> None:
     with open(path, 'rb') as f:
         model.load_state_dict(torch.load(f, map_location=location))
 
 
-def load_jsonlines(path: str) -> List[Dict[str, Any]]:
-    data = []
+def iterate_jsonlines(
+        path: str,
+        limit: Optional[int] = None,
+        skip: int = 0,
+        num_shards: int = 1,
+        shard_index: int = 0
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily parses records `skip`..`skip + limit` of a jsonlines file,
+    every `num_shards`-th of them starting from `shard_index` (sharding is applied after skip and limit).
+    """
+    assert 0 <= shard_index < num_shards
+    stop = skip + limit if limit is not None else None
     with open(path) as file:
-        for line in file.readlines():
-            data.append(json.loads(line))
-    return data
+        lines = (line for line in file if line.strip())
+        for i, line in enumerate(itertools.islice(lines, skip, stop)):
+            if i % num_shards == shard_index:
+                yield json.loads(line)
+
+
+def load_jsonlines(path: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    return list(iterate_jsonlines(path, limit=limit))
 
 
 @functools.lru_cache(maxsize=5000)
@@ -51,6 +70,9 @@ def _wer_one_vs_all(x):
 def pairwise_wer(
     sequences_a: Sequence[str], sequences_b: Sequence[str], n_jobs: int = 5, verbose: bool = False
 ) -> np.ndarray:
+    from multiprocessing import Pool
+    from tqdm import tqdm
+
     bar = tqdm if verbose else lambda iterable, total, desc: iterable
 
     with Pool(n_jobs) as pool:
@@ -65,6 +87,7 @@ def pairwise_wer(
 
 
 def visualize_simple_diff(seq_a: str, seq_b: str, window: int = 3) -> None:
+    from IPython.core.display import display, HTML
 
     def _colorize(token: str, color: str) -> str:
         return f"<font color='{color}'>{token}</font>"
@@ -179,3 +202,32 @@ def normalized_accuracy_drop_with_perplexity(
             nads.append(0.0)
 
     return sum(nads) / len(nads)
+
+
+def set_seed(seed: int) -> None:
+    import torch
+
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def length_bucketed_batches(sequences: Sequence[str], batch_size: int) -> List[List[int]]:
+    # indexes of sequences grouped into batches of similar length, so that little compute is spent on padding
+    order = sorted(range(len(sequences)), key=lambda i: len(sequences[i].split()))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+@functools.lru_cache(maxsize=None)
+def archive_hash(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def in_test_split(key: str, test_size: float, seed: int = 24) -> bool:
+    # deterministic split by hash: needs no shuffling, and equal keys always land in the same split
+    digest = hashlib.md5(f"{seed}:{key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 < test_size
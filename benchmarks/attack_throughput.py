@@ -0,0 +1,265 @@
+"""Attack throughput benchmark on tiny deterministic models.
+
+Models are built from the `configs/models/*` jsonnets with a synthetic vocabulary of each `--vocab-sizes` value
+and a fixed seed, and archived like `allennlp train` does. Every (attacker, vocab size, sequence length) case
+runs in a fresh interpreter, so the peak RSS of one case does not leak into another.
+
+    python benchmarks/attack_throughput.py --output throughput.json
+    python benchmarks/attack_throughput.py --output new.json --compare throughput.json --tolerance 0.2
+"""
+import argparse
+import json
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+MODEL_CONFIGS = {
+    "masked_lm": "configs/models/lm/transformer_masked_lm.jsonnet",
+    "classifier": "configs/models/classifier/gru_classifier.jsonnet",
+    "deep_levenshtein": "configs/models/levenshtein/cnn_deep_levenshtein.jsonnet",
+}
+ATTACK_CONFIGS = {
+    "cascada": "configs/attacks/cascada/config.json",
+    "fgsm": "configs/attacks/fgsm/config.json",
+    "deepfool": "configs/attacks/deepfool/config.json",
+    "hotflip": None,
+}
+# FGSM and DeepFool expect these tokens at the end of the vocabulary
+SPECIAL_TOKENS = ["@@MASK@@", "<START>", "<END>"]
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--attackers", type=str, nargs="+", default=list(ATTACK_CONFIGS), choices=list(ATTACK_CONFIGS))
+parser.add_argument("--vocab-sizes", type=int, nargs="+", default=[1000, 10000])
+parser.add_argument("--lengths", type=int, nargs="+", default=[10, 30])
+parser.add_argument("--num-sequences", type=int, default=5)
+parser.add_argument("--seed", type=int, default=13)
+# archives are rebuilt when not given
+parser.add_argument("--work-dir", type=str, default=None)
+parser.add_argument("--output", type=str, default=None)
+parser.add_argument("--compare", type=str, default=None, help="previous --output to compare sequences/sec with")
+parser.add_argument("--tolerance", type=float, default=0.2, help="fail if sequences/sec dropped by more than that")
+parser.add_argument("--cuda", type=int, default=-1)
+parser.add_argument("--worker", type=str, default=None, help=argparse.SUPPRESS)
+
+
+def _words(vocab_size: int) -> List[str]:
+    return [f"w{i}" for i in range(vocab_size)]
+
+
+def build_archives(work_dir: Path, vocab_size: int, seed: int) -> Dict[str, str]:
+    import torch
+    from allennlp.common import Params
+    from allennlp.data import Vocabulary
+    from allennlp.models import Model
+    from allennlp.models.archival import archive_model
+
+    from adat import register_all
+
+    register_all()
+
+    vocab = Vocabulary(tokens_to_add={"tokens": _words(vocab_size) + SPECIAL_TOKENS})
+    vocab_dir = work_dir / "vocabulary"
+    vocab.save_to_files(str(vocab_dir))
+    ext_vars = {
+        "LM_TRAIN_DATA_PATH": "",
+        "LM_VALID_DATA_PATH": "",
+        "CLS_TRAIN_DATA_PATH": "",
+        "CLS_VALID_DATA_PATH": "",
+        "CLS_NUM_CLASSES": "2",
+        "DL_TRAIN_DATA_PATH": "",
+        "DL_VALID_DATA_PATH": "",
+        "LM_VOCAB_PATH": str(vocab_dir),
+    }
+
+    model_dirs = dict()
+    for name, config_path in MODEL_CONFIGS.items():
+        serialization_dir = work_dir / name
+        serialization_dir.mkdir(exist_ok=True, parents=True)
+        params = Params.from_file(str(PROJECT_ROOT / config_path), ext_vars=ext_vars)
+        torch.manual_seed(seed)
+        model = Model.from_params(vocab=vocab, params=params.duplicate()["model"])
+
+        params.to_file(str(serialization_dir / "config.json"))
+        vocab.save_to_files(str(serialization_dir / "vocabulary"))
+        torch.save(model.state_dict(), str(serialization_dir / "best.th"))
+        archive_model(str(serialization_dir))
+        model_dirs[name] = str(serialization_dir)
+    return model_dirs
+
+
+def make_sequences(vocab_size: int, length: int, num_sequences: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    words = _words(vocab_size)
+    return [" ".join(rng.choice(words) for _ in range(length)) for _ in range(num_sequences)]
+
+
+def _peak_rss_mb() -> float:
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    from adat import register_all
+    from adat.utils import set_seed
+
+    register_all()
+
+    attacker_name = case["attacker"]
+    model_dirs = case["model_dirs"]
+    config = dict()
+    if ATTACK_CONFIGS[attacker_name] is not None:
+        with open(PROJECT_ROOT / ATTACK_CONFIGS[attacker_name]) as f:
+            config = json.load(f)
+
+    if attacker_name == "cascada":
+        from adat.attackers import Cascada
+
+        attacker = Cascada(
+            masked_lm_dir=model_dirs["masked_lm"],
+            classifier_dir=model_dirs["classifier"],
+            deep_levenshtein_dir=model_dirs["deep_levenshtein"],
+            device=case["cuda"],
+            **{k: v for k, v in config.items() if k not in ("max_steps", "early_stopping")}
+        )
+        num_steps = config["max_steps"]
+
+        def attack(sequence: str) -> None:
+            attacker.attack(sequence, label_to_attack=1, max_steps=config["max_steps"], early_stopping=False)
+    elif attacker_name in ("fgsm", "deepfool"):
+        from adat.attackers import FGSMAttacker, DeepFoolAttacker
+
+        attacker_cls = FGSMAttacker if attacker_name == "fgsm" else DeepFoolAttacker
+        attacker = attacker_cls.from_archive(model_dirs["classifier"], device=case["cuda"], **config)
+        num_steps = config["num_steps"]
+
+        def attack(sequence: str) -> None:
+            attacker.attack(sequence, label_to_attack=1)
+    elif attacker_name == "hotflip":
+        import numpy as np
+        from allennlp.predictors import Predictor
+        from adat.attackers import HotFlipFixed
+
+        predictor = Predictor.from_path(
+            Path(model_dirs["classifier"]) / "model.tar.gz",
+            predictor_name="text_classifier",
+            cuda_device=case["cuda"]
+        )
+        attacker = HotFlipFixed(predictor=predictor, max_tokens=case["vocab_size"])
+        # the number of flips depends on the sequence
+        num_steps = None
+        target = np.ones(predictor._model._num_labels)
+        target[1] = 0
+
+        def attack(sequence: str) -> None:
+            attacker.attack_from_json({"sentence": sequence}, target={"probs": target})
+    else:
+        raise NotImplementedError
+
+    load_rss_mb = _peak_rss_mb()
+    *sequences, warm_up_sequence = make_sequences(
+        case["vocab_size"], case["length"], case["num_sequences"] + 1, case["seed"]
+    )
+    set_seed(case["seed"])
+    # not measured, a separate sequence so that no per-sequence cache is warmed up
+    attack(warm_up_sequence)
+    timings = []
+    for sequence in sequences:
+        start = time.perf_counter()
+        attack(sequence)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "attacker": attacker_name,
+        "vocab_size": case["vocab_size"],
+        "length": case["length"],
+        "num_sequences": len(sequences),
+        "sequences_per_second": len(sequences) / sum(timings),
+        "median_sequence_ms": 1000 * statistics.median(timings),
+        "step_latency_ms": 1000 * statistics.median(timings) / num_steps if num_steps else None,
+        "load_rss_mb": load_rss_mb,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _key(row: Dict[str, Any]):
+    return row["attacker"], row["vocab_size"], row["length"]
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    baseline = {_key(row): row for row in baseline}
+    regressions = []
+    for row in results:
+        old = baseline.get(_key(row))
+        if old is None:
+            continue
+        ratio = row["sequences_per_second"] / old["sequences_per_second"]
+        row["baseline_sequences_per_second"] = old["sequences_per_second"]
+        row["speedup"] = ratio
+        if ratio < 1 - tolerance:
+            regressions.append(f"{_key(row)}: {ratio:.2f}x")
+    return regressions
+
+
+def main(args) -> None:
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="attack_throughput_"))
+    results = []
+    for vocab_size in args.vocab_sizes:
+        vocab_work_dir = work_dir / f"vocab_{vocab_size}"
+        if (vocab_work_dir / "deep_levenshtein" / "model.tar.gz").exists():
+            model_dirs = {name: str(vocab_work_dir / name) for name in MODEL_CONFIGS}
+        else:
+            model_dirs = build_archives(vocab_work_dir, vocab_size, args.seed)
+
+        for attacker in args.attackers:
+            for length in args.lengths:
+                case = {
+                    "attacker": attacker,
+                    "model_dirs": model_dirs,
+                    "vocab_size": vocab_size,
+                    "length": length,
+                    "num_sequences": args.num_sequences,
+                    "seed": args.seed,
+                    "cuda": args.cuda,
+                }
+                output = subprocess.run(
+                    [sys.executable, __file__, "--worker", json.dumps(case)],
+                    cwd=str(PROJECT_ROOT),
+                    stdout=subprocess.PIPE,
+                    universal_newlines=True,
+                    check=True,
+                ).stdout
+                row = json.loads(output.strip().splitlines()[-1])
+                results.append(row)
+                print(
+                    f"{attacker:10s} vocab={vocab_size:<7d} length={length:<4d} "
+                    f"{row['sequences_per_second']:8.2f} seq/s  peak RSS {row['peak_rss_mb']:8.1f} MB"
+                )
+
+    regressions: Optional[List[str]] = None
+    if args.compare is not None:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "worker"}, "results": results}, f, indent=4)
+
+    if regressions:
+        sys.exit(f"Throughput regressions: {regressions}")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    sys.path.insert(0, str(PROJECT_ROOT))
+    if args.worker is not None:
+        print(json.dumps(run_case(json.loads(args.worker))))
+    else:
+        main(args)
@@ -0,0 +1,112 @@
+"""Speed/accuracy tradeoff of a distilled Deep Levenshtein student against its teacher.
+
+Latency is measured on the call Cascada makes every step: `num_gumbel_samples` one-hot sequences against
+the tokens of the attacked sequence, forward and backward. Accuracy is measured on a labeled Levenshtein dataset.
+
+    python benchmarks/deep_levenshtein_distillation.py \
+        --teacher-dir logs/nlp/lev --student-dir logs/nlp/lev_student --data-path datasets/nlp/lev/test.json
+"""
+import argparse
+import json
+import statistics
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Any, List
+
+import numpy as np
+import torch
+from allennlp.data import Batch, DatasetReader
+from allennlp.models import Model, load_archive
+from allennlp.nn.util import move_to_device
+
+from adat import register_all
+from adat.utils import iterate_jsonlines
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--teacher-dir", type=str, required=True)
+parser.add_argument("--student-dir", type=str, required=True)
+parser.add_argument("--data-path", type=str, required=True)
+parser.add_argument("--num-examples", type=int, default=1000)
+parser.add_argument("--batch-size", type=int, default=128)
+parser.add_argument("--num-gumbel-samples", type=int, default=3)
+parser.add_argument("--repeat", type=int, default=50)
+parser.add_argument("--output", type=str, default=None)
+parser.add_argument("--cuda", type=int, default=-1)
+
+
+def predict(model: Model, reader: DatasetReader, data: List[Dict[str, Any]], batch_size: int, cuda: int) -> np.ndarray:
+    distances = []
+    for i in range(0, len(data), batch_size):
+        batch = Batch([reader.text_to_instance(el["seq_a"], el["seq_b"]) for el in data[i:i + batch_size]])
+        batch.index_instances(model.vocab)
+        with torch.no_grad():
+            distances.extend(model(**move_to_device(batch.as_tensor_dict(), cuda))["distance"].view(-1).tolist())
+    return np.array(distances)
+
+
+def attack_step_latency(
+        model: Model,
+        reader: DatasetReader,
+        sequence: str,
+        num_gumbel_samples: int,
+        repeat: int,
+        cuda: int
+) -> Dict[str, float]:
+    batch = Batch([reader.text_to_instance(sequence, sequence)])
+    batch.index_instances(model.vocab)
+    tokens = move_to_device(batch.as_tensor_dict()["sequence_a"], cuda)
+    token_ids = tokens["tokens"]["tokens"]
+    vocab_size = model.vocab.get_vocab_size()
+    onehot = torch.nn.functional.one_hot(token_ids, vocab_size).float().repeat(num_gumbel_samples, 1, 1)
+    repeated_tokens = {"tokens": {"tokens": token_ids.repeat(num_gumbel_samples, 1)}}
+
+    timings = []
+    for _ in range(repeat + 1):
+        onehot.requires_grad_(True)
+        start = time.perf_counter()
+        model(onehot, repeated_tokens)["distance"].mean().backward()
+        if cuda >= 0:
+            torch.cuda.synchronize()
+        timings.append(time.perf_counter() - start)
+        onehot = onehot.detach()
+    # the first call warms up
+    timings = timings[1:]
+    return {"median_ms": 1000 * statistics.median(timings), "mean_ms": 1000 * statistics.mean(timings)}
+
+
+def load(model_dir: str, cuda: int):
+    register_all()
+    archive = load_archive(Path(model_dir) / "model.tar.gz", cuda_device=cuda)
+    archive.model.eval()
+    return archive.model, DatasetReader.from_params(archive.config["dataset_reader"])
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    data = list(islice(iterate_jsonlines(args.data_path), args.num_examples))
+    true_distances = np.array([el["dist"] for el in data])
+    # a sequence of median length for the latency measurement
+    sequence = sorted((el["seq_a"] for el in data), key=lambda x: len(x.split()))[len(data) // 2]
+
+    results = dict()
+    predictions = dict()
+    for name, model_dir in (("teacher", args.teacher_dir), ("student", args.student_dir)):
+        model, reader = load(model_dir, args.cuda)
+        predictions[name] = predict(model, reader, data, args.batch_size, args.cuda)
+        results[name] = {
+            "num_parameters": sum(p.numel() for p in model.parameters()),
+            "mae": float(np.abs(predictions[name] - true_distances).mean()),
+            **attack_step_latency(model, reader, sequence, args.num_gumbel_samples, args.repeat, args.cuda)
+        }
+
+    results["student_vs_teacher"] = {
+        "mae": float(np.abs(predictions["student"] - predictions["teacher"]).mean()),
+        "pearson": float(np.corrcoef(predictions["student"], predictions["teacher"])[0, 1]),
+        "speedup": results["teacher"]["median_ms"] / results["student"]["median_ms"],
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
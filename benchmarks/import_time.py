@@ -0,0 +1,81 @@
+"""Cold-start import benchmark for the `adat` package and the lightweight scripts.
+
+Every target is imported in a fresh interpreter, so the numbers include everything a CLI invocation pays for.
+
+    python benchmarks/import_time.py --repeat 5 --output import_time.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Any
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# modules that must not be imported by the lightweight targets
+HEAVY_MODULES = ("torch", "allennlp", "allennlp_models", "IPython")
+
+TARGETS = {
+    "adat": "import adat",
+    "adat.attackers": "import adat.attackers",
+    "adat.utils": "import adat.utils",
+    "scripts/prepare_for_discr.py": "import runpy; runpy.run_path('scripts/prepare_for_discr.py')",
+    "scripts/prepare_for_fine_tuning.py": "import runpy; runpy.run_path('scripts/prepare_for_fine_tuning.py')",
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps([elapsed, heavy]))
+"""
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--repeat", type=int, default=5)
+parser.add_argument("--output", type=str, default=None)
+parser.add_argument("--max-seconds", type=float, default=None, help="fail if any median import time is higher")
+
+
+def measure(statement: str, repeat: int = 5) -> Dict[str, Any]:
+    timings: List[float] = []
+    heavy_modules: List[str] = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+            cwd=str(PROJECT_ROOT),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        elapsed, heavy_modules = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(elapsed)
+
+    return {
+        "median_seconds": statistics.median(timings),
+        "min_seconds": min(timings),
+        "max_seconds": max(timings),
+        "heavy_modules": heavy_modules,
+    }
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    results = {name: measure(statement, repeat=args.repeat) for name, statement in TARGETS.items()}
+    for name, result in results.items():
+        print(f"{name:40s} {result['median_seconds'] * 1000:8.1f} ms  heavy: {result['heavy_modules'] or '-'}")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    failed = [name for name, result in results.items() if result["heavy_modules"]]
+    if args.max_seconds is not None:
+        failed += [name for name, result in results.items() if result["median_seconds"] > args.max_seconds]
+    if failed:
+        sys.exit(f"Slow imports: {sorted(set(failed))}")
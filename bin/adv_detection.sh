@@ -11,19 +11,19 @@ GPU_ID=${2:-$default_gpu_id}
 
 LOGS_DIR="logs"
 DATASETS_DIR="datasets"
+NUM_WORKERS=${NUM_WORKERS:-8}
 
+echo ">>>> Preparing data for all datasets and algorithms"
+PYTHONPATH=. python scripts/prepare_for_discr.py \
+    --adversarial-dir $(ls -d ${ATTACKS_DIR}/{non_nlp,nlp}/*/*/) \
+    --out-subdir adv_detection \
+    --num-workers ${NUM_WORKERS}
 
 for data_type in non_nlp nlp; do
     for result_dir in $(ls -d ${ATTACKS_DIR}/${data_type}/*); do
         dataset=$(basename ${result_dir})
-        for dir in $(ls -d ${result_dir}/*); do
+        for dir in $(ls -d ${result_dir}/*/); do
             alg_name=$(basename ${dir})
-            echo ">>>> Preparing data for ${dataset} dataset, ${alg_name} algorithm"
-            PYTHONPATH=. python scripts/prepare_for_discr.py \
-                --adversarial-dir ${dir} \
-                --out-dir ${dir}/adv_detection
-
-
             echo ">>>> Training ${dataset} dataset, ${alg_name} algorithm"
             export DISCR_TRAIN_DATA_PATH=${dir}/adv_detection/train.json
             export DISCR_VALID_DATA_PATH=${dir}/adv_detection/test.json
@@ -2,6 +2,9 @@
 
 # usage
 # bash bin/adv_training.sh {ATTACKS_DIR} ${GPU_ID}
+# WARM_START=1 bash bin/adv_training.sh {ATTACKS_DIR} ${GPU_ID}
+#   fine-tunes the substitute classifier of every dataset instead of training from scratch,
+#   the metrics are not comparable with those of the from-scratch runs
 
 set -eo pipefail -v
 
@@ -11,6 +14,8 @@ GPU_ID=${2:-$default_gpu_id}
 
 LOGS_DIR="logs"
 DATASETS_DIR="datasets"
+NUM_WORKERS=${NUM_WORKERS:-8}
+WARM_START=${WARM_START:-0}
 
 declare -A datasets_num_labels
 datasets_num_labels=( ["ag"]=4 ["sst"]=2 ["trec"]=6 ["mr"]=2 ["ins"]=2 ["age"]=4 ["gender"]=2)
@@ -20,25 +25,33 @@ num=5000
 for data_type in non_nlp nlp; do
     for result_dir in $(ls -d ${ATTACKS_DIR}/${data_type}/*); do
         dataset=$(basename ${result_dir})
-        for dir in $(ls -d ${result_dir}/*); do
-            alg_name=$(basename ${dir})
-            echo ">>>> Preparing data for ${dataset} dataset, ${alg_name} algorithm, ${num} examples"
-            PYTHONPATH=. python scripts/prepare_for_fine_tuning.py \
-                --adversarial-dir ${dir} \
-                --mix-with-path ${DATASETS_DIR}/${data_type}/${dataset}/target_clf/train.json \
-                --num-examples ${num}
-
+        echo ">>>> Preparing data for ${dataset} dataset, all algorithms, ${num} examples"
+        PYTHONPATH=. python scripts/prepare_for_fine_tuning.py \
+            --adversarial-dir $(ls -d ${result_dir}/*/) \
+            --mix-with-path ${DATASETS_DIR}/${data_type}/${dataset}/target_clf/train.json \
+            --num-examples ${num} \
+            --num-workers ${NUM_WORKERS}
 
+        for dir in $(ls -d ${result_dir}/*/); do
+            alg_name=$(basename ${dir})
             echo ">>>> Training ${dataset} dataset, ${alg_name} algorithm, ${num} examples"
             export CLS_NUM_CLASSES="${datasets_num_labels[${dataset}]}"
             export CLS_TRAIN_DATA_PATH=${dir}/fine_tuning_data_${num}.json
             export CLS_VALID_DATA_PATH=${DATASETS_DIR}/${data_type}/${dataset}/target_clf/valid.json
 
             clf_dif=${LOGS_DIR}/${data_type}/dataset_${dataset}/target_clf/${alg_name}_${num}
-            allennlp train configs/models/classifier/gru_classifier_no_vocab.jsonnet \
+            config_path=configs/models/classifier/gru_classifier_no_vocab.jsonnet
+            if [ "${WARM_START}" = "1" ]; then
+                # fine-tuning starts from the substitute classifier instead of a random initialization,
+                # the trained archive loads it from this absolute path
+                export SUBSTITUTE_CLF_DIR=$(realpath ${LOGS_DIR}/${data_type}/dataset_${dataset}/substitute_clf)
+                config_path=configs/models/fine_tuning/gru_classifier_warm_start.jsonnet
+            fi
+            allennlp train ${config_path} \
                 -s ${clf_dif} \
                 --force \
-                --include-package adat
+                --include-package adat \
+                -o "{\"trainer\": {\"cuda_device\": ${GPU_ID}}}"
 
             echo ">>>> Evaluating classifier ${dataset} dataset, ${alg_name} algorithm, ${num} examples"
             allennlp evaluate \
@@ -14,16 +14,14 @@ for data_type in nlp non_nlp; do
         dataset=$(basename ${result_dir})
         target_clf_dir=${LOG_DIR}/${data_type}/dataset_${dataset}/target_clf
 
-        for dir in $(ls -d ${result_dir}/*); do
-            alg_name=$(basename ${dir})
-            echo ">>>> Evaluating ${dataset} dataset, ${alg_name} algorithm"
-            PYTHONPATH=. python scripts/evaluate_attack.py \
-                --adversarial-dir ${dir} \
-                --classifier-dir ${target_clf_dir} \
-                --cuda ${GPU_ID}
-        done
+        # all algorithms of a dataset are evaluated in one pass
+        echo ">>>> Evaluating ${dataset} dataset, algorithms: $(ls ${result_dir} | tr '\n' ' ')"
+        PYTHONPATH=. python scripts/evaluate_attack.py \
+            --adversarial-dir $(ls -d ${result_dir}/*/) \
+            --classifier-dir ${target_clf_dir} \
+            --cuda ${GPU_ID}
     done
 done
 
 
-PYTHONPATH=. python scripts/aggregate_results.py --results-dir ${RESULTS_DIR}
\ No newline at end of file
+PYTHONPATH=. python scripts/aggregate_results.py --results-dir ${RESULTS_DIR}
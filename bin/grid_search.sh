@@ -1,7 +1,7 @@
 #!/usr/bin/env bash
 
 # usage
-# bash bin/attack.sh {FILENAME} {NUM_SAMPLES} {RESULTS_DIR} {GPU_ID} {LOG_DIR} {DATA_DIR}
+# bash bin/grid_search.sh {FILENAME} {NUM_SAMPLES} {RESULTS_DIR} {GPU_ID} {LOG_DIR} {DATA_DIR}
 
 # test or valid
 FILENAME=${1:-"test"}
@@ -13,7 +13,11 @@ GPU_ID=${4:-$default_gpu_id}
 LOG_DIR=${5:-"logs"}
 DATA_DIR=${6:-"datasets"}
 
-NUM_CONFIGS=100
+# every config is evaluated on MIN_SAMPLE_SIZE examples first,
+# then the best 1/ETA of configs are evaluated on ETA times more examples (successive halving)
+MIN_SAMPLE_SIZE=10
+ETA=3
+CONFIG_PATHS="configs/attacks/cascada/grid_search/config_*.json"
 
 echo ">> Attacking NLP models"
 # NLP attacks use shared LM and DeepLev models
@@ -24,28 +28,19 @@ NLP_RESULTS_DIR=${RESULTS_DIR}/nlp
 for dir in $(ls -d ${NLP_LOG_DIR}/dataset_*); do
     dataset=$(basename ${dir} | cut -d'_' -f 2)
 
-    for i in $(seq 1 ${NUM_CONFIGS}); do
-        echo ">>>>>>>>>>> 1/2 [${dataset}]: ${i}/${NUM_CONFIGS}"
-        adv_dir=${NLP_RESULTS_DIR}/${dataset}/cascada/grid_search/${i}
-        conf_path=configs/attacks/cascada/grid_search/config_${i}.json
-        python -m json.tool ${conf_path}
-        PYTHONPATH=. python scripts/cascada_attack.py \
-            --config-path ${conf_path} \
-            --test-path ${NLP_DATA_DIR}/${dataset}/target_clf/${FILENAME}.json \
-            --classifier-dir ${dir}/substitute_clf \
-            --deep-levenshtein-dir ${NLP_LOG_DIR}/lev \
-            --lm-dir ${NLP_LOG_DIR}/lm \
-            --out-dir ${adv_dir} \
-            --sample-size ${SAMPLE_SIZE} \
-            --not-date-dir \
-            --force \
-            --cuda ${GPU_ID}
-
-        PYTHONPATH=. python scripts/evaluate_attack.py \
-            --adversarial-dir ${adv_dir} \
-            --classifier-dir ${dir}/target_clf \
-            --cuda ${GPU_ID}
-    done
+    echo ">>>>>>>>>>> 1/2 [${dataset}]"
+    PYTHONPATH=. python scripts/cascada_sweep.py \
+        --config-paths "${CONFIG_PATHS}" \
+        --test-path ${NLP_DATA_DIR}/${dataset}/target_clf/${FILENAME}.json \
+        --classifier-dir ${dir}/substitute_clf \
+        --target-classifier-dir ${dir}/target_clf \
+        --deep-levenshtein-dir ${NLP_LOG_DIR}/lev \
+        --lm-dir ${NLP_LOG_DIR}/lm \
+        --out-dir ${NLP_RESULTS_DIR}/${dataset}/cascada/grid_search \
+        --sample-size ${SAMPLE_SIZE} \
+        --min-sample-size ${MIN_SAMPLE_SIZE} \
+        --eta ${ETA} \
+        --cuda ${GPU_ID}
 done
 
 
@@ -58,28 +53,19 @@ NON_NLP_RESULTS_DIR=${RESULTS_DIR}/non_nlp
 for dir in $(ls -d ${NON_NLP_LOG_DIR}/dataset_*); do
     dataset=$(basename ${dir} | cut -d'_' -f 2)
 
-    for i in $(seq 1 ${NUM_CONFIGS}); do
-        echo ">>>>>>>>>>> 2/2 [${dataset}]: ${i}/${NUM_CONFIGS}"
-        adv_dir=${NON_NLP_RESULTS_DIR}/${dataset}/cascada/grid_search/${i}
-        conf_path=configs/attacks/cascada/grid_search/config_${i}.json
-        python -m json.tool ${conf_path}
-        PYTHONPATH=. python scripts/cascada_attack.py \
-            --config-path ${conf_path} \
-            --test-path ${NON_NLP_DATA_DIR}/${dataset}/target_clf/${FILENAME}.json \
-            --classifier-dir ${dir}/substitute_clf \
-            --deep-levenshtein-dir ${dir}/lev \
-            --lm-dir ${dir}/lm \
-            --out-dir ${adv_dir} \
-            --sample-size ${SAMPLE_SIZE} \
-            --not-date-dir \
-            --force \
-            --cuda ${GPU_ID}
-
-        PYTHONPATH=. python scripts/evaluate_attack.py \
-            --adversarial-dir ${adv_dir} \
-            --classifier-dir ${dir}/target_clf \
-            --cuda ${GPU_ID}
-    done
+    echo ">>>>>>>>>>> 2/2 [${dataset}]"
+    PYTHONPATH=. python scripts/cascada_sweep.py \
+        --config-paths "${CONFIG_PATHS}" \
+        --test-path ${NON_NLP_DATA_DIR}/${dataset}/target_clf/${FILENAME}.json \
+        --classifier-dir ${dir}/substitute_clf \
+        --target-classifier-dir ${dir}/target_clf \
+        --deep-levenshtein-dir ${dir}/lev \
+        --lm-dir ${dir}/lm \
+        --out-dir ${NON_NLP_RESULTS_DIR}/${dataset}/cascada/grid_search \
+        --sample-size ${SAMPLE_SIZE} \
+        --min-sample-size ${MIN_SAMPLE_SIZE} \
+        --eta ${ETA} \
+        --cuda ${GPU_ID}
 done
 
 
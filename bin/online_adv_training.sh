@@ -0,0 +1,44 @@
+#!/usr/bin/env bash
+
+# usage
+# bash bin/online_adv_training.sh {GPU_ID}
+# adversarial examples are generated during training (see configs/models/classifier/gru_classifier_adversarial_training.jsonnet),
+# no attack results or prepared fine-tuning data are needed
+
+set -eo pipefail -v
+
+default_gpu_id=0
+GPU_ID=${1:-$default_gpu_id}
+
+LOGS_DIR="logs"
+DATASETS_DIR="datasets"
+
+declare -A datasets_num_labels
+datasets_num_labels=( ["ag"]=4 ["sst"]=2 ["trec"]=6 ["mr"]=2 ["ins"]=2 ["age"]=4 ["gender"]=2)
+
+for data_type in non_nlp nlp; do
+    for dataset_dir in $(ls -d ${DATASETS_DIR}/${data_type}/*/); do
+        dataset=$(basename ${dataset_dir})
+
+        echo ">>>> Adversarial training ${dataset} dataset"
+        export CLS_NUM_CLASSES="${datasets_num_labels[${dataset}]}"
+        export CLS_TRAIN_DATA_PATH=${dataset_dir}/target_clf/train.json
+        export CLS_VALID_DATA_PATH=${dataset_dir}/target_clf/valid.json
+
+        clf_dir=${LOGS_DIR}/${data_type}/dataset_${dataset}/target_clf/online_adversarial_training
+        allennlp train configs/models/classifier/gru_classifier_adversarial_training.jsonnet \
+            -s ${clf_dir} \
+            --force \
+            --include-package adat \
+            -o "{\"trainer\": {\"cuda_device\": ${GPU_ID}}}"
+
+        echo ">>>> Evaluating classifier ${dataset} dataset"
+        # reports accuracy, adversarial_accuracy and attack_success_rate on the test set
+        allennlp evaluate \
+            ${clf_dir}/model.tar.gz \
+            ${dataset_dir}/target_clf/test.json \
+            --include-package adat  \
+            --output-file ${clf_dir}/test_metrics.json \
+            --cuda-device ${GPU_ID}
+    done
+done
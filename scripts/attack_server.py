@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import json
+
+from adat.service import AttackServer
+from adat.utils import set_seed
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--attacker", type=str, choices=["cascada", "distribution_cascada", "fgsm", "deepfool"], required=True)
+parser.add_argument("--config-path", type=str, required=True)
+parser.add_argument("--classifier-dir", type=str, required=True)
+# Cascada only
+parser.add_argument("--lm-dir", type=str, default=None)
+parser.add_argument("--deep-levenshtein-dir", type=str, default=None)
+
+# listens on a Unix socket if --socket is given, on TCP --host:--port otherwise
+parser.add_argument("--socket", type=str, default=None)
+parser.add_argument("--host", type=str, default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8765)
+# only FGSM attacks a batch at once, other attackers answer every request as soon as it is attacked with 1
+parser.add_argument("--max-batch-size", type=int, default=1)
+parser.add_argument("--max-latency-ms", type=float, default=10.0)
+# attacks past their budget return the best adversarial example found so far
+parser.add_argument("--time-budget", type=float, default=None, help="seconds per example")
+parser.add_argument("--history-every", type=int, default=0, help="keep every n-th attack step, 0 keeps none")
+parser.add_argument("--seed", type=int, default=None)
+parser.add_argument("--cuda", type=int, default=-1)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    config = json.load(open(args.config_path))
+    if args.seed is not None:
+        set_seed(args.seed)
+
+    if args.attacker in ("cascada", "distribution_cascada"):
+        from adat.attackers import Cascada, DistributionCascada
+
+        cascada = Cascada if args.attacker == "cascada" else DistributionCascada
+        attacker = cascada(
+            masked_lm_dir=args.lm_dir,
+            classifier_dir=args.classifier_dir,
+            deep_levenshtein_dir=args.deep_levenshtein_dir,
+            alpha=config["alpha"],
+            beta=config["beta"],
+            lr=config["lr"],
+            num_gumbel_samples=config.get("num_gumbel_samples", 1),
+            tau=config.get("tau", 1.0),
+            num_samples=config["num_samples"],
+            temperature=config["temperature"],
+            parameters_to_update=config["parameters_to_update"],
+            adaptive=config.get("adaptive"),
+            device=args.cuda
+        )
+        attack_kwargs = {"max_steps": config["max_steps"], "early_stopping": config["early_stopping"]}
+    else:
+        from adat.attackers import FGSMAttacker, DeepFoolAttacker
+
+        attacker_cls = FGSMAttacker if args.attacker == "fgsm" else DeepFoolAttacker
+        attacker = attacker_cls.from_archive(args.classifier_dir, device=args.cuda, **config)
+        attack_kwargs = dict()
+    attacker.set_history_every(args.history_every)
+    attacker.set_time_budget(args.time_budget)
+
+    server = AttackServer(
+        attacker,
+        max_batch_size=args.max_batch_size,
+        max_latency_ms=args.max_latency_ms,
+        attack_kwargs=attack_kwargs
+    )
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(server.start(host=args.host, port=args.port, path=args.socket))
+    print(f"Serving {args.attacker} on {args.socket or f'{args.host}:{args.port}'}")
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Metrics: {server.metrics()}")
+        loop.run_until_complete(server.close())
@@ -0,0 +1,27 @@
+import argparse
+from pathlib import Path
+
+from allennlp.data import Vocabulary
+
+from adat.binary_dataset import binarize_jsonlines
+
+parser = argparse.ArgumentParser()
+# must be the vocabulary of the model trained on the data, usually the LM vocabulary
+parser.add_argument("--vocab-dir", type=str, required=True)
+parser.add_argument("--data-path", type=str, nargs="+", required=True)
+# every file goes to {output-dir}/{file name without extension}
+parser.add_argument("--output-dir", type=str, required=True)
+parser.add_argument("--namespace", type=str, default="tokens")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    vocab = Vocabulary.from_files(args.vocab_dir)
+    token_to_index = vocab.get_token_to_index_vocabulary(args.namespace)
+    oov_index = token_to_index.get(vocab._oov_token)
+    assert oov_index is not None, f"{args.namespace} namespace has no OOV token"
+
+    for data_path in args.data_path:
+        output_dir = Path(args.output_dir) / Path(data_path).stem
+        meta = binarize_jsonlines(data_path, output_dir, lambda token: token_to_index.get(token, oov_index))
+        print(f"{data_path} -> {output_dir}: {meta}")
@@ -6,6 +6,8 @@ import numpy as np
 from sklearn.metrics import roc_auc_score
 from allennlp.predictors import Predictor
 
+from adat import register_all
+from adat.quantization import quantize_dynamic
 from adat.utils import load_jsonlines
 
 parser = argparse.ArgumentParser()
@@ -13,6 +15,8 @@ parser.add_argument("--adversarial-dir", type=str, required=True)
 parser.add_argument("--classifier-dir", type=str, required=True)
 parser.add_argument("--test-path", type=str, required=True)
 
+# int8 discriminator on CPU
+parser.add_argument("--quantize", action="store_true")
 parser.add_argument("--cuda", type=int, default=-1)
 
 
@@ -24,11 +28,15 @@ if __name__ == "__main__":
 
     labels = np.array([int(el['label']) for el in test])
 
+    register_all()
     predictor = Predictor.from_path(
         classifier_dir / "model.tar.gz",
         predictor_name="text_classifier",
         cuda_device=args.cuda
     )
+    if args.quantize:
+        assert args.cuda < 0, "quantized models run on CPU"
+        predictor._model = quantize_dynamic(predictor._model)
 
     preds = predictor.predict_batch_json([{"sentence": el["text"]} for el in test])
     probs = np.array([p['probs'] for p in preds])
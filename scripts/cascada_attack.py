@@ -7,8 +7,11 @@ from pathlib import Path
 
 from allennlp.common.util import dump_metrics
 
-from adat.utils import load_jsonlines
-from adat.attackers import Cascada, DistributionCascada
+from adat.attack_results import AttackResultsWriter, COLUMNAR_NAME
+from adat.scheduling import map_length_scheduled
+from adat.utils import iterate_jsonlines
+from adat.attackers.profiling import merge_timings, format_timings, trace_window
+from adat.attackers import Cascada, DistributionCascada, AttackCache, CachedAttacker
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--config-path", type=str, required=True)
@@ -23,11 +26,29 @@ parser.add_argument("--sample-size", type=int, default=None)
 parser.add_argument("--not-date-dir", action="store_true")
 parser.add_argument("--force", action="store_true")
 parser.add_argument("--distribution-level", action="store_true")
+# examples are attacked longest first within windows of `schedule-window` examples and written in file order.
+# 1 attacks them in file order.
+parser.add_argument("--schedule-window", type=int, default=1)
+parser.add_argument("--cache-dir", type=str, default=None)
+parser.add_argument("--seed", type=int, default=None)
+# attacks past their deadline return the best adversarial example found so far
+parser.add_argument("--time-budget", type=float, default=None, help="seconds per example")
+parser.add_argument("--run-deadline", type=float, default=None, help="seconds for the whole run")
+parser.add_argument("--history-every", type=int, default=1, help="keep every n-th attack step, 0 keeps none")
+parser.add_argument("--profile-stages", action="store_true", help="per-stage wall time of the attacks")
+parser.add_argument("--profile", action="store_true", help="torch profiler trace of a window of examples")
+parser.add_argument("--profile-start", type=int, default=1)
+parser.add_argument("--profile-examples", type=int, default=5)
+parser.add_argument("--profile-row-limit", type=int, default=30)
+# int8 classifier for the exact scoring of candidates, CPU only
+parser.add_argument("--quantize", action="store_true")
 parser.add_argument("--cuda", type=int, default=-1)
 
 
 if __name__ == "__main__":
     args = parser.parse_args()
+    # the trace window counts examples as they are read, a scheduled window is read before it is attacked
+    assert not (args.profile and args.schedule_window > 1), "--profile needs --schedule-window 1"
     config = json.load(open(args.config_path))
 
     out_dir = Path(args.out_dir)
@@ -43,7 +64,8 @@ if __name__ == "__main__":
 
     dump_metrics(str(args_path), {**args.__dict__, **config})
 
-    data = load_jsonlines(args.test_path)[:args.sample_size]
+    # streamed, only the first `sample_size` lines are read
+    data = iterate_jsonlines(args.test_path, limit=args.sample_size)
 
     if args.distribution_level:
         cascada = DistributionCascada
@@ -62,17 +84,71 @@ if __name__ == "__main__":
         num_samples=config["num_samples"],
         temperature=config["temperature"],
         parameters_to_update=config["parameters_to_update"],
+        adaptive=config.get("adaptive"),
+        quantize_scoring=args.quantize,
         device=args.cuda
     )
 
+    attacker.set_history_every(args.history_every)
+    attacker.set_time_budget(args.time_budget, args.run_deadline)
+    if args.profile_stages:
+        attacker.enable_profiling(synchronize_cuda=args.cuda >= 0)
+    # every example is seeded, so results depend neither on the order nor on the schedule window
+    attacker.set_example_seed(args.seed)
+
+    cache = None
+    if args.cache_dir is not None:
+        cache = AttackCache(
+            args.cache_dir,
+            attacker_name=cascada.__name__,
+            # int8 scoring may flip borderline labels, existing fp32 entries keep their keys
+            config=dict(config, quantize_scoring=True) if args.quantize else config,
+            archive_paths=[
+                Path(args.lm_dir) / "model.tar.gz",
+                Path(args.classifier_dir) / "model.tar.gz",
+                Path(args.deep_levenshtein_dir) / "model.tar.gz"
+            ],
+            seed=args.seed
+        )
+        attacker = CachedAttacker(attacker, cache)
+
+    if args.profile:
+        print(f"Saving the trace of examples {args.profile_start}..{args.profile_start + args.profile_examples - 1} "
+              f"to {out_dir / 'profile'}")
+        data = trace_window(
+            data,
+            out_dir / "profile",
+            start=args.profile_start,
+            num_examples=args.profile_examples,
+            use_cuda=args.cuda >= 0,
+            row_limit=args.profile_row_limit
+        )
+
+    all_timings = []
     print(f"Saving results to {results_path}")
-    with jsonlines.open(results_path, "w") as writer:
-        for el in tqdm(data):
-            adversarial_output = attacker.attack(
-                sequence_to_attack=el["text"],
-                label_to_attack=el["label"],
-                max_steps=config["max_steps"],
-                early_stopping=config["early_stopping"]
-            )
-
-            writer.write(adversarial_output.__dict__)
+    outputs = map_length_scheduled(
+        lambda batch: attacker.attack_batch(
+            [el["text"] for el in batch],
+            [el["label"] for el in batch],
+            max_steps=config["max_steps"],
+            early_stopping=config["early_stopping"]
+        ),
+        data,
+        length=lambda el: len(el["text"].split()),
+        window_size=args.schedule_window
+    )
+    with jsonlines.open(results_path, "w") as writer, AttackResultsWriter(out_dir / COLUMNAR_NAME) as columnar_writer:
+        for adversarial_output in tqdm(outputs):
+            all_timings.append(adversarial_output.timings)
+            writer.write(adversarial_output.to_dict())
+            columnar_writer.write(adversarial_output)
+
+    if cache is not None:
+        print(f"Cache: {cache.stats()}")
+        dump_metrics(str(out_dir / "cache_stats.json"), cache.stats())
+
+    if args.profile_stages:
+        # cache hits are not timed
+        stage_profile = merge_timings(all_timings)
+        print(format_timings(stage_profile))
+        dump_metrics(str(out_dir / "stage_profile.json"), stage_profile)
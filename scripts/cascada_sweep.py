@@ -0,0 +1,132 @@
+import argparse
+from glob import glob
+from pathlib import Path
+import json
+import re
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from allennlp.predictors import Predictor
+from allennlp.common.util import dump_metrics
+
+from adat import register_all
+from adat.utils import load_jsonlines, set_seed, normalized_accuracy_drop
+from adat.attackers import Cascada, DistributionCascada
+from adat.sweep import successive_halving
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--config-paths", type=str, default="configs/attacks/cascada/grid_search/config_*.json")
+parser.add_argument("--lm-dir", type=str, required=True)
+parser.add_argument("--classifier-dir", type=str, required=True)
+parser.add_argument("--target-classifier-dir", type=str, required=True)
+parser.add_argument("--deep-levenshtein-dir", type=str, required=True)
+
+parser.add_argument("--test-path", type=str, required=True)
+parser.add_argument("--out-dir", type=str, required=True)
+
+parser.add_argument("--sample-size", type=int, default=100)
+parser.add_argument("--min-sample-size", type=int, default=10)
+parser.add_argument("--eta", type=int, default=3)
+parser.add_argument("--gamma", type=float, default=1.0)
+parser.add_argument("--distribution-level", action="store_true")
+parser.add_argument("--seed", type=int, default=None)
+parser.add_argument("--cuda", type=int, default=-1)
+
+
+def _config_num(path: str) -> str:
+    return re.sub(r"[^\d]+", "", Path(path).stem) or Path(path).stem
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(exist_ok=True, parents=True)
+    dump_metrics(str(out_dir / "args.json"), args.__dict__)
+
+    configs = dict()
+    for path in sorted(glob(args.config_paths)):
+        with open(path) as f:
+            configs[_config_num(path)] = json.load(f)
+    assert configs, f"No configs found at {args.config_paths}"
+
+    data = load_jsonlines(args.test_path, limit=args.sample_size)
+    sequences = [el["text"] for el in data]
+    labels = [int(el["label"]) for el in data]
+
+    cascada = DistributionCascada if args.distribution_level else Cascada
+    first_config = next(iter(configs.values()))
+    # models are loaded once, every config only changes the hyperparameters
+    attacker = cascada(
+        masked_lm_dir=args.lm_dir,
+        classifier_dir=args.classifier_dir,
+        deep_levenshtein_dir=args.deep_levenshtein_dir,
+        alpha=first_config["alpha"],
+        beta=first_config["beta"],
+        lr=first_config["lr"],
+        device=args.cuda
+    )
+    register_all()
+    predictor = Predictor.from_path(
+        Path(args.target_classifier_dir) / "model.tar.gz",
+        predictor_name="text_classifier",
+        cuda_device=args.cuda
+    )
+    orig_probs = [p["probs"] for p in predictor.predict_batch_json([{"sentence": seq} for seq in sequences])]
+
+    # adversarial examples are reused by the next rungs, which are evaluated on a superset of examples
+    attacked = {name: [] for name in configs}
+
+    def evaluate(name, config, num_examples):
+        attacker.update_hyperparameters(
+            alpha=config["alpha"],
+            beta=config["beta"],
+            lr=config["lr"],
+            num_gumbel_samples=config.get("num_gumbel_samples", 1),
+            tau=config.get("tau", 1.0),
+            num_samples=config["num_samples"],
+            temperature=config["temperature"],
+            parameters_to_update=config["parameters_to_update"]
+        )
+        outputs = attacked[name]
+        for i in tqdm(range(len(outputs), num_examples), desc=f"config {name}, {num_examples} examples"):
+            if args.seed is not None:
+                set_seed(args.seed)
+            output = attacker.attack(
+                sequence_to_attack=sequences[i],
+                label_to_attack=labels[i],
+                max_steps=config["max_steps"],
+                early_stopping=config["early_stopping"]
+            )
+            adv_probs = predictor.predict_json({"sentence": output.adversarial_sequence})["probs"]
+            outputs.append((output.wer, int(np.argmax(adv_probs)), orig_probs[i][labels[i]] - adv_probs[labels[i]]))
+
+        wers, y_adv, prob_diffs = map(list, zip(*outputs[:num_examples]))
+        y_true = labels[:num_examples]
+        metrics = {
+            f"NAD_{args.gamma}": normalized_accuracy_drop(wers=wers, y_true=y_true, y_adv=y_adv, gamma=args.gamma),
+            "mean_prob_diff": float(np.mean(prob_diffs)),
+            "mean_wer": float(np.mean(wers)),
+            "misclassification_error": float((np.array(y_true) != np.array(y_adv)).mean())
+        }
+        return metrics
+
+    rows = successive_halving(
+        configs,
+        evaluate,
+        min_examples=min(args.min_sample_size, len(data)),
+        max_examples=len(data),
+        eta=args.eta,
+        metric=f"NAD_{args.gamma}"
+    )
+
+    results = pd.DataFrame(rows)
+    results.to_csv(out_dir / "sweep_results.csv", index=False)
+
+    final = results[results["rung"] == results["rung"].max()]
+    best = final.iloc[final[f"NAD_{args.gamma}"].argmax()]
+    with open(out_dir / "best_config.json", "w") as f:
+        json.dump(configs[best["config_num"]], f, indent=4)
+
+    print(results.to_markdown())
+    print(f"Best NAD: {best[f'NAD_{args.gamma}']}, Best config num: {best['config_num']}")
@@ -0,0 +1,20 @@
+import argparse
+from pathlib import Path
+
+from adat.attack_results import convert_jsonlines, JSONLINES_NAME, COLUMNAR_NAME
+
+parser = argparse.ArgumentParser()
+# writes {adversarial-dir}/attacked_data/ from {adversarial-dir}/attacked_data.json
+parser.add_argument("--adversarial-dir", type=str, nargs="+", required=True)
+parser.add_argument("--force", action="store_true")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    for adversarial_dir in map(Path, args.adversarial_dir):
+        output_dir = adversarial_dir / COLUMNAR_NAME
+        if output_dir.exists() and not args.force:
+            print(f"Skipping {adversarial_dir}, {output_dir} exists")
+            continue
+        num_rows = convert_jsonlines(adversarial_dir / JSONLINES_NAME, output_dir)
+        print(f"{adversarial_dir}: {num_rows} rows")
@@ -0,0 +1,75 @@
+import argparse
+from pathlib import Path
+from typing import List
+
+import jsonlines
+import torch
+from tqdm import tqdm
+from allennlp.data import Batch, DatasetReader
+from allennlp.models import Model, load_archive
+from allennlp.nn.util import move_to_device
+
+from adat import register_all
+from adat.utils import iterate_jsonlines, length_bucketed_batches
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--deep-levenshtein-dir", type=str, required=True)
+parser.add_argument("--data-path", type=str, required=True)
+# neighbours are searched in --data-path for every query, the data itself is used by default (without self-matches)
+parser.add_argument("--query-path", type=str, default=None)
+parser.add_argument("--field-name", type=str, default="text")
+parser.add_argument("--output-path", type=str, required=True)
+parser.add_argument("--top-k", type=int, default=10)
+parser.add_argument("--batch-size", type=int, default=256)
+parser.add_argument("--tile-size", type=int, default=512)
+parser.add_argument("--cuda", type=int, default=-1)
+
+
+@torch.no_grad()
+def encode_texts(model: Model, reader: DatasetReader, texts: List[str], batch_size: int, cuda: int) -> torch.Tensor:
+    vectors = [None] * len(texts)
+    for batch_indexes in tqdm(length_bucketed_batches(texts, batch_size), desc="encoding"):
+        # the reader only builds pairs, the first sequence of each pair is encoded
+        batch = Batch([reader.text_to_instance(texts[i], texts[i]) for i in batch_indexes])
+        batch.index_instances(model.vocab)
+        tokens = move_to_device(batch.as_tensor_dict()["sequence_a"], cuda)
+        for i, vector in zip(batch_indexes, model.encode_sequence(tokens)):
+            vectors[i] = vector
+    return torch.stack(vectors)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    register_all()
+    archive = load_archive(Path(args.deep_levenshtein_dir) / "model.tar.gz", cuda_device=args.cuda)
+    model = archive.model
+    model.eval()
+    reader = DatasetReader.from_params(archive.config["dataset_reader"])
+
+    texts = [el[args.field_name] for el in iterate_jsonlines(args.data_path)]
+    vectors = encode_texts(model, reader, texts, args.batch_size, args.cuda)
+    if args.query_path is not None:
+        queries = [el[args.field_name] for el in iterate_jsonlines(args.query_path)]
+        query_vectors = encode_texts(model, reader, queries, args.batch_size, args.cuda)
+    else:
+        queries, query_vectors = texts, vectors
+
+    with torch.no_grad():
+        distances, indexes = model.topk_nearest(
+            query_vectors,
+            vectors,
+            k=args.top_k,
+            tile_size=args.tile_size,
+            exclude_diagonal=args.query_path is None
+        )
+
+    print(f"Saving neighbours to {args.output_path}")
+    with jsonlines.open(args.output_path, "w") as writer:
+        for query, query_distances, query_indexes in zip(queries, distances.tolist(), indexes.tolist()):
+            writer.write({
+                args.field_name: query,
+                "neighbours": [
+                    {args.field_name: texts[idx], "distance": distance}
+                    for idx, distance in zip(query_indexes, query_distances)
+                ]
+            })
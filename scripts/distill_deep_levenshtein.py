@@ -0,0 +1,47 @@
+import argparse
+from itertools import islice
+from pathlib import Path
+
+import jsonlines
+import torch
+from tqdm import tqdm
+from allennlp.data import Batch, DatasetReader
+from allennlp.models import load_archive
+from allennlp.nn.util import move_to_device
+
+from adat import register_all
+from adat.utils import iterate_jsonlines
+
+parser = argparse.ArgumentParser()
+# the teacher
+parser.add_argument("--deep-levenshtein-dir", type=str, required=True)
+# every file is copied to {output-dir}/{file name} with the teacher distance in `teacher_dist`
+parser.add_argument("--data-path", type=str, nargs="+", required=True)
+parser.add_argument("--output-dir", type=str, required=True)
+parser.add_argument("--batch-size", type=int, default=256)
+parser.add_argument("--cuda", type=int, default=-1)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    register_all()
+    archive = load_archive(Path(args.deep_levenshtein_dir) / "model.tar.gz", cuda_device=args.cuda)
+    model = archive.model
+    model.eval()
+    reader = DatasetReader.from_params(archive.config["dataset_reader"])
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(exist_ok=True, parents=True)
+    for data_path in args.data_path:
+        output_path = output_dir / Path(data_path).name
+        print(f"Saving {data_path} with teacher distances to {output_path}")
+        data = iterate_jsonlines(data_path)
+        with jsonlines.open(output_path, "w") as writer, tqdm() as progress:
+            for chunk in iter(lambda: list(islice(data, args.batch_size)), []):
+                batch = Batch([reader.text_to_instance(el["seq_a"], el["seq_b"]) for el in chunk])
+                batch.index_instances(model.vocab)
+                with torch.no_grad():
+                    distances = model(**move_to_device(batch.as_tensor_dict(), args.cuda))["distance"].view(-1)
+                for el, distance in zip(chunk, distances.tolist()):
+                    writer.write({**el, "teacher_dist": distance})
+                progress.update(len(chunk))
@@ -1,100 +1,88 @@
 import argparse
 from pathlib import Path
 from pprint import pprint
-from tqdm import tqdm
 import json
 
-import numpy as np
-from allennlp.predictors import Predictor
-from allennlp.models import Model
-from allennlp.data import DatasetReader
-from allennlp.common.params import Params
-
-from adat.dataset_readers.lm_reader import SimpleLanguageModelingDatasetReaderFixed
-from adat.utils import load_jsonlines, normalized_accuracy_drop, normalized_accuracy_drop_with_perplexity
+from adat.evaluation import ClassifierScorer, calculate_attack_metrics
+from adat.perplexity import PerplexityScorer
+from adat.attack_results import load_attack_results
 
 parser = argparse.ArgumentParser()
-parser.add_argument("--adversarial-dir", type=str, required=True)
-parser.add_argument("--classifier-dir", type=str, required=True)
+# every classifier is evaluated on every adversarial dir,
+# each distinct text is tokenized once and predicted once per classifier
+parser.add_argument("--adversarial-dir", type=str, nargs="+", required=True)
+parser.add_argument("--classifier-dir", type=str, nargs="+", required=True)
 parser.add_argument("--lm-dir", type=str, default=None)
 parser.add_argument("--gamma", type=float, default=1.0)
+parser.add_argument("--batch-size", type=int, default=128)
+parser.add_argument("--lm-batch-size", type=int, default=64)
+# perplexities of the original sequences are shared by all attackers of a dataset
+parser.add_argument("--perplexity-cache", type=str, default=None, help="defaults to {adversarial-dir}/../perplexities.json")
+# int8 classifiers on CPU, see scripts/quantization_drift.py for the agreement with fp32
+parser.add_argument("--quantize", action="store_true")
 parser.add_argument("--cuda", type=int, default=-1)
 
 
 if __name__ == "__main__":
     args = parser.parse_args()
-    adversarial_dir = Path(args.adversarial_dir)
-    data = load_jsonlines(adversarial_dir / "attacked_data.json")
+    adversarial_dirs = [Path(adversarial_dir) for adversarial_dir in args.adversarial_dir]
+    columns = ["sequence", "adversarial_sequence", "wer", "attacked_label"]
+    all_data = dict()
+    for adversarial_dir in adversarial_dirs:
+        results = load_attack_results(adversarial_dir, columns)
+        all_data[adversarial_dir] = {
+            "sequence": list(results["sequence"]),
+            "adversarial_sequence": list(results["adversarial_sequence"]),
+            "wer": results["wer"].tolist(),
+            "attacked_label": results["attacked_label"].tolist(),
+        }
+
+    texts = set()
+    for data in all_data.values():
+        texts.update(data["sequence"])
+        texts.update(data["adversarial_sequence"])
+    texts = sorted(texts)
 
+    perplexities = dict()
     if args.lm_dir is not None:
-        lm_dir = Path(args.lm_dir)
-        lm_model = Model.from_archive(lm_dir / "model.tar.gz")
-        reader = DatasetReader.from_params(Params.from_file(lm_dir /'config.json')['dataset_reader'])
-        lm_predictor = Predictor(lm_model, reader)
-        get_perplexity = lambda text: np.exp(
-            lm_predictor.predict_instance(
-                lm_predictor._dataset_reader.text_to_instance(text)
-            )["loss"]
+        scorer = PerplexityScorer.from_path(
+            args.lm_dir,
+            batch_size=args.lm_batch_size,
+            cuda_device=args.cuda,
+            cache_path=args.perplexity_cache or str(adversarial_dirs[0].parent / "perplexities.json")
         )
-        orig_perplexities = [get_perplexity(el["sequence"]) for el in tqdm(data)]
-        adv_perplexities = [get_perplexity(el["adversarial_sequence"]) for el in tqdm(data)]
-        perp_diff = [max(0.0, adv_perplexities[i] - orig_perplexities[i]) for i in range(len(data))]
-        mean_perplexity_rise = float(np.mean(perp_diff))
-    else:
-        mean_perplexity_rise = None
-        orig_perplexities = None
-        adv_perplexities = None
-
-    classifier_dir = Path(args.classifier_dir)
-    predictor = Predictor.from_path(
-        classifier_dir / "model.tar.gz",
-        predictor_name="text_classifier",
-        cuda_device=args.cuda
-    )
-    preds = predictor.predict_batch_json([{"sentence": el["sequence"]} for el in data])
-    y_true = [int(el["attacked_label"]) for el in data]
-    correctly_predicted = [y == int(np.argmax(p["probs"])) for y, p in zip(y_true, preds)]
-
-    adv_preds = predictor.predict_batch_json([{"sentence": el["adversarial_sequence"]} for el in data])
-    y_adv = [int(np.argmax(el["probs"])) for el in adv_preds]
+        perplexities = dict(zip(texts, scorer.score(texts)))
 
-    prob_diffs = [p["probs"][l] - ap["probs"][l] for p, ap, l in zip(preds, adv_preds, y_true)]
-    wers = [el["wer"] for el in data]
-
-    misclassification_error = (np.array(y_true) != np.array(y_adv)).mean()
-    nad = normalized_accuracy_drop(
-        wers=wers,
-        y_true=y_true,
-        y_adv=y_adv,
-        gamma=args.gamma
-    )
-
-    if orig_perplexities is not None and adv_perplexities is not None:
-        nad_with_perp = normalized_accuracy_drop_with_perplexity(
-            wers=wers,
-            y_true=y_true,
-            y_adv=y_adv,
-            perp_true=orig_perplexities,
-            perp_adv=adv_perplexities,
-            gamma=args.gamma
+    tokenizer_memos = dict()
+    for classifier_dir in args.classifier_dir:
+        classifier_dir = Path(classifier_dir)
+        classifier = ClassifierScorer(
+            classifier_dir,
+            batch_size=args.batch_size,
+            cuda_device=args.cuda,
+            tokenizer_memos=tokenizer_memos,
+            quantize=args.quantize
         )
-    else:
-        nad_with_perp = None
+        probs = classifier.predict_probs(texts)
+        del classifier
 
-    metrics = dict(
-        mean_prob_diff=float(np.mean(prob_diffs)),
-        mean_wer=float(np.mean(wers)),
-        mean_perplexity_rise=mean_perplexity_rise
-    )
-    metrics[f"NAD_{args.gamma}"] = nad
-    metrics["misclassification_error"] = misclassification_error
-    metrics[f"NAD_with_perplexity_{args.gamma}"] = nad_with_perp
-    metrics["path_to_classifier"] = str(classifier_dir.absolute())
-    if args.lm_dir is not None:
-        metrics["path_to_lm"] = str(Path(args.lm_dir).absolute())
-    else:
-        metrics["path_to_lm"] = None
+        for adversarial_dir, data in all_data.items():
+            metrics = calculate_attack_metrics(
+                wers=data["wer"],
+                y_true=data["attacked_label"],
+                orig_probs=[probs[text] for text in data["sequence"]],
+                adv_probs=[probs[text] for text in data["adversarial_sequence"]],
+                gamma=args.gamma,
+                orig_perplexities=[perplexities[text] for text in data["sequence"]] if perplexities else None,
+                adv_perplexities=[perplexities[text] for text in data["adversarial_sequence"]] if perplexities else None
+            )
+            metrics["path_to_classifier"] = str(classifier_dir.absolute())
+            if args.lm_dir is not None:
+                metrics["path_to_lm"] = str(Path(args.lm_dir).absolute())
+            else:
+                metrics["path_to_lm"] = None
 
-    pprint(metrics)
-    with open(adversarial_dir / f"{classifier_dir.name}_metrics.json", "w") as f:
-        json.dump(metrics, f, indent=4)
+            print(f"{adversarial_dir}, {classifier_dir}:")
+            pprint(metrics)
+            with open(adversarial_dir / f"{classifier_dir.name}_metrics.json", "w") as f:
+                json.dump(metrics, f, indent=4)
@@ -4,12 +4,14 @@ from pathlib import Path
 import jsonlines
 from datetime import datetime
 
-import numpy as np
 from allennlp.predictors import Predictor
 from allennlp.common.util import dump_metrics
 
-from adat.utils import load_jsonlines, calculate_wer
-from adat.attackers import HotFlipFixed, AttackerOutput
+from adat import register_all
+from adat.attack_results import AttackResultsWriter, COLUMNAR_NAME
+from adat.scheduling import map_length_scheduled
+from adat.utils import iterate_jsonlines
+from adat.attackers import HotFlipAttacker, AttackCache, CachedAttacker
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--classifier-dir", type=str, required=True)
@@ -21,6 +23,13 @@ parser.add_argument("--max-tokens", type=int, default=None)
 parser.add_argument("--sample-size", type=int, default=None)
 parser.add_argument("--not-date-dir", action="store_true")
 parser.add_argument("--force", action="store_true")
+# examples are attacked longest first within windows of `schedule-window` examples and written in file order.
+# 1 attacks them in file order.
+parser.add_argument("--schedule-window", type=int, default=1)
+# the original probabilities of a batch are predicted in one forward pass
+parser.add_argument("--batch-size", type=int, default=32)
+parser.add_argument("--cache-dir", type=str, default=None)
+parser.add_argument("--seed", type=int, default=None)
 parser.add_argument("--cuda", type=int, default=-1)
 
 
@@ -38,47 +47,43 @@ if __name__ == "__main__":
 
     dump_metrics(args_path, args.__dict__)
 
-    data = load_jsonlines(args.test_path)[:args.sample_size]
+    # streamed, only the first `sample_size` lines are read
+    data = iterate_jsonlines(args.test_path, limit=args.sample_size)
+    register_all()
     predictor = Predictor.from_path(
         Path(args.classifier_dir) / "model.tar.gz",
         predictor_name="text_classifier",
         cuda_device=args.cuda
     )
-    preds = predictor.predict_batch_json([{"sentence": el["text"].strip()} for el in data])
 
-    attacker = HotFlipFixed(
-        predictor=predictor,
-        max_tokens=args.max_tokens or predictor._model.vocab.get_vocab_size("tokens")
-    )
-
-    print(f"Saving results to {results_path}")
-    with jsonlines.open(results_path, "w") as writer:
-        for el, p in tqdm(zip(data, preds)):
+    attacker = HotFlipAttacker(predictor, max_tokens=args.max_tokens)
+    attacker.set_example_seed(args.seed)
 
-            # if it works then it's not stupid
-            attacked_label = int(el["label"])
-            probs = np.ones(predictor._model._num_labels)
-            probs[attacked_label] = 0
-            out = attacker.attack_from_json({"sentence": el["text"].strip()}, target={"probs": probs})
-            adversarial_sequence = " ".join(out["final"][0])
-            adversarial_probability = out["outputs"]["probs"]
-            if len(adversarial_probability) == 1 and isinstance(adversarial_probability[0], list):
-                adversarial_probabilities = adversarial_probability[0]
-            else:
-                adversarial_probabilities = adversarial_probability
+    cache = None
+    if args.cache_dir is not None:
+        cache = AttackCache(
+            args.cache_dir,
+            attacker_name=type(attacker.hotflip).__name__,
+            config={"max_tokens": attacker.max_tokens},
+            archive_paths=[Path(args.classifier_dir) / "model.tar.gz"],
+            seed=args.seed
+        )
+        attacker = CachedAttacker(attacker, cache)
 
-            adversarial_probability = adversarial_probabilities[attacked_label]
-            adversarial_label = int(np.argmax(adversarial_probabilities))
-
-            adversarial_output = AttackerOutput(
-                sequence=el["text"],
-                probability=p["probs"][attacked_label],
-                adversarial_sequence=adversarial_sequence,
-                adversarial_probability=adversarial_probability,
-                wer=calculate_wer(el["text"], adversarial_sequence),
-                prob_diff=(p["probs"][attacked_label] - adversarial_probability),
-                attacked_label=attacked_label,
-                adversarial_label=adversarial_label
-            )
+    print(f"Saving results to {results_path}")
+    # the number of flips grows with the length, long sequences go first
+    outputs = map_length_scheduled(
+        lambda batch: attacker.attack_batch([el["text"] for el in batch], [int(el["label"]) for el in batch]),
+        data,
+        length=lambda el: len(el["text"].split()),
+        window_size=args.schedule_window,
+        batch_size=args.batch_size
+    )
+    with jsonlines.open(results_path, "w") as writer, AttackResultsWriter(out_dir / COLUMNAR_NAME) as columnar_writer:
+        for adversarial_output in tqdm(outputs):
+            writer.write(adversarial_output.to_dict())
+            columnar_writer.write(adversarial_output)
 
-            writer.write(adversarial_output.__dict__)
+    if cache is not None:
+        print(f"Cache: {cache.stats()}")
+        dump_metrics(str(out_dir / "cache_stats.json"), cache.stats())
@@ -0,0 +1,62 @@
+import argparse
+from pathlib import Path
+
+import torch
+from tqdm import tqdm
+from allennlp.data import Batch, DatasetReader
+from allennlp.models import load_archive
+from allennlp.nn.util import move_to_device
+
+from adat import register_all
+from adat.lm_output_cache import LMOutputCache
+from adat.utils import iterate_jsonlines, length_bucketed_batches
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--lm-dir", type=str, required=True)
+# every distinct `text`, `seq_a` and `seq_b` of the files is stored once
+parser.add_argument("--data-path", type=str, nargs="+", required=True)
+parser.add_argument("--output-dir", type=str, required=True)
+parser.add_argument("--top-k", type=int, default=64)
+parser.add_argument("--batch-size", type=int, default=64)
+parser.add_argument("--cuda", type=int, default=-1)
+
+
+def collect_texts(paths):
+    texts = dict()
+    for path in paths:
+        for item in iterate_jsonlines(path):
+            for key in ("text", "seq_a", "seq_b"):
+                if key in item:
+                    texts[item[key]] = None
+    return list(texts)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    register_all()
+    archive = load_archive(Path(args.lm_dir) / "model.tar.gz", cuda_device=args.cuda)
+    model = archive.model
+    model.eval()
+    reader = DatasetReader.from_params(archive.config["dataset_reader"])
+
+    texts = collect_texts(args.data_path)
+    batches = length_bucketed_batches(texts, args.batch_size)
+    ordered_texts = [texts[i] for batch in batches for i in batch]
+
+    def outputs():
+        for batch_indexes in tqdm(batches):
+            batch = Batch([reader.text_to_instance(texts[i]) for i in batch_indexes])
+            batch.index_instances(model.vocab)
+            tensors = move_to_device(batch.as_tensor_dict(), args.cuda)
+            tokens = next(value for value in tensors.values() if isinstance(value, dict))
+            with torch.no_grad():
+                lm_output = model.forward_inference(tokens)
+                probs, ids = torch.softmax(lm_output["logits"], dim=-1).topk(args.top_k, dim=-1)
+            lengths = lm_output["mask"].sum(dim=-1).tolist()
+            ids, probs = ids.cpu().numpy(), probs.cpu().numpy()
+            for i, length in enumerate(lengths):
+                yield ids[i, :length], probs[i, :length]
+
+    # texts are stored in the processing order, so the writer can stream the outputs
+    LMOutputCache.write(args.output_dir, ordered_texts, outputs())
+    print(f"Saved top-{args.top_k} LM outputs of {len(texts)} texts to {args.output_dir}")
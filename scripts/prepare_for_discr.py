@@ -1,33 +1,59 @@
 import argparse
+from functools import partial
+from multiprocessing import Pool
 from pathlib import Path
+from typing import Dict
 import jsonlines
+import numpy as np
 
-from adat.utils import load_jsonlines
-from sklearn.model_selection import train_test_split
+from adat.attack_results import load_attack_results
+from adat.utils import in_test_split
 
 parser = argparse.ArgumentParser()
-parser.add_argument("--adversarial-dir", type=str, required=True)
-parser.add_argument("--out-dir", type=str, required=True)
+parser.add_argument("--adversarial-dir", type=str, nargs="+", required=True)
+# the data of every adversarial dir goes to {adversarial-dir}/{out-subdir} unless --out-dir is given
+parser.add_argument("--out-dir", type=str, default=None)
+parser.add_argument("--out-subdir", type=str, default="adv_detection")
+parser.add_argument("--test-size", type=float, default=0.2)
+parser.add_argument("--seed", type=int, default=24)
+parser.add_argument("--num-workers", type=int, default=1)
+
+
+def prepare(adversarial_dir: Path, out_dir: Path, test_size: float, seed: int) -> Dict[str, int]:
+    out_dir.mkdir(exist_ok=True)
+    counts = {"train": 0, "test": 0}
+    with jsonlines.open(out_dir / "train.json", "w") as train_writer, \
+            jsonlines.open(out_dir / "test.json", "w") as test_writer:
+        results = load_attack_results(
+            adversarial_dir, ["sequence", "adversarial_sequence", "wer", "attacked_label", "adversarial_label"]
+        )
+        # only the strings of successful attacks are decoded
+        successful = (results["wer"] > 0) & (results["attacked_label"] != results["adversarial_label"])
+        for idx in np.flatnonzero(successful):
+            sequence = results["sequence"][idx]
+            split = "test" if in_test_split(sequence, test_size, seed=seed) else "train"
+            writer = test_writer if split == "test" else train_writer
+            writer.write({"text": results["adversarial_sequence"][idx], "label": 1})
+            writer.write({"text": sequence, "label": 0})
+            counts[split] += 2
+    return counts
+
+
+def _prepare(dirs, test_size: float, seed: int):
+    adversarial_dir, out_dir = dirs
+    return out_dir, prepare(adversarial_dir, out_dir, test_size, seed)
 
 
 if __name__ == "__main__":
     args = parser.parse_args()
-    adversarial_dir = Path(args.adversarial_dir)
-    out_dir = Path(args.out_dir)
-    out_dir.mkdir(exist_ok=True)
+    adversarial_dirs = [Path(adversarial_dir) for adversarial_dir in args.adversarial_dir]
+    if args.out_dir is not None:
+        assert len(adversarial_dirs) == 1, "--out-dir can be used with a single --adversarial-dir"
+        out_dirs = [Path(args.out_dir)]
+    else:
+        out_dirs = [adversarial_dir / args.out_subdir for adversarial_dir in adversarial_dirs]
 
-    data = load_jsonlines(adversarial_dir / "attacked_data.json")
-    train, test = train_test_split(data, test_size=0.2, random_state=24)
-
-    print(f"Saving data to {out_dir}")
-    with jsonlines.open(out_dir / "train.json", "w") as writer:
-        for ex in train:
-            if ex["wer"] > 0 and ex["attacked_label"] != ex["adversarial_label"]:
-                writer.write({"text": ex["adversarial_sequence"], "label": 1})
-                writer.write({"text": ex["sequence"], "label": 0})
-
-    with jsonlines.open(out_dir / "test.json", "w") as writer:
-        for ex in test:
-            if ex["wer"] > 0 and ex["attacked_label"] != ex["adversarial_label"]:
-                writer.write({"text": ex["adversarial_sequence"], "label": 1})
-                writer.write({"text": ex["sequence"], "label": 0})
+    fn = partial(_prepare, test_size=args.test_size, seed=args.seed)
+    with Pool(args.num_workers) as pool:
+        for out_dir, counts in pool.imap_unordered(fn, zip(adversarial_dirs, out_dirs)):
+            print(f"Saved data to {out_dir}: {counts}")
@@ -1,33 +1,43 @@
 import argparse
+from functools import partial
+from multiprocessing import Pool
 from pathlib import Path
+from typing import Optional
 import jsonlines
 
-from adat.utils import load_jsonlines
+from adat.attack_results import load_attack_results
+from adat.utils import iterate_jsonlines
 
 parser = argparse.ArgumentParser()
-parser.add_argument("--adversarial-dir", type=str, required=True)
+parser.add_argument("--adversarial-dir", type=str, nargs="+", required=True)
 parser.add_argument("--mix-with-path", type=str, default=None)
 parser.add_argument("--num-examples", type=int, default=None)
+parser.add_argument("--num-workers", type=int, default=1)
 # parser.add_argument("--max-wer", type=int, default=3)
 
 
-if __name__ == "__main__":
-    args = parser.parse_args()
-    adversarial_dir = Path(args.adversarial_dir)
-
-    data = load_jsonlines(adversarial_dir / "attacked_data.json")[:args.num_examples]
-
-    postfix = args.num_examples or "all"
-
+def prepare(adversarial_dir: Path, mix_with_path: Optional[str] = None, num_examples: Optional[int] = None) -> Path:
+    postfix = num_examples or "all"
     data_path = adversarial_dir / f"fine_tuning_data_{postfix}.json"
-    print(f"Saving data to {data_path}")
     with jsonlines.open(data_path, "w") as writer:
-        for ex in data:
+        results = load_attack_results(adversarial_dir, ["adversarial_sequence", "attacked_label"])
+        num_rows = len(results["attacked_label"])
+        for idx in range(min(num_examples or num_rows, num_rows)):
             # if args.max_wer >= ex["wer"] > 0 and ex["attacked_label"] != ex["adversarial_label"]:
             # num_added += 1
-            writer.write({"text": ex["adversarial_sequence"], "label": ex["attacked_label"]})
+            writer.write({"text": results["adversarial_sequence"][idx], "label": int(results["attacked_label"][idx])})
 
-        if args.mix_with_path is not None:
-            data_to_mix_with = load_jsonlines(args.mix_with_path)
-            for ex in data_to_mix_with:
+        if mix_with_path is not None:
+            for ex in iterate_jsonlines(mix_with_path):
                 writer.write(ex)
+    return data_path
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    adversarial_dirs = [Path(adversarial_dir) for adversarial_dir in args.adversarial_dir]
+
+    fn = partial(prepare, mix_with_path=args.mix_with_path, num_examples=args.num_examples)
+    with Pool(args.num_workers) as pool:
+        for data_path in pool.imap_unordered(fn, adversarial_dirs):
+            print(f"Saved data to {data_path}")
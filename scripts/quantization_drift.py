@@ -0,0 +1,101 @@
+"""Agreement, latency and size of an int8 dynamically quantized classifier or Deep Levenshtein against fp32, on CPU.
+
+    python scripts/quantization_drift.py --model-dir logs/nlp/clf --data-path datasets/nlp/clf/test.json
+    python scripts/quantization_drift.py --model-dir logs/nlp/lev --data-path datasets/nlp/lev/test.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import torch
+from allennlp.data import Batch, DatasetReader
+from allennlp.models import Model, load_archive
+
+from adat import register_all
+from adat.models import DeepLevenshtein
+from adat.quantization import quantize_dynamic, model_size_mb
+from adat.utils import load_jsonlines
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--model-dir", type=str, required=True)
+parser.add_argument("--data-path", type=str, required=True)
+parser.add_argument("--num-examples", type=int, default=2000)
+parser.add_argument("--batch-size", type=int, default=128)
+parser.add_argument("--output", type=str, default=None)
+# exit with an error above these
+parser.add_argument("--max-disagreement", type=float, default=None, help="share of changed classifier labels")
+parser.add_argument("--max-distance-mae", type=float, default=None, help="Deep Levenshtein distance MAE to fp32")
+
+
+def predict(model: Model, reader: DatasetReader, data: List[Dict[str, Any]], batch_size: int) -> Tuple[np.ndarray, List[float]]:
+    is_levenshtein = isinstance(model, DeepLevenshtein)
+    predictions, timings = [], []
+    for i in range(0, len(data), batch_size):
+        if is_levenshtein:
+            instances = [reader.text_to_instance(el["seq_a"], el["seq_b"]) for el in data[i:i + batch_size]]
+        else:
+            instances = [reader.text_to_instance(el["text"]) for el in data[i:i + batch_size]]
+        batch = Batch(instances)
+        batch.index_instances(model.vocab)
+        tensors = batch.as_tensor_dict()
+        start = time.perf_counter()
+        with torch.no_grad():
+            if is_levenshtein:
+                output = model(tensors["sequence_a"], tensors["sequence_b"])["distance"].view(-1)
+            else:
+                output = model(tokens=tensors["tokens"])["probs"]
+        timings.append(time.perf_counter() - start)
+        predictions.append(output.numpy())
+    return np.concatenate(predictions), timings
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    register_all()
+    archive = load_archive(Path(args.model_dir) / "model.tar.gz")
+    model = archive.model.eval()
+    reader = DatasetReader.from_params(archive.config["dataset_reader"])
+    quantized = quantize_dynamic(model)
+    data = load_jsonlines(args.data_path, limit=args.num_examples)
+
+    fp32, fp32_timings = predict(model, reader, data, args.batch_size)
+    int8, int8_timings = predict(quantized, reader, data, args.batch_size)
+    results = {
+        "num_examples": len(data),
+        "fp32_size_mb": model_size_mb(model),
+        "int8_size_mb": model_size_mb(quantized),
+        "fp32_median_batch_ms": 1000 * statistics.median(fp32_timings),
+        "int8_median_batch_ms": 1000 * statistics.median(int8_timings),
+    }
+    results["speedup"] = results["fp32_median_batch_ms"] / results["int8_median_batch_ms"]
+
+    failed = False
+    if isinstance(model, DeepLevenshtein):
+        results["distance_mae"] = float(np.abs(fp32 - int8).mean())
+        results["distance_max_abs_diff"] = float(np.abs(fp32 - int8).max())
+        if "dist" in data[0]:
+            true = np.array([el["dist"] for el in data])
+            results["fp32_mae"] = float(np.abs(fp32 - true).mean())
+            results["int8_mae"] = float(np.abs(int8 - true).mean())
+        failed = args.max_distance_mae is not None and results["distance_mae"] > args.max_distance_mae
+    else:
+        results["disagreement"] = float((fp32.argmax(-1) != int8.argmax(-1)).mean())
+        results["prob_max_abs_diff"] = float(np.abs(fp32 - int8).max())
+        if "label" in data[0]:
+            # the classifier configs use `skip_label_indexing`
+            true = np.array([int(el["label"]) for el in data])
+            results["fp32_accuracy"] = float((fp32.argmax(-1) == true).mean())
+            results["int8_accuracy"] = float((int8.argmax(-1) == true).mean())
+        failed = args.max_disagreement is not None and results["disagreement"] > args.max_disagreement
+
+    print(json.dumps(results, indent=2))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if failed:
+        sys.exit("Quantization drift is above the threshold")
@@ -18,8 +18,21 @@ if __name__ == "__main__":
     results_dir = Path(args.results_dir)
 
     metrics_df = []
+    # results of `scripts/cascada_sweep.py`, only configs evaluated on all examples are compared
+    for path in glob(str(results_dir / f"*/*/{args.alg_name}/grid_search/sweep_results.csv")):
+        path = Path(path)
+        sweep_df = pd.read_csv(path, dtype={"config_num": str})
+        sweep_df = sweep_df[sweep_df["rung"] == sweep_df["rung"].max()]
+        for _, row in sweep_df.iterrows():
+            metrics = {k: round(v, 3) for k, v in row.items() if k in METRIC_NAMES}
+            metrics["config_num"] = row["config_num"]
+            metrics["dataset"] = path.parent.parent.parent.name
+            metrics_df.append(metrics)
+
     for path in glob(str(results_dir / f"*/*/{args.alg_name}/grid_search/*")):
         path = Path(path)
+        if not path.is_dir():
+            continue
         metrics_path = path / "target_clf_metrics.json"
         if metrics_path.exists():
             with open(metrics_path) as f: